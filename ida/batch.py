@@ -0,0 +1,279 @@
+"""Execução em lote de muitas turmas (coortes) em um único pool de processos.
+
+As notas de todas as turmas pendentes são carregadas uma única vez pelo processo
+principal e gravadas em sequência em um arquivo float32 mapeado em memória; cada
+worker abre o arquivo uma vez (e importa o sklearn uma vez) e monta visões
+``grades.GradeMatrix`` sem cópia para cada turma que recebe.
+
+    python batch.py --manifest turmas.json --jobs 8
+
+O manifesto (JSON com uma lista de objetos, ou CSV) tem as colunas ``turma``,
+``input`` e, opcionalmente, ``prereqs``; caminhos relativos partem do diretório
+do manifesto. Cada turma grava seus artefatos em ``<out>/<turma>/`` e o índice
+combinado fica em ``<out>/index.json`` (e ``index.csv``). O índice é atualizado a
+cada turma concluída: uma nova execução pula as turmas já concluídas com as
+mesmas entradas e parâmetros e refaz as que falharam.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cache import fingerprint
+from grades import GradeMatrix
+from loader import DEFAULT_CHUNKSIZE, default_prereqs_path, load_grade_matrix
+from main import build_metrics_dataframe, build_recommendations_dataframe, file_states, save_artifacts
+from models import BACKENDS
+from prerequisite_issues import identify_prerequisite_issues, resolve_jobs
+from writer import ArtifactWriter
+
+DEFAULT_OUT = Path(__file__).parent / "results" / "batch"
+INDEX_NAME = "index.json"
+INDEX_COLUMNS = ["turma", "status", "alunos", "disciplinas", "recomendacoes", "segundos", "diretorio", "erro"]
+
+# Arquivo de notas aberto por cada worker (ver ``_init_worker``)
+_buffer = None
+
+
+def cohort_dir_name(turma):
+    """Nome de diretório seguro para a turma."""
+    return re.sub(r"[^\w.-]+", "_", str(turma)).strip("._") or "turma"
+
+
+def load_manifest(path):
+    """Lê o manifesto de turmas (JSON ou CSV) e devolve uma lista de dicionários.
+
+    Cada turma tem ``turma``, ``input`` e ``prereqs`` (padrão: ``<input>.prereqs.json``).
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as fh:
+            rows = json.load(fh)
+    else:
+        rows = pd.read_csv(path, sep=None, engine="python", encoding="utf-8-sig", dtype=str).to_dict("records")
+
+    cohorts = []
+    seen = {}
+    for i, row in enumerate(rows):
+        turma, source = row.get("turma"), row.get("input")
+        if not turma or not source or turma != turma or source != source:
+            raise ValueError(f"{path}: linha {i + 1} sem 'turma' ou 'input'")
+        turma = str(turma)
+        folder = cohort_dir_name(turma)
+        if folder in seen:
+            raise ValueError(f"{path}: turmas '{seen[folder]}' e '{turma}' usariam o mesmo diretório")
+        seen[folder] = turma
+        source = path.parent / source
+        prereqs = row.get("prereqs")
+        prereqs = path.parent / prereqs if prereqs and prereqs == prereqs else default_prereqs_path(source)
+        cohorts.append({"turma": turma, "input": str(source), "prereqs": str(prereqs), "dir": folder})
+    return cohorts
+
+
+def load_index(out_dir):
+    try:
+        return json.loads((Path(out_dir) / INDEX_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {"cohorts": {}}
+
+
+def save_index(index, out_dir):
+    """Grava o índice combinado de forma atômica (JSON, e CSV para consulta)."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, out_dir / INDEX_NAME)
+
+    rows = [{"turma": turma, **entry} for turma, entry in index["cohorts"].items()]
+    table = pd.DataFrame(rows).reindex(columns=INDEX_COLUMNS).astype(
+        {"alunos": "Int64", "disciplinas": "Int64", "recomendacoes": "Int64"}
+    )
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".tmp")
+    os.close(fd)
+    table.to_csv(tmp, index=False)
+    os.replace(tmp, out_dir / "index.csv")
+
+
+def pack_grades(cohorts, path, chunksize=DEFAULT_CHUNKSIZE):
+    """Carrega cada turma e anexa suas notas (float32, disciplina a disciplina) em ``path``.
+
+    Só uma turma fica em memória por vez. Retorna ``(layouts, errors)``:
+    posição e formato de cada turma no arquivo e os erros de carga por turma.
+    """
+    layouts, errors = {}, {}
+    offset = 0
+    with open(path, "wb") as fh:
+        for cohort in cohorts:
+            try:
+                grades, pre_reqs = load_grade_matrix(cohort["input"], cohort["prereqs"], chunksize=chunksize)
+            except Exception as exc:
+                errors[cohort["turma"]] = f"{type(exc).__name__}: {exc}"
+                continue
+            # Ordem de coluna: a transposta é contígua e é gravada como está
+            grades.values.T.tofile(fh)
+            layouts[cohort["turma"]] = {
+                "offset": offset,
+                "shape": grades.shape,
+                "students": grades.students,
+                "subjects": grades.subjects,
+                "pre_reqs": pre_reqs,
+            }
+            offset += grades.values.nbytes
+    return layouts, errors
+
+
+def _init_worker(path):
+    """Abre o arquivo de notas e importa os estimadores uma única vez por processo."""
+    global _buffer
+    _buffer = np.memmap(path, dtype=np.float32, mode="r") if os.path.getsize(path) else np.empty(0, np.float32)
+    from models import build_models
+
+    build_models()
+
+
+def run_cohort(cohort, layout, params, out_dir):
+    """Processa uma turma no worker; erros viram ``status: failed`` sem afetar as demais."""
+    start = time.perf_counter()
+    entry = {"alunos": layout["shape"][0], "disciplinas": layout["shape"][1]}
+    try:
+        n_students, n_subjects = layout["shape"]
+        if n_students:
+            values = np.ndarray(
+                (n_students, n_subjects), dtype=np.float32, buffer=_buffer, offset=layout["offset"], order="F",
+            )
+        else:
+            values = np.empty((0, n_subjects), dtype=np.float32)
+        grades = GradeMatrix(values, layout["students"], layout["subjects"])
+        recommendations, metrics = identify_prerequisite_issues(
+            grades, layout["pre_reqs"], threshold=params["threshold"], top_n=params["top_n"], jobs=1,
+            cv=params["cv"], repeats=params["repeats"], hops=params["hops"], backend=params["backend"],
+        )
+        metrics_df = build_metrics_dataframe(metrics)
+        recs_df = build_recommendations_dataframe(recommendations, params["top_n"])
+        cohort_dir = Path(out_dir) / cohort["dir"]
+        with ArtifactWriter(manifest_path=cohort_dir / "manifest.json", max_workers=2) as writer:
+            save_artifacts(metrics_df, recs_df, True, writer, formato=params["format"], out_dir=cohort_dir)
+        entry.update(status="ok", recomendacoes=len(recs_df), diretorio=str(cohort_dir))
+    except Exception as exc:
+        entry.update(status="failed", erro=f"{type(exc).__name__}: {exc}", traceback=traceback.format_exc())
+    entry["segundos"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def cohort_inputs(cohort, params):
+    """Hash das entradas de uma turma (arquivos e parâmetros), para retomar execuções."""
+    return fingerprint(file_states([cohort["input"], cohort["prereqs"]]), params)
+
+
+def run_batch(cohorts, params, out_dir=DEFAULT_OUT, jobs=1, force=False, chunksize=DEFAULT_CHUNKSIZE):
+    """Processa as turmas pendentes e devolve o índice combinado.
+
+    Turmas com status ``ok`` e as mesmas entradas são puladas (salvo ``force``).
+    Se um worker morre (ex.: falta de memória), as turmas em andamento naquele
+    pool ficam como ``failed`` e são refeitas na próxima execução.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = load_index(out_dir)
+    index["params"] = params
+    entries = index.setdefault("cohorts", {})
+
+    pending, reused = [], 0
+    for cohort in cohorts:
+        inputs = cohort_inputs(cohort, params)
+        entry = entries.get(cohort["turma"])
+        if not force and entry and entry.get("status") == "ok" and entry.get("inputs") == inputs:
+            reused += 1
+            continue
+        pending.append((cohort, inputs))
+
+    grades_path = out_dir / f".grades-{uuid.uuid4().hex}.f32"
+    try:
+        layouts, errors = pack_grades([cohort for cohort, _ in pending], grades_path, chunksize=chunksize)
+        for cohort, inputs in pending:
+            if cohort["turma"] in errors:
+                entries[cohort["turma"]] = {"status": "failed", "erro": errors[cohort["turma"]], "inputs": inputs}
+        save_index(index, out_dir)
+
+        tasks = [(cohort, inputs) for cohort, inputs in pending if cohort["turma"] in layouts]
+        workers = min(resolve_jobs(jobs), len(tasks))
+        if workers:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(grades_path),)) as pool:
+                futures = {
+                    pool.submit(run_cohort, cohort, layouts[cohort["turma"]], params, str(out_dir)): (cohort, inputs)
+                    for cohort, inputs in tasks
+                }
+                for future in as_completed(futures):
+                    cohort, inputs = futures[future]
+                    try:
+                        entry = future.result()
+                    except BrokenProcessPool as exc:
+                        entry = {"status": "failed", "erro": f"Worker encerrado inesperadamente: {exc}"}
+                    entry["inputs"] = inputs
+                    entries[cohort["turma"]] = entry
+                    save_index(index, out_dir)
+    finally:
+        grades_path.unlink(missing_ok=True)
+
+    index["reused"] = reused
+    save_index(index, out_dir)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa o SIDA para várias turmas de uma vez")
+    parser.add_argument("--manifest", required=True, help="Lista de turmas (JSON ou CSV: turma, input, prereqs)")
+    parser.add_argument("--out", default=str(DEFAULT_OUT), help="Diretório dos resultados por turma e do índice")
+    parser.add_argument("--jobs", type=int, default=1, help="Processos do pool (<= 0 usa todas as CPUs)")
+    parser.add_argument("--threshold", type=float, default=5.0)
+    parser.add_argument("--top", type=int, default=3)
+    parser.add_argument("--cv", type=int, default=None, metavar="K")
+    parser.add_argument("--repeats", type=int, default=1, metavar="R")
+    parser.add_argument("--hops", type=int, default=1)
+    parser.add_argument("--backend", choices=list(BACKENDS), default="auto")
+    parser.add_argument("--format", choices=["csv", "parquet", "feather"], default="csv")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--force", action="store_true", help="Refaz também as turmas já concluídas")
+    args = parser.parse_args()
+    if args.cv is not None and args.cv < 2:
+        parser.error("--cv precisa ser >= 2")
+
+    try:
+        cohorts = load_manifest(args.manifest)
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+    params = {
+        "threshold": args.threshold, "top_n": args.top, "cv": args.cv, "repeats": args.repeats,
+        "hops": args.hops, "backend": args.backend, "format": args.format,
+    }
+    start = time.perf_counter()
+    index = run_batch(cohorts, params, out_dir=args.out, jobs=args.jobs, force=args.force, chunksize=args.chunksize)
+
+    names = {cohort["turma"] for cohort in cohorts}
+    entries = {turma: entry for turma, entry in index["cohorts"].items() if turma in names}
+    failed = {turma: entry for turma, entry in entries.items() if entry["status"] != "ok"}
+    print(
+        f"{len(entries) - len(failed)} turmas concluídas ({index['reused']} reaproveitadas), "
+        f"{len(failed)} com falha, em {time.perf_counter() - start:.1f}s"
+    )
+    for turma, entry in failed.items():
+        print(f"  {turma}: {entry.get('erro')}")
+    print(f"Índice: {Path(args.out) / INDEX_NAME}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""Benchmarks do pipeline SIDA por faixa de escala.
+
+Mede tempo de parede e pico de RSS de cada estágio sobre dados sintéticos
+(``data.generate_data``), grava o resultado em JSON e compara com uma linha
+de base salva. Cada caso (alunos x disciplinas) roda em um processo
+próprio, então o pico de RSS não carrega a memória dos casos anteriores.
+Uma regressão acima da tolerância faz o processo sair com código 1.
+
+    python bench.py --tier 1k --save-baseline
+    python bench.py --tier 1k            # compara com a linha de base
+    python bench.py --imports            # orçamento de tempo de importação de main.py
+    python bench.py --inference          # previsão: sklearn x modelos compilados (compiled.py)
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from compiled import compile_model
+from data import generate_data
+from main import build_metrics_dataframe, build_recommendations_dataframe
+from models import BACKENDS, build_models, evaluate_models
+from output import gerar_csv
+from prerequisite_issues import identify_prerequisite_issues
+
+RESULTS_DIR = Path(__file__).parent / "results" / "bench"
+BASELINE_PATH = Path(__file__).parent / "bench_baseline.json"
+
+# (alunos, disciplinas) por faixa
+TIERS = {
+    "1k": [(1_000, 10), (1_000, 50), (1_000, 200)],
+    "100k": [(100_000, 10), (100_000, 50), (100_000, 200)],
+    "1m": [(1_000_000, 10), (1_000_000, 50), (1_000_000, 200)],
+}
+# Orçamento de ``import main`` (ms, medido com ``python -X importtime``) e módulos que
+# só podem ser carregados pelo estágio que os usa
+IMPORT_BUDGET_MS = 1000
+DEFERRED_MODULES = ("matplotlib", "scipy", "seaborn", "sklearn", "ydata_profiling")
+STAGES = [
+    "identify_prerequisite_issues",
+    "evaluate_models",
+    "build_metrics_dataframe",
+    "build_recommendations_dataframe",
+    "gerar_csv",
+]
+
+
+def _reset_peak_rss():
+    """Zera o pico de RSS do processo (Linux); sem suporte, o pico inclui os estágios anteriores do caso."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(fn, repeat=1):
+    """Executa ``fn`` ``repeat`` vezes; retorna o último resultado, o menor tempo e o pico de RSS."""
+    best = float("inf")
+    peak = 0.0
+    result = None
+    for _ in range(repeat):
+        _reset_peak_rss()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, _peak_rss_mb())
+    return result, best, peak
+
+
+def run_case(n_students, n_subjects, stages, repeat=1, jobs=1, seed=0, backend="auto"):
+    df, pre_reqs = generate_data(n_students, n_subjects, seed=seed)
+    case = f"{n_students}x{n_subjects}"
+    rows = []
+
+    def record(stage, fn):
+        if stage not in stages:
+            return None
+        result, seconds, peak = measure(fn, repeat=repeat)
+        rows.append({"case": case, "stage": stage, "seconds": seconds, "peak_rss_mb": peak})
+        print(f"{case:>16} {stage:<34} {seconds:10.4f}s {peak:10.1f} MB", flush=True)
+        return result
+
+    subject, reqs = next(iter(pre_reqs.items()))
+    split = int(len(df) * 0.8)
+    record("evaluate_models", lambda: evaluate_models(
+        df[reqs].iloc[:split], df[reqs].iloc[split:], df[subject].iloc[:split], df[subject].iloc[split:],
+        models=build_models(backend, split),
+    ))
+
+    issues = record(
+        "identify_prerequisite_issues",
+        lambda: identify_prerequisite_issues(df, pre_reqs, top_n=3, jobs=jobs, backend=backend),
+    )
+    if issues is None:
+        # Os demais estágios dependem da saída do treino
+        issues = identify_prerequisite_issues(df, pre_reqs, top_n=3, jobs=jobs, backend=backend)
+    recommendations, metrics_summary = issues
+
+    record("build_metrics_dataframe", lambda: build_metrics_dataframe(metrics_summary))
+    recs_df = record("build_recommendations_dataframe", lambda: build_recommendations_dataframe(recommendations, 3))
+    if recs_df is None:
+        recs_df = build_recommendations_dataframe(recommendations, 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        record("gerar_csv", lambda: gerar_csv(recs_df, os.path.join(tmp, "recs.csv")))
+    return rows
+
+
+def run_case_subprocess(n_students, n_subjects, stages, repeat=1, jobs=1, backend="auto"):
+    """``run_case`` em um processo novo: o pico de RSS medido é só o deste caso."""
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "case.json"
+        cmd = [
+            sys.executable, str(Path(__file__).resolve()), "--case", str(n_students), str(n_subjects),
+            "--case-out", str(out), "--repeat", str(repeat), "--jobs", str(jobs), "--backend", backend,
+        ]
+        for stage in stages:
+            cmd += ["--stage", stage]
+        subprocess.run(cmd, check=True)
+        return json.loads(out.read_text(encoding="utf-8"))
+
+
+def inference_case(n_students, backend="auto", repeat=5, seed=0, batch=10_000):
+    """Latência de ``predict`` do sklearn e do modelo compilado, com 1 linha e com ``batch`` linhas.
+
+    Os modelos são treinados nos pré-requisitos da primeira disciplina dos
+    dados sintéticos; as previsões compiladas precisam ser idênticas às do
+    sklearn e não mais lentas que elas, com 1 linha e com ``batch`` linhas (cada caso
+    fora disso conta como falha).
+    """
+    df, pre_reqs = generate_data(max(n_students, batch), 10, seed=seed)
+    subject, reqs = next(iter(pre_reqs.items()))
+    X = df[reqs].to_numpy(dtype=np.float32)
+    y = df[subject].to_numpy()
+    X_train, y_train = X[:n_students], y[:n_students]
+    rows, failures = [], []
+    for name, model in build_models(backend, n_students).items():
+        model.fit(X_train, y_train)
+        try:
+            fast = compile_model(model)
+        except ValueError as exc:
+            print(f"{name:<28} {exc}")
+            continue
+        if not np.array_equal(model.predict(X[:batch]), fast.predict(X[:batch])):
+            failures.append(f"{name}: previsões compiladas diferem das do sklearn")
+        for n_rows, times in ((1, repeat * 20), (batch, repeat)):
+            sample = X[:n_rows]
+            _, slow_s, _ = measure(lambda: model.predict(sample), repeat=times)
+            _, fast_s, _ = measure(lambda: fast.predict(sample), repeat=times)
+            rows.append({
+                "model": name, "rows": n_rows, "sklearn_ms": slow_s * 1000, "compiled_ms": fast_s * 1000,
+            })
+            print(
+                f"{name:<28} {n_rows:>6} linhas  sklearn {slow_s * 1000:9.3f} ms  "
+                f"compilado {fast_s * 1000:9.3f} ms  ({slow_s / fast_s:5.1f}x)",
+                flush=True,
+            )
+            if fast_s > slow_s:
+                failures.append(f"{name}: compilado mais lento que o sklearn com {n_rows} linhas "
+                                f"({slow_s / fast_s:.1f}x)")
+    return rows, failures
+
+
+def environment():
+    import pandas
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+def import_time(module="main", repeat=3):
+    """Tempo de importação de ``module`` em um processo novo (menor de ``repeat`` medições).
+
+    Retorna o total em ms, os módulos de maior custo acumulado e os módulos
+    pesados de ``DEFERRED_MODULES`` que foram carregados logo na importação.
+    """
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=Path(__file__).parent, capture_output=True, text=True, check=True,
+        )
+        rows = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            # O recuo do nome indica a profundidade; só o primeiro espaço é separador
+            rows.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+        # Entradas sem recuo são importações de primeiro nível; a soma delas é o total
+        total_ms = sum(cum for name, _, cum in rows if not name.startswith(" ")) / 1000
+        if best is None or total_ms < best[0]:
+            best = (total_ms, rows)
+
+    total_ms, rows = best
+    top = sorted(((name.strip(), cum / 1000) for name, _, cum in rows), key=lambda r: -r[1])[:10]
+    loaded = sorted({name.strip().split(".")[0] for name, _, _ in rows} & set(DEFERRED_MODULES))
+    return total_ms, top, loaded
+
+
+def check_imports(budget_ms):
+    total_ms, top, loaded = import_time()
+    print(f"import main: {total_ms:.0f} ms (orçamento: {budget_ms:.0f} ms)")
+    for name, ms in top:
+        print(f"  {ms:8.1f} ms  {name}")
+    failures = []
+    if total_ms > budget_ms:
+        failures.append(f"importação acima do orçamento: {total_ms:.0f} ms > {budget_ms:.0f} ms")
+    if loaded:
+        failures.append("módulos pesados carregados na importação: " + ", ".join(loaded))
+    for line in failures:
+        print(line, file=sys.stderr)
+    return 1 if failures else 0
+
+
+def compare(results, baseline, tolerance, min_seconds=0.05):
+    """Lista as regressões de tempo ou memória acima de ``tolerance`` (fração) em relação à base.
+
+    Diferenças de tempo menores que ``min_seconds`` são ruído de medição e não contam.
+    """
+    reference = {(r["case"], r["stage"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        base = reference.get((row["case"], row["stage"]))
+        if base is None:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            if metric == "seconds" and row[metric] - base[metric] < min_seconds:
+                continue
+            if base[metric] > 0 and row[metric] > base[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{row['case']} {row['stage']}: {metric} {base[metric]:.4f} -> {row[metric]:.4f} "
+                    f"(+{row[metric] / base[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline SIDA")
+    parser.add_argument("--tier", choices=list(TIERS), nargs="+", default=["1k"], dest="tiers")
+    parser.add_argument("--stage", choices=STAGES, action="append", dest="stages", help="Padrão: todos")
+    parser.add_argument("--repeat", type=int, default=1, help="Repetições por estágio (vale o menor tempo)")
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--backend", choices=list(BACKENDS), default="auto", help="Estimadores (ver models.py)")
+    parser.add_argument("--out", default=None, help="Arquivo JSON de saída (padrão: results/bench/<data>.json)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado como nova linha de base")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="Regressão máxima aceita em relação à base (fração; 0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--imports", action="store_true",
+        help="Só verifica o tempo de importação de main.py (python -X importtime)",
+    )
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS, metavar="MS")
+    # Uso interno: um único caso, no processo filho de ``run_case_subprocess``
+    parser.add_argument("--case", type=int, nargs=2, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--case-out", default=None, help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--inference", type=int, nargs="?", const=20_000, default=None, metavar="ALUNOS",
+        help="Só mede a latência de predict (1 e 10 mil linhas) do sklearn e dos modelos compilados, "
+             "treinados com ALUNOS linhas (padrão: 20000)",
+    )
+    args = parser.parse_args()
+
+    if args.imports:
+        return check_imports(args.import_budget)
+    if args.inference is not None:
+        _, failures = inference_case(args.inference, backend=args.backend, repeat=max(args.repeat, 3))
+        for line in failures:
+            print(line, file=sys.stderr)
+        return 1 if failures else 0
+
+    stages = args.stages or STAGES
+    if args.case is not None:
+        rows = run_case(*args.case, stages, repeat=args.repeat, jobs=args.jobs, backend=args.backend)
+        Path(args.case_out).write_text(json.dumps(rows), encoding="utf-8")
+        return 0
+
+    results = []
+    for tier in dict.fromkeys(args.tiers):
+        for n_students, n_subjects in TIERS[tier]:
+            results.extend(run_case_subprocess(
+                n_students, n_subjects, stages, repeat=args.repeat, jobs=args.jobs, backend=args.backend,
+            ))
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(), "results": results}
+    out = Path(args.out) if args.out else RESULTS_DIR / time.strftime("bench-%Y%m%d-%H%M%S.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Resultados gravados em {out}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Linha de base atualizada em {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"Sem linha de base em {baseline_path}; use --save-baseline para criá-la.")
+        return 0
+
+    regressions = compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+    if regressions:
+        print("\nREGRESSÕES DE DESEMPENHO:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print("Nenhuma regressão em relação à linha de base.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
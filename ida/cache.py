@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+try:
+    import numpy as np
+except Exception:  # numpy é opcional para chaves sem arrays
+    np = None
+
+try:
+    import pandas as pd
+except Exception:  # pandas é opcional para chaves sem DataFrame
+    pd = None
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "results" / "cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_MISS = object()
+
+
+def _update_hash(h, part):
+    if hasattr(part, "fingerprint_parts"):
+        # Ex.: grades.GradeMatrix, que se descreve por arrays e listas
+        for sub in part.fingerprint_parts():
+            _update_hash(h, sub)
+    elif np is not None and isinstance(part, np.ndarray):
+        # Arrays em ordem de coluna são lidos pela transposta, sem cópia
+        fortran = part.ndim > 1 and part.flags.f_contiguous and not part.flags.c_contiguous
+        h.update(b"array")
+        h.update(json.dumps([str(part.dtype), part.shape, fortran]).encode("utf-8"))
+        h.update((part.T if fortran else np.ascontiguousarray(part)).data)
+    elif pd is not None and isinstance(part, (pd.DataFrame, pd.Series)):
+        h.update(b"df")
+        if isinstance(part, pd.DataFrame):
+            h.update(json.dumps([str(c) for c in part.columns]).encode("utf-8"))
+            h.update(json.dumps([str(t) for t in part.dtypes]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    elif isinstance(part, bytes):
+        h.update(b"bytes")
+        h.update(part)
+    else:
+        h.update(b"json")
+        h.update(json.dumps(part, sort_keys=True, default=repr, ensure_ascii=False).encode("utf-8"))
+
+
+def fingerprint(*parts) -> str:
+    """Hash SHA-256 estável de DataFrames, arrays, dicionários, parâmetros e escalares."""
+    h = hashlib.sha256()
+    for part in parts:
+        _update_hash(h, part)
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class StageCache:
+    """Cache em disco dos estágios do pipeline (dados → modelos → recomendações → exportação).
+
+    Cada entrada é um pickle nomeado pelo estágio e pelo hash das entradas.
+    O mtime do arquivo marca o último acesso; quando o diretório passa de
+    ``max_bytes`` as entradas menos usadas recentemente são removidas. Uma
+    entrada maior que ``max_bytes`` sozinha não é gravada.
+
+    - ``enabled=False`` (``--no-cache``) desliga leitura e escrita.
+    - ``rebuild=True`` (``--rebuild``) ignora entradas existentes, mas grava as novas.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True, rebuild=False):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.rebuild = rebuild
+        self.hits = []
+
+    def key(self, stage, *parts) -> str:
+        return f"{stage}-{fingerprint(stage, *parts)}"
+
+    def _path(self, key) -> Path:
+        return self.root / f"{key}.pkl"
+
+    def get(self, key, default=None):
+        if not self.enabled or self.rebuild:
+            return default
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+        except FileNotFoundError:
+            return default
+        except Exception:
+            # Entrada corrompida ou incompatível: descarta e recalcula
+            path.unlink(missing_ok=True)
+            return default
+        os.utime(path)
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return value
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            if Path(tmp).stat().st_size > self.max_bytes:
+                # Não caberia no cache nem sozinha: gravá-la só expulsaria as demais
+                Path(tmp).unlink()
+                return value
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.evict(keep=key)
+        return value
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISS)
+        if value is _MISS:
+            return self.put(key, compute())
+        self.hits.append(key.split("-", 1)[0])
+        return value
+
+    def evict(self, keep=None):
+        """Remove as entradas menos usadas até o cache caber em ``max_bytes``."""
+        entries = []
+        for path in self.root.glob("*.pkl"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == self._path(keep):
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,323 @@
+"""Inferência sem sklearn: florestas e modelos lineares compilados em arrays NumPy planos.
+
+``compile_model`` converte um estimador já treinado em um objeto só com
+arrays (feature, threshold, filhos, valor), cuja ``predict`` é vetorizada e
+reproduz bit a bit a ``predict`` do sklearn:
+
+- Random Forest: entradas em float32 comparadas com os limiares (arredondados
+  para o maior float32 abaixo deles, o que dá o mesmo resultado), soma em float64 na ordem das árvores e divisão pelo número de árvores;
+- Gradient Boosting por histogramas: entradas em float64, soma a partir da
+  previsão base na ordem das iterações;
+- lineares (``LinearRegression``, ``LinearSVR``, ``SGDRegressor``, ``Ridge``...):
+  ``X @ coef_ + intercept_``, com ``StandardScaler`` à frente em pipelines.
+
+O sklearn só é usado na compilação; o objeto compilado pode ser serializado
+e usado onde ele não está instalado. Modelos sem equivalente exato (ex.: SVR
+com kernel, cuja previsão passa pelos vetores de suporte da libsvm) geram
+``ValueError``.
+"""
+import numpy as np
+
+# Linhas por bloco na travessia das árvores (mantém os índices de nós no cache)
+PREDICT_BLOCK = 2048
+# Passos da travessia entre duas remoções dos pares (linha, árvore) que já chegaram à folha
+COMPACT_EVERY = 4
+# A partir de quantas linhas a travessia é feita árvore a árvore sobre o bloco (medido com
+# ``bench.py --inference``: abaixo disso, o custo por árvore do laço Python domina)
+PER_TREE_MIN_ROWS = 1024
+# Linhas por bloco e passos entre compactações na travessia árvore a árvore
+PER_TREE_BLOCK = 65536
+PER_TREE_COMPACT_EVERY = 8
+
+
+def _breadth_first(left, right, is_leaf):
+    """Nova ordem dos nós (em largura, irmãos adjacentes) e a profundidade da árvore."""
+    order, level, depth = [np.zeros(1, dtype=np.intp)], np.zeros(1, dtype=np.intp), 0
+    while True:
+        internal = level[~is_leaf[level]]
+        if not internal.size:
+            return np.concatenate(order), depth
+        level = np.column_stack([left[internal], right[internal]]).ravel()
+        order.append(level)
+        depth += 1
+
+
+def _float32_threshold(threshold):
+    """Maior float32 <= limiar: para x float32, ``x <= t`` equivale a ``x <= t32`` (sem promover a float64)."""
+    t32 = threshold.astype(np.float32)
+    return np.where(t32 > threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+
+
+class CompiledTrees:
+    """Conjunto de árvores de regressão em arrays planos.
+
+    Os nós de todas as árvores ficam concatenados, cada árvore em ordem de
+    largura com os dois filhos adjacentes: o filho direito é o esquerdo + 1,
+    então um passo da travessia é ``nó = esquerdo[nó] + (x > limiar[nó])``.
+    ``word`` junta filho esquerdo e atributo em um inteiro (uma leitura por
+    passo). Folhas apontam para si mesmas com limiar +inf, de modo que
+    podem continuar "andando" sem sair do lugar; a cada ``COMPACT_EVERY``
+    passos os pares (linha, árvore) que já chegaram saem do lote.
+
+    Lotes a partir de ``PER_TREE_MIN_ROWS`` linhas são percorridos árvore a
+    árvore, nível a nível sobre todas as linhas do bloco: os nós de uma
+    árvore cabem no cache e as leituras deixam de saltar entre árvores.
+    """
+
+    def __init__(self, word, shift, threshold, missing_left, is_leaf, value, roots, depth,
+                 n_features, dtype, base=0.0, divisor=None):
+        self.word = word
+        self.shift = shift
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.is_leaf = is_leaf
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.n_features = n_features
+        self.dtype = np.dtype(dtype)
+        self.base = base
+        self.divisor = divisor
+        self.left = word >> shift
+        self.feature = word & ((1 << shift) - 1)
+        self.bounds = np.append(roots, len(word))
+
+    @classmethod
+    def from_nodes(cls, trees, n_features, dtype, base=0.0, divisor=None):
+        """Junta árvores dadas como ``(feature, threshold, left, right, missing_left, value, is_leaf)``."""
+        parts, roots, offset, depth = [], [], 0, 0
+        for feature, threshold, left, right, missing_left, value, is_leaf in trees:
+            is_leaf = np.asarray(is_leaf, dtype=bool)
+            order, tree_depth = _breadth_first(np.asarray(left, dtype=np.intp), np.asarray(right, dtype=np.intp), is_leaf)
+            position = np.empty(len(order), dtype=np.intp)
+            position[order] = np.arange(len(order))
+            leaf = is_leaf[order]
+            own = np.arange(len(order))
+            parts.append((
+                np.where(leaf, own, position[np.where(leaf, 0, np.asarray(left)[order])]) + offset,
+                np.where(leaf, 0, np.asarray(feature)[order]),
+                np.where(leaf, np.inf, np.asarray(threshold, dtype=np.float64)[order]),
+                np.where(leaf, True, np.asarray(missing_left, dtype=bool)[order]),
+                leaf,
+                np.asarray(value, dtype=np.float64)[order],
+            ))
+            roots.append(offset)
+            offset += len(order)
+            depth = max(depth, tree_depth)
+        left, feature, threshold, missing_left, is_leaf, value = (np.concatenate(arrays) for arrays in zip(*parts))
+        shift = max(1, (n_features - 1).bit_length())
+        word = (left.astype(np.int64) << shift) | feature.astype(np.int64)
+        if np.dtype(dtype) == np.float32:
+            threshold = _float32_threshold(threshold)
+        return cls(word, shift, threshold, missing_left, is_leaf, value, np.asarray(roots, dtype=np.intp),
+                   depth, n_features, dtype, base, divisor)
+
+    def leaves(self, X):
+        """Nó-folha de cada (linha, árvore): array ``(len(X), n_árvores)``."""
+        n, n_trees = len(X), len(self.roots)
+        flat = X.ravel()
+        has_nan = np.isnan(flat).any()
+        mask = (1 << self.shift) - 1
+        nodes = np.tile(self.roots, n)
+        offset = np.repeat(np.arange(n, dtype=np.int64) * X.shape[1], n_trees)
+        active, current = None, nodes
+        for step in range(1, self.depth + 1):
+            word = self.word[current]
+            x = flat[(word & mask) + offset]
+            right = x > self.threshold[current]
+            if has_nan:
+                # x > limiar é falso para NaN; o lado certo é o gravado no nó
+                nan = np.isnan(x)
+                right[nan] = ~self.missing_left[current[nan]]
+            current = (word >> self.shift) + right
+            if step % COMPACT_EVERY == 0 and step < self.depth:
+                done = self.is_leaf[current]
+                if active is None:
+                    nodes = current
+                    active = np.flatnonzero(~done)
+                else:
+                    nodes[active[done]] = current[done]
+                    active = active[~done]
+                current, offset = current[~done], offset[~done]
+                if not len(current):
+                    break
+        if active is None:
+            nodes = current
+        else:
+            nodes[active] = current
+        return nodes.reshape(n, n_trees)
+
+    def _predict_per_tree(self, X):
+        """Soma das folhas, árvore a árvore, com todas as linhas de ``X`` a cada passo."""
+        n = len(X)
+        # Uma disciplina contígua por linha de ``flat``: o atributo vira deslocamento ``atributo * n``
+        flat = np.ascontiguousarray(X.T).ravel()
+        has_nan = np.isnan(flat).any()
+        out = np.full(n, self.base, dtype=np.float64)
+        every = np.arange(n)
+        for start, end in zip(self.bounds[:-1], self.bounds[1:]):
+            left = self.left[start:end] - start
+            offset = self.feature[start:end] * n
+            threshold = self.threshold[start:end]
+            is_leaf = self.is_leaf[start:end]
+            nodes = np.zeros(n, dtype=np.intp)
+            rows, current, step = every, nodes, 0
+            while True:
+                step += 1
+                x = flat[offset[current] + rows]
+                right = x > threshold[current]
+                if has_nan:
+                    # x > limiar é falso para NaN; o lado certo é o gravado no nó
+                    nan = np.isnan(x)
+                    right[nan] = ~self.missing_left[start + current[nan]]
+                current = left[current] + right
+                if step % PER_TREE_COMPACT_EVERY == 0:
+                    done = is_leaf[current]
+                    if done.all():
+                        break
+                    nodes[rows[done]] = current[done]
+                    rows, current = rows[~done], current[~done]
+            nodes[rows] = current
+            # Soma na ordem das árvores, como o sklearn
+            out += self.value[start + nodes]
+        return out
+
+    def predict(self, X):
+        X = _validate(X, self.n_features, self.dtype)
+        if len(X) >= PER_TREE_MIN_ROWS:
+            out = np.concatenate([
+                self._predict_per_tree(X[start:start + PER_TREE_BLOCK])
+                for start in range(0, len(X), PER_TREE_BLOCK)
+            ])
+            if self.divisor is not None:
+                out /= self.divisor
+            return out
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_BLOCK):
+            block = X[start:start + PREDICT_BLOCK]
+            values = self.value[self.leaves(block)]
+            # Soma sequencial (acumulada), na mesma ordem do sklearn; np.sum usaria soma em pares
+            acc = np.empty((len(block), values.shape[1] + 1))
+            acc[:, 0] = self.base
+            acc[:, 1:] = values
+            out[start:start + len(block)] = np.cumsum(acc, axis=1)[:, -1]
+        if self.divisor is not None:
+            out /= self.divisor
+        return out
+
+
+class CompiledLinear:
+    """``X @ coef_.T + intercept_``, com padronização opcional (``StandardScaler``) antes."""
+
+    def __init__(self, coef, intercept, n_features, mean=None, scale=None):
+        self.coef = coef
+        self.intercept = intercept
+        self.n_features = n_features
+        self.mean = mean
+        self.scale = scale
+
+    def predict(self, X):
+        # Sem conversão de tipo: o sklearn também multiplica a entrada no dtype em que ela chega
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Esperadas {self.n_features} colunas, recebido formato {X.shape}")
+        if X.dtype.kind == "f" and not np.isfinite(X).all():
+            # Como no sklearn: modelos lineares não aceitam faltantes
+            raise ValueError("Entrada contém NaN ou infinito")
+        if self.mean is not None or self.scale is not None:
+            # Como o StandardScaler: cópia em ponto flutuante, operações no próprio dtype
+            X = np.array(X, dtype=X.dtype if X.dtype in (np.float32, np.float64) else np.float64)
+            if self.mean is not None:
+                X -= self.mean
+            if self.scale is not None:
+                X /= self.scale
+        return X @ self.coef + self.intercept
+
+
+def _validate(X, n_features, dtype):
+    X = np.asarray(X, dtype=dtype)
+    if X.ndim != 2 or X.shape[1] != n_features:
+        raise ValueError(f"Esperadas {n_features} colunas, recebido formato {X.shape}")
+    return X
+
+
+def _compile_forest(model):
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        # ``missing_go_to_left`` só existe no sklearn >= 1.3; antes, NaN não era aceito na previsão
+        missing = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+        trees.append((
+            tree.feature, tree.threshold, tree.children_left, tree.children_right,
+            missing, tree.value[:, 0, 0], tree.children_left < 0,
+        ))
+    return CompiledTrees.from_nodes(
+        trees, model.n_features_in_, np.float32, divisor=len(model.estimators_),
+    )
+
+
+def _compile_hist_boosting(model):
+    if model.n_trees_per_iteration_ != 1:
+        raise ValueError("Só é suportado Gradient Boosting de regressão (uma árvore por iteração)")
+    trees = []
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("Gradient Boosting com atributos categóricos não é suportado")
+        trees.append((
+            nodes["feature_idx"], nodes["num_threshold"], nodes["left"], nodes["right"],
+            nodes["missing_go_to_left"], nodes["value"], nodes["is_leaf"],
+        ))
+    # Só perdas com ligação identidade (ex.: squared_error): a previsão é a soma bruta
+    loss = model._loss
+    link = type(getattr(loss, "link", loss)).__name__
+    if link not in ("IdentityLink", "LeastSquares"):
+        raise ValueError(f"Gradient Boosting com a perda {model.loss} não é suportado")
+    return CompiledTrees.from_nodes(
+        trees, model.n_features_in_, np.float64, base=float(np.ravel(model._baseline_prediction)[0]),
+    )
+
+
+def _compile_linear(model, mean=None, scale=None):
+    return CompiledLinear(
+        np.asarray(model.coef_).T, model.intercept_, model.n_features_in_, mean=mean, scale=scale,
+    )
+
+
+def compile_model(model):
+    """Versão compilada (só NumPy) de um estimador treinado; ``ValueError`` se não há equivalente exato."""
+    from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import SGDRegressor
+    from sklearn.linear_model._base import LinearModel
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import LinearSVR
+
+    linear = (LinearModel, LinearSVR, SGDRegressor)
+
+    if isinstance(model, RandomForestRegressor):
+        return _compile_forest(model)
+    if isinstance(model, HistGradientBoostingRegressor):
+        return _compile_hist_boosting(model)
+    if isinstance(model, linear):
+        return _compile_linear(model)
+    if isinstance(model, Pipeline) and len(model.steps) == 2:
+        (_, scaler), (_, final) = model.steps
+        if isinstance(scaler, StandardScaler) and isinstance(final, linear):
+            return _compile_linear(
+                final,
+                mean=scaler.mean_ if scaler.with_mean else None,
+                scale=scaler.scale_ if scaler.with_std else None,
+            )
+    raise ValueError(f"Modelo não suportado pelo compilador: {type(model).__name__}")
+
+
+def compile_models(models):
+    """Compila cada modelo de ``{nome: modelo}``; os sem equivalente exato ficam como estão."""
+    compiled = {}
+    for name, model in models.items():
+        try:
+            compiled[name] = compile_model(model)
+        except ValueError:
+            compiled[name] = model
+    return compiled
@@ -0,0 +1,165 @@
+"""Consultas do painel (``sida.py``) feitas no servidor: leitura, filtros, agregação e paginação.
+
+Nada aqui depende do Streamlit; ``sida.py`` só memoiza estas funções e
+mostra os resultados, de modo que o navegador recebe apenas a página atual
+ou a tabela agregada, nunca o conjunto inteiro.
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+DEFAULT_CSV = BASE_DIR / "oulad_atributos_selecionados.csv"
+OUTPUT_CSV = BASE_DIR / "output.csv"
+RESULTS_DIR = BASE_DIR / "results"
+PAGE_SIZES = (25, 50, 100, 500)
+AGGREGATIONS = ("count", "mean", "median", "min", "max", "sum")
+# Colunas de texto com até este número de valores distintos viram seleção múltipla; as demais, busca
+MAX_OPTIONS = 100
+# Grupos enviados ao navegador na agregação
+MAX_GROUPS = 1_000
+
+
+def file_mtime(path):
+    """mtime (ns) do arquivo ou diretório (Parquet particionado), ou ``None`` se não existe."""
+    try:
+        return Path(path).stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def sources(csv_path=DEFAULT_CSV, output_csv=OUTPUT_CSV, results_dir=RESULTS_DIR):
+    """Tabelas disponíveis para o painel: ``{rótulo: caminho}``.
+
+    Além da planilha, inclui a saída do SIDA (``output.csv``) e os artefatos
+    gravados com ``main.py --save`` (colunares, se existirem, ou CSV).
+    """
+    found = {"Planilha": Path(csv_path)}
+    if Path(output_csv).exists():
+        found["Saída do SIDA"] = Path(output_csv)
+    results_dir = Path(results_dir)
+    for label, name in (("Recomendações (SIDA)", "recommendations"), ("Métricas (SIDA)", "metrics"),
+                        ("Tutores (SIDA)", "tutors"), ("Limiares (SIDA)", "thresholds")):
+        for candidate in (results_dir / name, results_dir / f"{name}.feather", results_dir / f"{name}.csv"):
+            if candidate.exists():
+                found[label] = candidate
+                break
+    return found
+
+
+def _csv_separator(path):
+    """Separador e decimal: ``;`` com vírgula decimal (``output.gerar_csv``) ou ``,`` com ponto."""
+    with open(path, encoding="utf-8-sig") as fh:
+        header, first = fh.readline(), fh.readline()
+    if ";" not in header:
+        return ",", "."
+    return ";", "," if re.search(r"\d,\d", first) else "."
+
+
+def read_table(path):
+    """Lê CSV (``,`` ou ``;`` pt-BR), Parquet (arquivo ou diretório particionado) ou Feather.
+
+    Colunas de texto viram categóricas: ocupam uma fração da memória e
+    filtros/agrupamentos trabalham sobre os códigos inteiros.
+    """
+    path = Path(path)
+    if path.is_dir() or path.suffix.lower() in (".parquet", ".pq"):
+        df = pd.read_parquet(path)
+    elif path.suffix.lower() == ".feather":
+        df = pd.read_feather(path)
+    else:
+        sep, decimal = _csv_separator(path)
+        df = pd.read_csv(path, sep=sep, decimal=decimal, encoding="utf-8-sig")
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def column_kinds(df):
+    """Classifica as colunas para os filtros: ``(numéricas, categóricas pequenas, texto para busca)``."""
+    numeric, options, search = [], [], []
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            numeric.append(col)
+        elif isinstance(series.dtype, pd.CategoricalDtype) and len(series.cat.categories) <= MAX_OPTIONS:
+            options.append(col)
+        else:
+            search.append(col)
+    return numeric, options, search
+
+
+def column_range(df, col):
+    """Mínimo e máximo (ignorando NaN) de uma coluna numérica."""
+    values = df[col].to_numpy(dtype=np.float64)
+    if np.isnan(values).all():
+        return 0.0, 0.0
+    return float(np.nanmin(values)), float(np.nanmax(values))
+
+
+def filter_rows(df, equals=(), ranges=(), contains=(), sort_by=None, ascending=True):
+    """Posições das linhas que passam nos filtros, já ordenadas.
+
+    - ``equals``: pares ``(coluna, valores)`` (a linha precisa estar entre os valores);
+    - ``ranges``: pares ``(coluna, (mínimo, máximo))``, limites incluídos;
+    - ``contains``: pares ``(coluna, texto)``; em colunas categóricas a busca
+      roda só sobre as categorias e o resultado é cruzado com os códigos.
+
+    Devolve um array de posições (não uma cópia da tabela): cada página é
+    montada depois com ``page``.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in equals:
+        mask &= df[col].isin(list(values)).to_numpy()
+    for col, (low, high) in ranges:
+        values = df[col].to_numpy(dtype=np.float64)
+        mask &= (values >= low) & (values <= high)
+    for col, text in contains:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            hits = series.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+            mask &= np.isin(series.cat.codes.to_numpy(), np.flatnonzero(hits))
+        else:
+            mask &= series.astype(str).str.contains(text, case=False, regex=False).to_numpy()
+    rows = np.flatnonzero(mask)
+
+    if sort_by is not None:
+        series = df[sort_by]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Posição de cada categoria na ordem alfabética: ordena pelos códigos sem comparar textos linha a linha
+            ordem = np.argsort(series.cat.categories.astype(str).to_numpy(), kind="stable")
+            rank = np.empty(len(ordem) + 1)
+            rank[ordem] = np.arange(len(ordem))
+            rank[-1] = np.nan  # código -1 (faltante)
+            keys = rank[series.cat.codes.to_numpy()[rows]]
+        else:
+            keys = series.to_numpy(dtype=np.float64)[rows]
+        order = np.argsort(keys if ascending else -keys, kind="stable")
+        rows = rows[order]
+    return rows
+
+
+def page(df, rows, number, size):
+    """Linhas da página ``number`` (a partir de 1) e o total de páginas."""
+    pages = max(1, -(-len(rows) // size))
+    number = min(max(1, number), pages)
+    return df.iloc[rows[(number - 1) * size:number * size]], pages
+
+
+def aggregate(df, rows, by, column=None, func="count"):
+    """Agrupa as linhas ``rows`` por ``by`` e resume ``column`` com ``func``.
+
+    Só as colunas envolvidas são lidas; o resultado tem uma linha por grupo.
+    """
+    if func not in AGGREGATIONS:
+        raise ValueError(f"Agregação desconhecida: {func} (use {', '.join(AGGREGATIONS)})")
+    keys = df[by].iloc[rows]
+    if func == "count" or column is None:
+        result = keys.groupby(keys, observed=True, sort=True).size().rename("Linhas")
+    else:
+        values = df[column].iloc[rows]
+        result = values.groupby(keys, observed=True, sort=True).agg(func).rename(f"{func}({column})")
+    return result.reset_index()
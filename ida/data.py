@@ -1,25 +1,251 @@
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 
-def create_data():
-    data = {
-        "Aluno": [f"Aluno_{i+1}" for i in range(50)],
-        "Números Inteiros": np.random.uniform(3.0, 10.0, 50).round(1),
-        "Frações": np.random.uniform(3.0, 10.0, 50).round(1),
-        "Equações": np.random.uniform(3.0, 10.0, 50).round(1),
-        "Geometria Básica": np.random.uniform(3.0, 10.0, 50).round(1),
-        "Funções": np.random.uniform(3.0, 10.0, 50).round(1),
-        "Trigonometria": np.random.uniform(3.0, 10.0, 50).round(1),
-        "Probabilidade": np.random.uniform(3.0, 10.0, 50).round(1),
-        "Estatística": np.random.uniform(3.0, 10.0, 50).round(1),
+from grades import GradeMatrix
+from graph import PrerequisiteGraph
+from loader import default_prereqs_path, subjects_path
+
+DEFAULT_PRE_REQS = {
+    "Frações": ["Números Inteiros"],
+    "Equações": ["Números Inteiros", "Frações"],
+    "Geometria Básica": ["Números Inteiros", "Frações"],
+    "Funções": ["Equações"],
+    "Trigonometria": ["Geometria Básica", "Equações"],
+    "Probabilidade": ["Frações", "Equações"],
+    "Estatística": ["Frações", "Probabilidade"],
+}
+DEFAULT_SUBJECTS = [
+    "Números Inteiros", "Frações", "Equações", "Geometria Básica",
+    "Funções", "Trigonometria", "Probabilidade", "Estatística",
+]
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Parâmetros do modelo de notas: habilidade latente do aluno + herança dos pré-requisitos
+GRADE_MEAN = 6.5
+GRADE_SPREAD = 1.5
+PREREQ_WEIGHT = 0.6
+NOISE = 0.8
+
+
+def random_curriculum(n_subjects, n_layers=4, max_prereqs=3, seed=None):
+    """Gera um currículo aleatório em forma de DAG.
+
+    As disciplinas são distribuídas em ``n_layers`` camadas; cada disciplina
+    fora da primeira camada recebe de 1 a ``max_prereqs`` pré-requisitos
+    sorteados entre as camadas anteriores (com preferência pela imediatamente
+    anterior). Retorna ``(subjects, pre_reqs)`` com ``subjects`` em ordem topológica.
+    """
+    rng = np.random.default_rng(seed)
+    n_layers = max(1, min(n_layers, n_subjects))
+    width = len(str(n_subjects))
+    subjects = [f"Disciplina_{i + 1:0{width}d}" for i in range(n_subjects)]
+    layers = np.array_split(np.arange(n_subjects), n_layers)
+
+    pre_reqs = {}
+    for depth in range(1, len(layers)):
+        previous = layers[depth - 1]
+        earlier = np.concatenate(layers[:depth])
+        for idx in layers[depth]:
+            k = int(rng.integers(1, min(max_prereqs, len(earlier)) + 1))
+            # Pelo menos um pré-requisito vem da camada anterior, para manter a profundidade
+            chosen = {int(rng.choice(previous))}
+            if k > 1:
+                chosen.update(int(i) for i in rng.choice(earlier, size=k - 1, replace=False))
+            pre_reqs[subjects[idx]] = [subjects[i] for i in sorted(chosen)]
+    return subjects, pre_reqs
+
+
+def _prereq_weights(subjects, pre_reqs, seed):
+    """Peso de cada pré-requisito na nota da disciplina (fixo para todo o conjunto)."""
+    rng = np.random.default_rng(seed)
+    return {subject: rng.dirichlet(np.ones(len(pre_reqs[subject]))) for subject in subjects if subject in pre_reqs}
+
+
+def _generation_order(subjects, pre_reqs):
+    """Pré-requisitos antes das disciplinas que dependem deles.
+
+    Mantém ``subjects`` se ele já está em ordem topológica (mesmos sorteios,
+    mesmos dados para a mesma semente); senão usa a ordem do grafo.
+    """
+    position = {subject: i for i, subject in enumerate(subjects)}
+    if all(position[req] < position[subject] for subject, reqs in pre_reqs.items() for req in reqs):
+        return subjects
+    graph = PrerequisiteGraph(pre_reqs)
+    return [subject for subject in subjects if subject not in graph.index] + graph.order
+
+
+def generate_chunk(subjects, pre_reqs, weights, n_students, seed):
+    """Gera um bloco (n_students x disciplinas) de notas float32 correlacionadas.
+
+    Disciplinas sem pré-requisitos dependem só da habilidade latente do aluno;
+    as demais herdam uma combinação ponderada das notas dos pré-requisitos.
+    ``seed`` é um ``np.random.SeedSequence`` exclusivo do bloco.
+    """
+    rng = np.random.default_rng(seed)
+    column = {subject: i for i, subject in enumerate(subjects)}
+    ability = GRADE_MEAN + GRADE_SPREAD * rng.standard_normal(n_students, dtype=np.float32)
+    grades = np.full((n_students, len(subjects)), np.nan, dtype=np.float32)
+    for subject in _generation_order(subjects, pre_reqs):
+        noise = NOISE * rng.standard_normal(n_students, dtype=np.float32)
+        reqs = pre_reqs.get(subject)
+        if reqs:
+            inherited = grades[:, [column[req] for req in reqs]] @ weights[subject].astype(np.float32)
+            values = PREREQ_WEIGHT * inherited + (1 - PREREQ_WEIGHT) * ability + noise
+        else:
+            values = ability + noise
+        grades[:, column[subject]] = np.clip(values, 0.0, 10.0).round(1)
+    return grades
+
+
+def _chunk_sizes(n_students, chunk_size):
+    full, rest = divmod(n_students, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
+def iter_cohort(subjects, pre_reqs, n_students, seed=None, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1):
+    """Itera os blocos de notas em ordem, gerando-os em paralelo se ``jobs > 1``.
+
+    Cada bloco usa um filho de ``SeedSequence(seed)``, então o resultado é o
+    mesmo para qualquer ``jobs``. No máximo ``2 * jobs`` blocos ficam em memória.
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    weights_seed, chunks_seed = root.spawn(2)
+    weights = _prereq_weights(subjects, pre_reqs, weights_seed)
+    sizes = _chunk_sizes(n_students, chunk_size)
+    seeds = chunks_seed.spawn(len(sizes))
+
+    if jobs <= 1:
+        for size, chunk_seed in zip(sizes, seeds):
+            yield generate_chunk(subjects, pre_reqs, weights, size, chunk_seed)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = []
+        for size, chunk_seed in zip(sizes, seeds):
+            pending.append(pool.submit(generate_chunk, subjects, pre_reqs, weights, size, chunk_seed))
+            if len(pending) >= 2 * jobs:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _student_ids(start, size):
+    return [f"Aluno_{i + 1}" for i in range(start, start + size)]
+
+
+def write_cohort(path, subjects, pre_reqs, n_students, seed=None, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1):
+    """Grava um conjunto sintético direto em disco, bloco a bloco.
+
+    - ``.parquet``: uma coluna ``Aluno`` e uma por disciplina (um row group por bloco).
+    - ``.npy``: matriz float32 (alunos x disciplinas) via memmap; a ordem das
+      colunas fica em ``<nome>.subjects.json``.
+
+    Sempre grava ``<nome>.prereqs.json`` ao lado, lido por ``loader.load_gradebook``.
+    Retorna o caminho do arquivo de notas.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    chunks = iter_cohort(subjects, pre_reqs, n_students, seed=seed, chunk_size=chunk_size, jobs=jobs)
+    suffix = path.suffix.lower()
+
+    if suffix == ".npy":
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n_students, len(subjects)))
+        offset = 0
+        for grades in chunks:
+            out[offset:offset + len(grades)] = grades
+            offset += len(grades)
+        out.flush()
+        del out
+    elif suffix in (".parquet", ".pq"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([("Aluno", pa.string())] + [(s, pa.float32()) for s in subjects])
+        with pq.ParquetWriter(path, schema) as writer:
+            offset = 0
+            for grades in chunks:
+                arrays = [pa.array(_student_ids(offset, len(grades)), type=pa.string())]
+                arrays += [pa.array(grades[:, i]) for i in range(len(subjects))]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                offset += len(grades)
+    else:
+        raise ValueError(f"Formato não suportado: {path.suffix} (use .parquet ou .npy)")
+
+    with open(default_prereqs_path(path), "w", encoding="utf-8") as fh:
+        json.dump(pre_reqs, fh, ensure_ascii=False, indent=2)
+    if suffix == ".npy":
+        with open(subjects_path(path), "w", encoding="utf-8") as fh:
+            json.dump(subjects, fh, ensure_ascii=False, indent=2)
+    return path
+
+
+def generate_data(n_students, n_subjects, n_layers=4, max_prereqs=3, seed=None, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1):
+    """Gera um DataFrame sintético em memória com currículo aleatório.
+
+    Retorna ``(df, pre_reqs)``, o mesmo contrato de ``create_data``.
+    """
+    curriculum_seed, grades_seed = np.random.SeedSequence(seed).spawn(2)
+    subjects, pre_reqs = random_curriculum(n_subjects, n_layers, max_prereqs, seed=curriculum_seed)
+    return _to_frame(subjects, pre_reqs, n_students, grades_seed, chunk_size, jobs), pre_reqs
+
+
+def _grade_array(subjects, pre_reqs, n_students, seed, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1):
+    # Ordem de coluna: o leiaute do grades.GradeMatrix, que então usa o array sem copiar
+    grades = np.empty((n_students, len(subjects)), dtype=np.float32, order="F")
+    offset = 0
+    for chunk in iter_cohort(subjects, pre_reqs, n_students, seed=seed, chunk_size=chunk_size, jobs=jobs):
+        grades[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    return grades
+
+
+def _to_frame(subjects, pre_reqs, n_students, seed, chunk_size=DEFAULT_CHUNK_SIZE, jobs=1):
+    grades = _grade_array(subjects, pre_reqs, n_students, seed, chunk_size, jobs)
+    df = pd.DataFrame(grades, columns=subjects, copy=False)
+    df.insert(0, "Aluno", _student_ids(0, n_students))
+    return df
+
+
+def create_data(seed=None, n_students=50):
+    """Turma fictícia com o currículo padrão de matemática (8 disciplinas)."""
+    return _to_frame(DEFAULT_SUBJECTS, DEFAULT_PRE_REQS, n_students, seed), {
+        subject: list(reqs) for subject, reqs in DEFAULT_PRE_REQS.items()
     }
-    pre_reqs = {
-        "Frações": ["Números Inteiros"],
-        "Equações": ["Números Inteiros", "Frações"],
-        "Geometria Básica": ["Números Inteiros", "Frações"],
-        "Funções": ["Equações"],
-        "Trigonometria": ["Geometria Básica", "Equações"],
-        "Probabilidade": ["Frações", "Equações"],
-        "Estatística": ["Frações", "Probabilidade"],
+
+
+def create_grade_matrix(seed=None, n_students=50):
+    """``create_data`` direto em uma ``grades.GradeMatrix`` (sem DataFrame intermediário)."""
+    grades = _grade_array(DEFAULT_SUBJECTS, DEFAULT_PRE_REQS, n_students, seed)
+    return GradeMatrix(grades, _student_ids(0, n_students), DEFAULT_SUBJECTS), {
+        subject: list(reqs) for subject, reqs in DEFAULT_PRE_REQS.items()
     }
-    return pd.DataFrame(data), pre_reqs
\ No newline at end of file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera conjuntos sintéticos de notas para o SIDA")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--subjects", type=int, default=8)
+    parser.add_argument("--layers", type=int, default=4, help="Profundidade do DAG de pré-requisitos")
+    parser.add_argument("--max-prereqs", type=int, default=3, help="Máximo de pré-requisitos por disciplina")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--jobs", type=int, default=1, help="Processos para gerar os blocos em paralelo")
+    parser.add_argument("--out", required=True, help="Arquivo de saída (.parquet ou .npy)")
+    args = parser.parse_args()
+
+    curriculum_seed, grades_seed = np.random.SeedSequence(args.seed).spawn(2)
+    subjects, pre_reqs = random_curriculum(args.subjects, args.layers, args.max_prereqs, seed=curriculum_seed)
+    path = write_cohort(
+        args.out, subjects, pre_reqs, args.students,
+        seed=grades_seed, chunk_size=args.chunk_size, jobs=args.jobs,
+    )
+    print(f"{args.students} alunos x {args.subjects} disciplinas gravados em {path}")
+
+
+if __name__ == "__main__":
+    main()
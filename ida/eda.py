@@ -1,11 +1,207 @@
+import html
 from pathlib import Path
 
+import numpy as np
 
-def gerar_eda(df, saida_html: str) -> str:
-    """Gera um relatório EDA em HTML usando ydata-profiling.
+from grades import GradeMatrix
 
+MODOS = ("fast", "deep")
+QUANTIS = (0.0, 0.05, 0.25, 0.5, 0.75, 0.95, 1.0)
+MAX_AMOSTRA = 200_000
+BLOCO = 100_000
+
+
+def amostra_estratificada(media_linha, n, estratos=10, seed=0):
+    """Índices de uma amostra de ``n`` linhas estratificada pelo desempenho médio do aluno.
+
+    As linhas são divididas em faixas (quantis de ``media_linha``) e cada faixa
+    contribui proporcionalmente ao seu tamanho, preservando as caudas. Linhas
+    sem nenhuma nota (média NaN) formam um estrato próprio.
+    """
+    total = len(media_linha)
+    if total <= n:
+        return np.arange(total)
+    rng = np.random.default_rng(seed)
+    definida = ~np.isnan(media_linha)
+    cortes = np.quantile(media_linha[definida], np.linspace(0, 1, estratos + 1)[1:-1]) if definida.any() else []
+    estrato = np.where(definida, np.searchsorted(cortes, media_linha), -1)
+    indices = []
+    for k in np.unique(estrato):
+        membros = np.flatnonzero(estrato == k)
+        tamanho = max(1, int(round(n * len(membros) / total)))
+        indices.append(rng.choice(membros, size=min(tamanho, len(membros)), replace=False))
+    return np.sort(np.concatenate(indices))
+
+
+def _quantis(S):
+    """Quantis por coluna ignorando NaN, sem laço por coluna (ordenação + interpolação)."""
+    ordenado = np.sort(S, axis=0)  # NaN vão para o fim
+    validos = (~np.isnan(S)).sum(axis=0)
+    pos = np.outer(QUANTIS, np.maximum(validos - 1, 0))
+    baixo = np.floor(pos).astype(np.int64)
+    alto = np.minimum(baixo + 1, np.maximum(validos - 1, 0))
+    colunas = np.arange(S.shape[1])
+    frac = pos - baixo
+    resultado = ordenado[baixo, colunas] * (1 - frac) + ordenado[alto, colunas] * frac
+    return np.where(validos > 0, resultado, np.nan)
+
+
+def _histogramas(S, bins, minimo, maximo):
+    """Contagens por faixa de todas as colunas com um único ``bincount``."""
+    largura = np.where(maximo > minimo, maximo - minimo, 1.0)
+    finito = np.isfinite(S)
+    idx = np.floor((np.where(finito, S, minimo) - minimo) / largura * bins).astype(np.int64)
+    idx = np.clip(idx, 0, bins - 1) + np.arange(S.shape[1]) * bins
+    contagens = np.bincount(idx[finito], minlength=S.shape[1] * bins)
+    return contagens.reshape(S.shape[1], bins)
+
+
+def _correlacao(S):
+    """Pearson por pares de linhas completas, com quatro produtos matriciais (sem laço por par)."""
+    valido = (~np.isnan(S)).astype(np.float64)
+    Z = np.where(np.isnan(S), 0.0, S)
+    n = valido.T @ valido
+    soma = Z.T @ valido  # soma[i, j]: soma de i nas linhas em que j também existe
+    soma_q = (Z * Z).T @ valido
+    cruzado = Z.T @ Z
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * cruzado - soma * soma.T
+        return cov / np.sqrt((n * soma_q - soma ** 2) * (n * soma_q - soma ** 2).T)
+
+
+def resumo_rapido(df, max_amostra=MAX_AMOSTRA, bins=20, seed=0):
+    """Resumo vetorizado das colunas numéricas.
+
+    Contagens, faltantes, média, desvio, mínimo e máximo vêm de uma passada em
+    blocos sobre todas as linhas; quantis, histogramas e correlação usam uma
+    amostra estratificada de até ``max_amostra`` linhas. Com uma
+    ``grades.GradeMatrix``, os blocos são fatias do próprio array de notas.
+    """
+    if isinstance(df, GradeMatrix):
+        colunas, linhas = list(df.subjects), df.values
+    else:
+        colunas = list(df.select_dtypes(include="number").columns)
+        linhas = df[colunas].iloc
+    n = len(df)
+    k = len(colunas)
+    faltantes = np.zeros(k, dtype=np.int64)
+    soma = np.zeros(k)
+    soma_q = np.zeros(k)
+    minimo = np.full(k, np.inf)
+    maximo = np.full(k, -np.inf)
+    media_linha = np.empty(n)
+    for inicio in range(0, n, BLOCO):
+        bloco = np.asarray(linhas[inicio:inicio + BLOCO], dtype=np.float64)
+        nulo = np.isnan(bloco)
+        faltantes += nulo.sum(axis=0)
+        zerado = np.where(nulo, 0.0, bloco)
+        soma += zerado.sum(axis=0)
+        soma_q += (zerado * zerado).sum(axis=0)
+        minimo = np.minimum(minimo, np.where(nulo, np.inf, bloco).min(axis=0))
+        maximo = np.maximum(maximo, np.where(nulo, -np.inf, bloco).max(axis=0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media_linha[inicio:inicio + len(bloco)] = zerado.sum(axis=1) / (~nulo).sum(axis=1)
+
+    validos = n - faltantes
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = soma / validos
+        desvio = np.sqrt(np.maximum(soma_q / validos - media ** 2, 0) * validos / np.maximum(validos - 1, 1))
+
+    amostra = amostra_estratificada(media_linha, max_amostra, seed=seed)
+    X = np.asarray(linhas[amostra], dtype=np.float64)
+    minimo = np.where(np.isfinite(minimo), minimo, 0.0)
+    maximo = np.where(np.isfinite(maximo), maximo, 0.0)
+    return {
+        "linhas": n,
+        "amostra": len(X),
+        "colunas": colunas,
+        "faltantes": faltantes,
+        "media": media,
+        "desvio": desvio,
+        "minimo": minimo,
+        "maximo": maximo,
+        "quantis": _quantis(X),
+        "histogramas": _histogramas(X, bins, minimo, maximo),
+        "correlacao": _correlacao(X),
+    }
+
+
+def _fmt(valor):
+    return "—" if valor != valor else f"{valor:.3f}"
+
+
+def renderizar_html(resumo, titulo="EDA - Perfil do Dataset (rápido)"):
+    """HTML compacto e autocontido (sem JavaScript) a partir de ``resumo_rapido``."""
+    colunas = resumo["colunas"]
+    partes = [
+        "<!DOCTYPE html><html lang='pt-BR'><head><meta charset='utf-8'>",
+        f"<title>{html.escape(titulo)}</title><style>",
+        "body{font-family:sans-serif;margin:1.5em}table{border-collapse:collapse;font-size:13px}",
+        "td,th{border:1px solid #ddd;padding:3px 6px;text-align:right}th{background:#f3f3f3}",
+        ".h{display:flex;align-items:flex-end;height:28px;gap:1px}.h div{width:4px;background:#3b75af}",
+        "</style></head><body>",
+        f"<h1>{html.escape(titulo)}</h1>",
+        f"<p>{resumo['linhas']} linhas, {len(colunas)} colunas numéricas; "
+        f"quantis, histogramas e correlação sobre {resumo['amostra']} linhas.</p>",
+        "<h2>Variáveis</h2><table><tr><th>Coluna</th><th>Faltantes</th><th>Média</th><th>Desvio</th>",
+        "".join(f"<th>p{int(q * 100)}</th>" for q in QUANTIS),
+        "<th>Histograma</th></tr>",
+    ]
+    for i, coluna in enumerate(colunas):
+        contagens = resumo["histogramas"][i]
+        topo = max(int(contagens.max()), 1)
+        barras = "".join(f"<div style='height:{100 * c / topo:.0f}%'></div>" for c in contagens)
+        partes.append(
+            f"<tr><th>{html.escape(str(coluna))}</th><td>{resumo['faltantes'][i]}</td>"
+            f"<td>{_fmt(resumo['media'][i])}</td><td>{_fmt(resumo['desvio'][i])}</td>"
+            + "".join(f"<td>{_fmt(v)}</td>" for v in resumo["quantis"][:, i])
+            + f"<td><div class='h'>{barras}</div></td></tr>"
+        )
+    partes.append("</table><h2>Correlação (Pearson)</h2><table><tr><th></th>")
+    partes.append("".join(f"<th>{html.escape(str(c))}</th>" for c in colunas) + "</tr>")
+    for i, coluna in enumerate(colunas):
+        celulas = []
+        for valor in resumo["correlacao"][i]:
+            cor = "255,255,255" if valor != valor else ("59,117,175" if valor >= 0 else "200,80,60")
+            alfa = 0 if valor != valor else abs(valor)
+            celulas.append(f"<td style='background:rgba({cor},{alfa:.2f})'>{_fmt(valor)}</td>")
+        partes.append(f"<tr><th>{html.escape(str(coluna))}</th>{''.join(celulas)}</tr>")
+    partes.append("</table></body></html>")
+    return "".join(partes)
+
+
+def gerar_eda_rapida(df, saida_html: str, cache=None, chave_dados=None) -> str:
+    """Relatório EDA vetorizado (modo ``fast``); com ``cache``, reaproveita o HTML do mesmo dataset.
+
+    ``chave_dados`` (ex.: tamanho e mtime do arquivo de entrada) substitui o hash de ``df`` na chave.
+    """
+    saida_path = Path(saida_html)
+    saida_path.parent.mkdir(parents=True, exist_ok=True)
+    if cache is not None:
+        chave = cache.key("eda", df if chave_dados is None else chave_dados)
+        conteudo = cache.get_or_compute(chave, lambda: renderizar_html(resumo_rapido(df)))
+    else:
+        conteudo = renderizar_html(resumo_rapido(df))
+    saida_path.write_text(conteudo, encoding="utf-8")
+    return str(saida_path.resolve())
+
+
+def gerar_eda(df, saida_html: str, modo: str = "deep", cache=None, chave_dados=None) -> str:
+    """Gera um relatório EDA em HTML.
+
+    - ``fast``: resumo NumPy próprio (``gerar_eda_rapida``), em segundos mesmo com milhões de linhas.
+    - ``deep``: ydata-profiling completo; se falhar, cai no modo ``fast``.
+
+    ``df`` pode ser um DataFrame ou uma ``grades.GradeMatrix``.
     Retorna o caminho absoluto do arquivo salvo.
     """
+    if modo not in MODOS:
+        raise ValueError(f"Modo de EDA desconhecido: {modo} (use {', '.join(MODOS)})")
+    if modo == "fast":
+        return gerar_eda_rapida(df, saida_html, cache=cache, chave_dados=chave_dados)
+    if isinstance(df, GradeMatrix):
+        df = df.to_frame()
+
     try:
         from ydata_profiling import ProfileReport
     except Exception as exc:
@@ -14,8 +210,8 @@ def gerar_eda(df, saida_html: str) -> str:
     saida_path = Path(saida_html)
     saida_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Evita erros de WordCloud/Pillow removendo colunas de texto (ex.: "Aluno")
-    df_profile = df.select_dtypes(exclude=["object"]).copy()
+    # Evita erros de WordCloud/Pillow removendo colunas de texto (ex.: "Aluno", categórico no GradeMatrix)
+    df_profile = df.select_dtypes(exclude=["object", "category"]).copy()
     if df_profile.empty:
         # Se tudo era texto, volta ao original mas com amostra mínima
         df_profile = df.copy()
@@ -39,18 +235,8 @@ def gerar_eda(df, saida_html: str) -> str:
         )
         profile.to_file(str(saida_path))
     except Exception:
-        # Fallback ultra-minimalista se algo falhar (ex.: issue com Pillow/WordCloud)
-        profile = ProfileReport(
-            df_profile,
-            title="EDA - Perfil do Dataset (Minimal)",
-            explorative=False,
-            correlations={"pearson": {"calculate": False}},
-            interactions={"continuous": False},
-            duplicates={"head": 5},
-            samples={"head": 10},
-            missing_diagrams={"heatmap": False, "dendrogram": False},
-        )
-        profile.to_file(str(saida_path))
+        # Em vez de um segundo ProfileReport (que refaz todo o trabalho), usa o modo rápido
+        return gerar_eda_rapida(df, saida_html, cache=cache, chave_dados=chave_dados)
     return str(saida_path.resolve())
 
 
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+ID_COLUMN = "Aluno"
+
+
+class GradeMatrix:
+    """Notas em um único array float32 contíguo (alunos x disciplinas).
+
+    - ``values``: ``np.ndarray`` float32 em ordem de coluna (Fortran), o mesmo
+      leiaute do bloco de um DataFrame: cada disciplina é contígua;
+    - ``students``: ``pd.Categorical`` com os identificadores (cada nome guardado uma vez);
+    - ``subjects`` / ``index``: ordem das colunas e mapa disciplina -> coluna.
+
+    ``column`` e ``select`` de colunas consecutivas devolvem visões (sem cópia)
+    e ``to_frame`` monta um DataFrame que compartilha o mesmo array.
+    """
+
+    __slots__ = ("values", "students", "subjects", "index")
+
+    def __init__(self, values, students, subjects):
+        values = np.asfortranarray(values, dtype=np.float32)
+        subjects = [str(s) for s in subjects]
+        if values.ndim != 2 or values.shape[1] != len(subjects):
+            raise ValueError(
+                f"Formato das notas {values.shape} não corresponde a {len(subjects)} disciplinas"
+            )
+        if len(students) != len(values):
+            raise ValueError(f"{len(students)} alunos para {len(values)} linhas de notas")
+        self.values = values
+        self.students = students if isinstance(students, pd.Categorical) else pd.Categorical(students)
+        self.subjects = subjects
+        self.index = {subject: j for j, subject in enumerate(subjects)}
+
+    @classmethod
+    def from_frame(cls, df, id_col=ID_COLUMN, subjects=None):
+        """Converte um DataFrame (coluna de alunos + uma coluna por disciplina).
+
+        As notas são copiadas uma única vez para o array float32; a partir daí
+        o pipeline trabalha sobre visões dele (e sobre ``to_frame``).
+        """
+        if subjects is None:
+            subjects = [col for col in df.columns if col != id_col]
+        values = df[subjects].to_numpy(dtype=np.float32)
+        students = pd.Categorical(df[id_col] if id_col in df.columns else np.arange(len(df)))
+        return cls(values, students, subjects)
+
+    def to_frame(self, id_col=ID_COLUMN):
+        """DataFrame (alunos categóricos + notas float32) que compartilha ``values``."""
+        df = pd.DataFrame(self.values, columns=self.subjects, copy=False)
+        df.insert(0, id_col, self.students)
+        return df
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.students.codes.nbytes
+
+    def column(self, subject):
+        """Notas de uma disciplina (visão de ``values``)."""
+        return self.values[:, self.index[subject]]
+
+    def columns(self, subjects):
+        return [self.index[subject] for subject in subjects]
+
+    def select(self, subjects):
+        """Notas das disciplinas pedidas (alunos x len(subjects)).
+
+        Colunas consecutivas e em ordem viram uma visão contígua; as demais
+        exigem cópia só dessas colunas (nunca do array inteiro).
+        """
+        cols = self.columns(subjects)
+        if cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            return self.values[:, cols[0]:cols[0] + len(cols)]
+        return self.values[:, cols]
+
+    def subset(self, subjects):
+        """Nova ``GradeMatrix`` só com ``subjects`` (mesmos alunos)."""
+        return GradeMatrix(self.select(subjects), self.students, list(subjects))
+
+    def rows(self, mask):
+        """Nova ``GradeMatrix`` só com as linhas de ``mask`` (booleano ou índices)."""
+        return GradeMatrix(self.values[mask], self.students[mask], self.subjects)
+
+    def fingerprint_parts(self):
+        """Partes usadas por ``cache.fingerprint`` (notas, disciplinas e alunos)."""
+        return [self.values, self.subjects, pd.Series(self.students, copy=False)]
+
+
+def as_grade_matrix(data, subjects=None):
+    """Aceita ``GradeMatrix`` (devolvida como está) ou DataFrame.
+
+    ``subjects`` limita as colunas convertidas de um DataFrame (o restante,
+    como colunas de texto, é ignorado).
+    """
+    if isinstance(data, GradeMatrix):
+        return data
+    return GradeMatrix.from_frame(data, subjects=subjects)
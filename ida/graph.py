@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+
+class PrerequisiteGraph:
+    """Grafo de pré-requisitos construído a partir do dicionário ``pre_reqs``.
+
+    Valida que não há ciclos, calcula uma ordem topológica (pré-requisitos
+    antes das disciplinas que dependem deles) e pré-calcula o fecho
+    transitivo como matriz esparsa (disciplina x pré-requisito), guardando o
+    menor número de saltos entre os dois.
+    """
+
+    def __init__(self, pre_reqs):
+        self.pre_reqs = {subject: list(reqs) for subject, reqs in pre_reqs.items()}
+        nodes = dict.fromkeys(
+            node for subject, reqs in self.pre_reqs.items() for node in [*reqs, subject]
+        )
+        self.subjects = list(nodes)
+        self.index = {subject: i for i, subject in enumerate(self.subjects)}
+        self.order = self._topological_order()
+        self.hops = self._closure()
+
+    def __len__(self):
+        return len(self.subjects)
+
+    def _find_cycle(self):
+        state = {}
+        stack = []
+
+        def visit(node):
+            state[node] = "visiting"
+            stack.append(node)
+            for req in self.pre_reqs.get(node, []):
+                if state.get(req) == "visiting":
+                    return stack[stack.index(req):] + [req]
+                if req not in state:
+                    cycle = visit(req)
+                    if cycle:
+                        return cycle
+            stack.pop()
+            state[node] = "done"
+            return None
+
+        for node in self.subjects:
+            if node not in state:
+                cycle = visit(node)
+                if cycle:
+                    return cycle
+        return None
+
+    def _topological_order(self):
+        # Kahn: começa pelas disciplinas sem pré-requisitos
+        pending = {subject: len(set(self.pre_reqs.get(subject, []))) for subject in self.subjects}
+        dependents = {subject: [] for subject in self.subjects}
+        for subject, reqs in self.pre_reqs.items():
+            for req in set(reqs):
+                dependents[req].append(subject)
+
+        ready = [subject for subject in self.subjects if pending[subject] == 0]
+        order = []
+        while ready:
+            subject = ready.pop(0)
+            order.append(subject)
+            for dependent in dependents[subject]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(order) != len(self.subjects):
+            cycle = self._find_cycle()
+            raise ValueError("Ciclo no mapeamento de pré-requisitos: " + " -> ".join(cycle or []))
+        return order
+
+    def _closure(self):
+        """Matriz esparsa S x S com o menor número de saltos de cada disciplina a cada pré-requisito indireto."""
+        from scipy import sparse
+
+        reach = {}
+        for subject in self.order:
+            hops = {}
+            for req in self.pre_reqs.get(subject, []):
+                hops[req] = 1
+                for ancestor, distance in reach[req].items():
+                    if distance + 1 < hops.get(ancestor, np.inf):
+                        hops[ancestor] = distance + 1
+            reach[subject] = hops
+
+        rows, cols, data = [], [], []
+        for subject, hops in reach.items():
+            for ancestor, distance in hops.items():
+                rows.append(self.index[subject])
+                cols.append(self.index[ancestor])
+                data.append(distance)
+        size = len(self.subjects)
+        return sparse.csr_matrix((data, (rows, cols)), shape=(size, size), dtype=np.int32)
+
+    def ancestors(self, subject):
+        """Pré-requisitos diretos e indiretos de ``subject`` com a distância em saltos."""
+        row = self.hops.getrow(self.index[subject])
+        return {self.subjects[col]: int(dist) for col, dist in zip(row.indices, row.data)}
+
+    def _within(self, max_hops):
+        hops = self.hops.copy()
+        if max_hops is not None:
+            hops.data[hops.data > max_hops] = 0
+            hops.eliminate_zeros()
+        return hops
+
+    def reachability(self, max_hops=None):
+        """Matriz esparsa booleana: ``[s, p]`` é verdadeiro se ``p`` é pré-requisito (in)direto de ``s``."""
+        return self._within(max_hops).astype(bool)
+
+    def root_cause_weights(self, decay=0.5, max_hops=None):
+        """Pesos ``decay ** (saltos - 1)`` para cada par (disciplina, pré-requisito alcançável)."""
+        weights = self._within(max_hops).astype(np.float64)
+        weights.data = np.power(decay, weights.data - 1)
+        return weights
+
+    def root_cause_scores(self, df, threshold=5.0, decay=0.5, max_hops=None):
+        """Pontuação de causa-raiz de cada disciplina para todos os alunos.
+
+        O déficit de cada aluno (quanto falta para o limiar em cada disciplina)
+        é propagado para os pré-requisitos diretos e indiretos com um único
+        produto de matrizes contra o fecho transitivo ponderado. Disciplinas
+        do grafo ausentes em ``df`` contam como sem déficit.
+        """
+        present = [subject for subject in self.subjects if subject in df.columns]
+        grades = df[present].to_numpy(dtype=np.float64)
+        deficit = np.zeros((len(df), len(self.subjects)))
+        deficit[:, [self.index[s] for s in present]] = np.clip(threshold - grades, 0.0, None)
+        weights = self.root_cause_weights(decay, max_hops)
+        scores = np.asarray((weights.T @ deficit.T).T)
+        return pd.DataFrame(scores, index=df.index, columns=self.subjects)
+
+    def multi_hop_importances(self, importance_table, max_hops=2):
+        """Estende a tabela de importâncias para pré-requisitos até ``max_hops`` saltos.
+
+        A importância de um pré-requisito indireto é o maior produto das
+        importâncias ao longo de um caminho (ex.: Estatística <- Probabilidade
+        <- Equações). Pares sem caminho ficam como NaN, como em
+        ``prerequisite_issues.build_importance_table``.
+        """
+        size = len(self.subjects)
+        direct = np.zeros((size, size))
+        linked = np.zeros((size, size), dtype=bool)
+        for subject in importance_table.index:
+            for req, imp in importance_table.loc[subject].dropna().items():
+                direct[self.index[subject], self.index[req]] = imp
+                linked[self.index[subject], self.index[req]] = True
+
+        best = direct.copy()
+        reached = linked.copy()
+        for _ in range(max_hops - 1):
+            # Produto max-produto: melhor caminho s -> p (direto) seguido de p -> q (já calculado)
+            via = np.zeros_like(best)
+            via_reached = np.zeros_like(reached)
+            for row in np.flatnonzero(linked.any(axis=1)):
+                reqs = np.flatnonzero(linked[row])
+                via[row] = (direct[row, reqs, None] * best[reqs]).max(axis=0)
+                via_reached[row] = reached[reqs].any(axis=0)
+            best = np.where(reached, np.maximum(best, via), via)
+            reached |= via_reached
+
+        table = pd.DataFrame(np.where(reached, best, np.nan), index=self.subjects, columns=self.subjects)
+        columns = [subject for subject in self.order if reached[:, self.index[subject]].any()]
+        return table.loc[list(importance_table.index), columns]
@@ -0,0 +1,286 @@
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import timings
+from loader import GRADE_MAX, GRADE_MIN
+from prerequisite_issues import fit_subjects, recommend_prerequisites, recommendation_table
+
+STATE_PATH = Path(__file__).parent / "results" / "state"
+DEFAULT_DRIFT_TOLERANCE = 0.05
+
+# Partes do estado (um arquivo cada, dentro de STATE_PATH)
+META_FILE = "meta.pkl"
+GRADES_FILE = "grades.npy"
+STUDENTS_FILE = "students.pkl"
+RECOMMENDATIONS_FILE = "recommendations.pkl"
+SUBJECTS_DIR = "subjects"
+
+
+def _atomic_write(path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _dump(obj, path):
+    _atomic_write(path, lambda fh: pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _subject_path(path, pre_reqs, subject):
+    # Nome pela posição no mapeamento (nomes de disciplina têm acentos e espaços)
+    return path / SUBJECTS_DIR / f"{list(pre_reqs).index(subject):04d}.pkl"
+
+
+def save_state(state, path=STATE_PATH, changes=None):
+    """Grava o estado da última execução em partes: notas, alunos, recomendações,
+    um arquivo por disciplina (modelos, métricas e importâncias) e os metadados.
+
+    Sem ``changes`` (execução completa) grava tudo. Com ``changes`` (de
+    ``update_state``) regrava só o que mudou: as linhas alteradas das notas
+    direto no arquivo (mapeado em memória), as disciplinas retreinadas e as
+    recomendações quando houve recálculo. Alunos novos regravam as notas e a
+    lista de alunos. Os metadados são gravados por último.
+    """
+    path = Path(path)
+    df, pre_reqs, fitted = state["df"], state["pre_reqs"], state["fitted"]
+    subjects = [col for col in df.columns if col != "Aluno"]
+    full = changes is None or not (path / META_FILE).exists()
+
+    grades_path = path / GRADES_FILE
+    if full or changes["appended"]:
+        values = df[subjects].to_numpy()
+        _atomic_write(grades_path, lambda fh: np.save(fh, values))
+        _dump(df["Aluno"], path / STUDENTS_FILE)
+    elif len(changes["rows"]):
+        rows = np.asarray(changes["rows"])
+        stored = np.load(grades_path, mmap_mode="r+")
+        stored[rows] = df[subjects].iloc[rows].to_numpy(dtype=stored.dtype)
+        stored.flush()
+        del stored
+
+    if full or changes["recommendations"]:
+        _dump(state["recommendations"], path / RECOMMENDATIONS_FILE)
+    for subject in (pre_reqs if full else changes["subjects"]):
+        _dump(
+            {key: values[subject] for key, values in fitted.items() if subject in values},
+            _subject_path(path, pre_reqs, subject),
+        )
+    _dump({
+        "pre_reqs": pre_reqs, "params": state["params"], "drift": state["drift"],
+        "subjects": subjects, "fitted_keys": list(fitted),
+    }, path / META_FILE)
+    return path
+
+
+def load_state(path=STATE_PATH):
+    path = Path(path)
+    if not (path / META_FILE).exists():
+        raise FileNotFoundError(
+            f"Estado não encontrado em {path}; rode uma execução completa com --save antes de --update"
+        )
+    with open(path / META_FILE, "rb") as fh:
+        meta = pickle.load(fh)
+    with open(path / STUDENTS_FILE, "rb") as fh:
+        students = pickle.load(fh)
+    with open(path / RECOMMENDATIONS_FILE, "rb") as fh:
+        recommendations = pickle.load(fh)
+    df = pd.DataFrame(np.load(path / GRADES_FILE), columns=meta["subjects"], copy=False)
+    df.insert(0, "Aluno", students.reset_index(drop=True))
+    pre_reqs = meta["pre_reqs"]
+    fitted = {key: {} for key in meta["fitted_keys"]}
+    for subject in pre_reqs:
+        with open(_subject_path(path, pre_reqs, subject), "rb") as fh:
+            for key, value in pickle.load(fh).items():
+                fitted[key][subject] = value
+    return {
+        "df": df,
+        "pre_reqs": pre_reqs,
+        "fitted": fitted,
+        "recommendations": recommendations,
+        "params": meta["params"],
+        "drift": meta["drift"],
+    }
+
+
+def build_state(df, pre_reqs, fitted, recommendations, params):
+    """Monta o estado persistido ao fim de uma execução completa.
+
+    ``drift`` conta, por disciplina, as linhas alteradas desde o último treino.
+    """
+    return {
+        "df": df,
+        "pre_reqs": pre_reqs,
+        "fitted": fitted,
+        "recommendations": recommendations,
+        "params": params,
+        "drift": {subject: 0 for subject in pre_reqs},
+    }
+
+
+def load_delta(path, id_col="Aluno"):
+    """Lê o arquivo de alterações: ``Aluno`` e as disciplinas alteradas.
+
+    Células vazias significam "sem alteração". Aceita CSV (``,`` ou ``;``) e Parquet.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        delta = pd.read_parquet(path)
+    else:
+        with open(path, encoding="utf-8-sig") as fh:
+            header = fh.readline()
+        sep, decimal = (";", ",") if ";" in header else (",", ".")
+        delta = pd.read_csv(path, sep=sep, decimal=decimal, dtype={id_col: str}, encoding="utf-8-sig")
+    if id_col not in delta.columns:
+        raise ValueError(f"{path}: coluna '{id_col}' ausente no arquivo de alterações")
+
+    grades = delta.drop(columns=[id_col]).astype(np.float32)
+    values = grades.to_numpy()
+    invalid = ~np.isnan(values) & ((values < GRADE_MIN) | (values > GRADE_MAX))
+    if invalid.any():
+        row, col = np.argwhere(invalid)[0]
+        raise ValueError(
+            f"{path}: nota inválida na linha {row + 1}, coluna '{grades.columns[col]}': {float(values[row, col])}"
+        )
+    grades.insert(0, id_col, delta[id_col].astype(str).to_numpy())
+    return grades.drop_duplicates(subset=id_col, keep="last")
+
+
+def apply_delta(df, delta):
+    """Aplica as alterações sobre as notas atuais.
+
+    Retorna o novo DataFrame (alunos novos ao final) e uma máscara booleana
+    (linhas x disciplinas) do que mudou de fato.
+    """
+    unknown = [col for col in delta.columns if col != "Aluno" and col not in df.columns]
+    if unknown:
+        raise ValueError(f"Disciplinas desconhecidas no arquivo de alterações: {unknown}")
+
+    subjects = [col for col in df.columns if col != "Aluno"]
+    students = pd.Index(df["Aluno"].astype(str))
+    new_ids = delta.loc[~delta["Aluno"].isin(students), "Aluno"]
+    if len(new_ids):
+        # Colunas ausentes no arquivo contam como notas faltantes
+        missing = delta.loc[delta["Aluno"].isin(new_ids)].reindex(columns=subjects).isna().any(axis=1)
+        if missing.any():
+            raise ValueError("Alunos novos precisam de todas as notas: " + ", ".join(new_ids[missing.to_numpy()][:5]))
+
+    grades = df[subjects].to_numpy(copy=True)
+    if len(new_ids):
+        grades = np.vstack([grades, np.full((len(new_ids), len(subjects)), np.nan, dtype=grades.dtype)])
+        students = students.append(pd.Index(new_ids))
+
+    rows = students.get_indexer(delta["Aluno"])
+    changed = np.zeros(grades.shape, dtype=bool)
+    for col in delta.columns.drop("Aluno"):
+        j = subjects.index(col)
+        values = delta[col].to_numpy()
+        given = ~np.isnan(values)
+        target = rows[given]
+        moved = grades[target, j] != values[given]
+        grades[target[moved], j] = values[given][moved]
+        changed[target[moved], j] = True
+
+    updated = pd.DataFrame(grades, columns=subjects, copy=False)
+    aluno = df["Aluno"]
+    if isinstance(aluno.dtype, pd.CategoricalDtype):
+        updated.insert(0, "Aluno", pd.Categorical(students, categories=aluno.cat.categories.union(new_ids)))
+    else:
+        updated.insert(0, "Aluno", students.to_numpy())
+    return updated, changed
+
+
+def update_state(state, delta, drift_tolerance=DEFAULT_DRIFT_TOLERANCE, jobs=1):
+    """Atualiza o estado com um arquivo de alterações, sem refazer o que não mudou.
+
+    - Disciplinas são retreinadas só quando a fração de linhas alteradas
+      desde o último treino (em qualquer coluna usada por elas) passa de
+      ``drift_tolerance``.
+    - Recomendações são recalculadas só para alunos alterados e, quando há
+      retreino, para os alunos abaixo do limiar nas disciplinas cujas linhas
+      da tabela de importâncias mudaram (com ``hops > 1``, inclui as que
+      dependem das retreinadas por vários saltos).
+    - As tabelas de recomendações e métricas são corrigidas no lugar.
+
+    Retorna o novo estado e um resumo do que foi refeito.
+    """
+    params = state["params"]
+    pre_reqs = state["pre_reqs"]
+    df, changed = apply_delta(state["df"], delta)
+    subjects = [col for col in df.columns if col != "Aluno"]
+    column = {subject: j for j, subject in enumerate(subjects)}
+
+    drift = dict(state["drift"])
+    refit = []
+    for subject, reqs in pre_reqs.items():
+        cols = [column[c] for c in [subject, *reqs]]
+        drift[subject] += int(changed[:, cols].any(axis=1).sum())
+        if drift[subject] > drift_tolerance * len(df):
+            refit.append(subject)
+
+    fitted = {key: dict(value) for key, value in state["fitted"].items()}
+    if refit:
+        with timings.stage("fit_subjects", subjects=len(refit), rows=len(df)):
+            partial = fit_subjects(
+                df, {subject: pre_reqs[subject] for subject in refit},
+                jobs=jobs, cv=params.get("cv"), repeats=params.get("repeats", 1),
+                backend=params.get("backend", "exact"), tuned=params.get("tuned"),
+            )
+        for key in fitted:
+            fitted[key].update(partial[key])
+        for subject in refit:
+            drift[subject] = 0
+
+    threshold = params["threshold"]
+    hops = params.get("hops", 1)
+    importance_table = recommendation_table(fitted["importances"], pre_reqs, hops)
+    affected = changed.any(axis=1)
+    if refit:
+        # Disciplinas cujas importâncias mudaram: as retreinadas e, com --hops > 1,
+        # as que chegam a elas por caminhos de vários saltos
+        previous_table = recommendation_table(state["fitted"]["importances"], pre_reqs, hops)
+        columns = importance_table.columns.union(previous_table.columns)
+        new_rows = importance_table.reindex(index=importance_table.index, columns=columns, fill_value=0.0)
+        old_rows = previous_table.reindex(index=importance_table.index, columns=columns, fill_value=0.0)
+        moved = new_rows.index[(new_rows.to_numpy() != old_rows.to_numpy()).any(axis=1)]
+        if len(moved):
+            values = df[list(moved)].to_numpy()
+            affected |= (values < values.dtype.type(threshold)).any(axis=1)
+
+    with timings.stage("recommend_prerequisites", rows=int(affected.sum())):
+        fresh = recommend_prerequisites(
+            df[affected], importance_table, threshold=threshold, top_n=params.get("top_n"),
+        )
+
+    # Substitui as linhas dos alunos afetados e mantém a ordem dos alunos no DataFrame
+    ids = df["Aluno"].astype(str)
+    previous = state["recommendations"]
+    kept = previous[~previous["Aluno"].astype(str).isin(ids[affected])]
+    recommendations = pd.concat([kept, fresh], ignore_index=True)
+    position = pd.Index(ids).get_indexer(recommendations["Aluno"].astype(str))
+    recommendations = recommendations.iloc[np.argsort(position, kind="stable")].reset_index(drop=True)
+
+    new_state = dict(state, df=df, fitted=fitted, recommendations=recommendations, drift=drift)
+    summary = {
+        "students_changed": int(changed.any(axis=1).sum()),
+        "students_recomputed": int(affected.sum()),
+        "subjects_refit": refit,
+        # O que ``save_state`` precisa regravar
+        "changes": {
+            "rows": np.flatnonzero(changed.any(axis=1)),
+            "appended": len(df) != len(state["df"]),
+            "subjects": refit,
+            "recommendations": bool(affected.any()),
+        },
+    }
+    return new_state, summary
@@ -0,0 +1,211 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from grades import GradeMatrix
+
+GRADE_MIN = 0.0
+GRADE_MAX = 10.0
+DEFAULT_CHUNKSIZE = 100_000
+ID_COLUMN = "Aluno"
+
+
+def default_prereqs_path(path):
+    """Arquivo de pré-requisitos esperado ao lado da planilha (ex.: notas.prereqs.json)."""
+    path = Path(path)
+    return path.with_name(path.name.split(".")[0] + ".prereqs.json")
+
+
+def subjects_path(path):
+    """Ordem das colunas de uma matriz ``.npy`` (ex.: notas.subjects.json), ao lado dela."""
+    path = Path(path)
+    return path.with_name(path.name.split(".")[0] + ".subjects.json")
+
+
+def load_prereqs(path):
+    """Lê o mapeamento disciplina -> pré-requisitos.
+
+    Aceita JSON (``{"Disciplina": ["Pré-requisito", ...]}``) ou CSV com as
+    colunas ``Disciplina`` e ``Pré-requisito`` (uma linha por par).
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with open(path, encoding="utf-8") as fh:
+            raw = json.load(fh)
+        return {str(subject): [str(req) for req in reqs] for subject, reqs in raw.items()}
+
+    pairs = pd.read_csv(path, sep=None, engine="python", encoding="utf-8-sig", dtype=str)
+    missing = {"Disciplina", "Pré-requisito"} - set(pairs.columns)
+    if missing:
+        raise ValueError(f"{path}: colunas ausentes no mapeamento de pré-requisitos: {sorted(missing)}")
+    pre_reqs = {}
+    for subject, req in pairs[["Disciplina", "Pré-requisito"]].itertuples(index=False):
+        pre_reqs.setdefault(subject, []).append(req)
+    return pre_reqs
+
+
+def _is_parquet(path):
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def _is_npy(path):
+    return Path(path).suffix.lower() == ".npy"
+
+
+def _npy_subjects(path):
+    columns_path = subjects_path(path)
+    if not columns_path.exists():
+        raise FileNotFoundError(f"Ordem das colunas não encontrada: {columns_path}")
+    with open(columns_path, encoding="utf-8") as fh:
+        return [str(subject) for subject in json.load(fh)]
+
+
+def _csv_dialect(path):
+    """Detecta o formato pt-BR (``;`` e decimal ``,``) pelo cabeçalho."""
+    with open(path, encoding="utf-8-sig") as fh:
+        header = fh.readline()
+    if ";" in header:
+        return ";", ","
+    return ",", "."
+
+
+def _count_rows(path):
+    """Conta as linhas de dados de um CSV lendo blocos binários (sem parsear)."""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def _read_columns(path, id_col=ID_COLUMN):
+    if _is_npy(path):
+        # A matriz só tem notas; os alunos são numerados pela linha
+        return [id_col, *_npy_subjects(path)]
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        return list(pq.ParquetFile(path).schema_arrow.names)
+    sep, _ = _csv_dialect(path)
+    return list(pd.read_csv(path, sep=sep, nrows=0, encoding="utf-8-sig").columns)
+
+
+def iter_gradebook(path, subjects, id_col=ID_COLUMN, chunksize=DEFAULT_CHUNKSIZE):
+    """Itera a planilha em blocos com apenas as colunas necessárias.
+
+    As notas já chegam como float32 e o identificador como texto. Em ``.npy``
+    (``data.write_cohort``) a matriz é mapeada em memória e os alunos são
+    ``Aluno_1``, ``Aluno_2``... pela linha.
+    """
+    if _is_npy(path):
+        matrix = np.load(path, mmap_mode="r")
+        positions = {subject: j for j, subject in enumerate(_npy_subjects(path))}
+        columns = [positions[subject] for subject in subjects]
+        for start in range(0, len(matrix), chunksize):
+            block = matrix[start:start + chunksize]
+            chunk = pd.DataFrame(block[:, columns].astype(np.float32, copy=False), columns=subjects, copy=False)
+            chunk.insert(0, id_col, [f"Aluno_{i + 1}" for i in range(start, start + len(block))])
+            yield chunk
+        return
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=[id_col, *subjects]):
+            chunk = batch.to_pandas()
+            chunk[subjects] = chunk[subjects].astype(np.float32)
+            yield chunk
+        return
+
+    sep, decimal = _csv_dialect(path)
+    dtypes = {subject: np.float32 for subject in subjects}
+    dtypes[id_col] = str
+    yield from pd.read_csv(
+        path,
+        sep=sep,
+        decimal=decimal,
+        usecols=[id_col, *subjects],
+        dtype=dtypes,
+        chunksize=chunksize,
+        encoding="utf-8-sig",
+    )
+
+
+def validate_chunk(chunk, subjects, offset, path):
+    """Garante notas presentes e dentro de [GRADE_MIN, GRADE_MAX] no bloco."""
+    values = chunk[subjects].to_numpy()
+    invalid = np.isnan(values) | (values < GRADE_MIN) | (values > GRADE_MAX)
+    if invalid.any():
+        row, col = np.argwhere(invalid)[0]
+        raise ValueError(
+            f"{path}: nota inválida na linha {offset + row + 1}, coluna '{subjects[col]}': "
+            f"{float(values[row, col])} (esperado entre {GRADE_MIN} e {GRADE_MAX})"
+        )
+
+
+def load_gradebook(path, prereqs_path=None, id_col=ID_COLUMN, chunksize=DEFAULT_CHUNKSIZE):
+    """Carrega uma planilha real de notas (CSV, Parquet ou ``.npy``) em blocos.
+
+    Uma linha por aluno e uma coluna por disciplina. As notas são validadas
+    bloco a bloco e gravadas em um único array float32 pré-alocado; os alunos
+    viram uma coluna categórica. Retorna ``(df, pre_reqs)``, o mesmo contrato
+    de ``data.create_data``.
+    """
+    grades, pre_reqs = load_grade_matrix(path, prereqs_path, id_col=id_col, chunksize=chunksize)
+    return grades.to_frame(), pre_reqs
+
+
+def load_grade_matrix(path, prereqs_path=None, id_col=ID_COLUMN, chunksize=DEFAULT_CHUNKSIZE):
+    """``load_gradebook`` direto em uma ``grades.GradeMatrix``: o array lido é o da matriz, sem cópia."""
+    path = Path(path)
+    prereqs_path = Path(prereqs_path) if prereqs_path else default_prereqs_path(path)
+    if not prereqs_path.exists():
+        raise FileNotFoundError(
+            f"Mapeamento de pré-requisitos não encontrado: {prereqs_path} (use --prereqs)"
+        )
+    pre_reqs = load_prereqs(prereqs_path)
+
+    columns = _read_columns(path, id_col)
+    subjects = list(dict.fromkeys(
+        col for subject, reqs in pre_reqs.items() for col in [subject, *reqs]
+    ))
+    missing = [col for col in [id_col, *subjects] if col not in columns]
+    if missing:
+        raise ValueError(f"{path}: colunas ausentes na planilha: {missing}")
+
+    if _is_npy(path):
+        n_rows = np.load(path, mmap_mode="r").shape[0]
+    elif _is_parquet(path):
+        import pyarrow.parquet as pq
+
+        n_rows = pq.ParquetFile(path).metadata.num_rows
+    else:
+        n_rows = _count_rows(path)
+
+    # Ordem de coluna, o leiaute do GradeMatrix
+    grades = np.empty((n_rows, len(subjects)), dtype=np.float32, order="F")
+    ids = []
+    offset = 0
+    for chunk in iter_gradebook(path, subjects, id_col=id_col, chunksize=chunksize):
+        validate_chunk(chunk, subjects, offset, path)
+        end = offset + len(chunk)
+        if end > len(grades):
+            # Contagem prévia subestimou (ex.: quebras de linha entre aspas)
+            grown = np.empty((max(end, 2 * len(grades)), len(subjects)), dtype=np.float32, order="F")
+            grown[:offset] = grades[:offset]
+            grades = grown
+        grades[offset:end] = chunk[subjects].to_numpy()
+        ids.append(pd.Categorical(chunk[id_col].astype(str)))
+        offset = end
+    if offset < len(grades):
+        grades = np.asfortranarray(grades[:offset])
+
+    students = union_categoricals(ids) if ids else pd.Categorical([])
+    return GradeMatrix(grades, students, subjects), pre_reqs
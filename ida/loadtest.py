@@ -0,0 +1,86 @@
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from incremental import STATE_PATH, load_state
+
+
+def build_payloads(state_path, n, batch_size, seed=0):
+    """Monta ``n`` corpos de requisição com alunos sorteados do estado salvo."""
+    df = load_state(state_path)["df"]
+    subjects = [col for col in df.columns if col != "Aluno"]
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for i in range(n):
+        rows = df.iloc[rng.integers(0, len(df), batch_size)]
+        alunos = [
+            {"Aluno": f"teste_{i}_{j}", **{s: float(v) for s, v in zip(subjects, values)}}
+            for j, values in enumerate(rows[subjects].to_numpy())
+        ]
+        payloads.append(json.dumps({"alunos": alunos}).encode("utf-8"))
+    return payloads
+
+
+def run(url, payloads, concurrency):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    cursor = iter(payloads)
+
+    def worker():
+        while True:
+            with lock:
+                body = next(cursor, None)
+            if body is None:
+                return
+            req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req) as resp:
+                    resp.read()
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de recomendações (service.py)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/score")
+    parser.add_argument("--state", default=str(STATE_PATH))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=1, help="Alunos por requisição")
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.state, args.requests, args.batch_size)
+    latencies, errors, elapsed = run(args.url, payloads, args.concurrency)
+    if latencies.size == 0:
+        print(f"Nenhuma requisição bem-sucedida ({len(errors)} erros): {errors[:1]}")
+        return
+    ms = latencies * 1000
+    print(f"Requisições: {latencies.size} ok, {len(errors)} erros em {elapsed:.2f}s")
+    print(f"Vazão: {latencies.size / elapsed:.1f} req/s ({latencies.size * args.batch_size / elapsed:.1f} alunos/s)")
+    print(
+        "Latência (ms): p50={:.2f} p95={:.2f} p99={:.2f} máx={:.2f}".format(
+            *np.percentile(ms, [50, 95, 99]), ms.max()
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,40 @@
 import argparse
 from pathlib import Path
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from data import create_data
-from prerequisite_issues import identify_prerequisite_issues
-from output import gerar_csv
+from cache import DEFAULT_MAX_BYTES, StageCache
+from data import create_grade_matrix
+from grades import GradeMatrix
+from graph import PrerequisiteGraph
+from incremental import DEFAULT_DRIFT_TOLERANCE, build_state, load_delta, load_state, save_state, update_state
+from loader import DEFAULT_CHUNKSIZE, default_prereqs_path, load_grade_matrix
+import timings
+from models import BACKENDS, resolve_backend
+from prerequisite_issues import identify_prerequisite_issues, recommendation_table, sweep_thresholds
+from tutors import STRONG_GRADE, TUTOR_INDEX_PATH, load_tutor_index, match_tutors
+from tuning import CLOCKS, TUNED_PATH, load_tuned, save_tuned, tune_subjects, tuned_overrides
+from output import gerar_csv, gerar_xlsx, iter_chunks
 from eda import gerar_eda
-from output import gerar_csv
+from writer import ArtifactWriter
 
 
 def build_metrics_dataframe(metrics_summary):
     rows = []
     for subject, models_metrics in metrics_summary.items():
         for model_name, metrics in models_metrics.items():
-            rows.append({
+            row = {
                 "Disciplina": subject,
                 "Modelo": model_name,
                 "MAE": metrics.get("MAE"),
                 "MSE": metrics.get("MSE"),
                 "R2": metrics.get("R²"),
-            })
+            }
+            # Desvios padrão só existem no modo de validação cruzada (--cv)
+            if "MAE_std" in metrics:
+                row["MAE_std"] = metrics.get("MAE_std")
+                row["MSE_std"] = metrics.get("MSE_std")
+                row["R2_std"] = metrics.get("R²_std")
+            rows.append(row)
     if not rows:
         return pd.DataFrame(columns=["Disciplina", "Modelo", "MAE", "MSE", "R2"])
     df = pd.DataFrame(rows)
@@ -27,19 +42,57 @@ def build_metrics_dataframe(metrics_summary):
 
 
 def build_recommendations_dataframe(recommendations, top_n):
-    recs_rows = []
-    for aluno, recs in recommendations.items():
-        for req, imp in recs[:top_n]:
-            recs_rows.append({"Aluno": aluno, "Pré-requisito": req, "Importância": imp})
-    if not recs_rows:
+    if recommendations is None or recommendations.empty:
         return pd.DataFrame(columns=["Aluno", "Pré-requisito", "Importância"])
-    return pd.DataFrame(recs_rows)
+    # As linhas já vêm ordenadas por importância dentro de cada aluno
+    return recommendations.groupby("Aluno", sort=False).head(top_n).reset_index(drop=True)
+
+
+def build_root_causes_dataframe(df, graph, threshold, top_n):
+    """Principais causas-raiz (pré-requisitos diretos ou indiretos) de cada aluno."""
+    scores = graph.root_cause_scores(df, threshold=threshold)
+    values = scores.to_numpy()
+    order = np.argsort(-values, axis=1, kind="stable")[:, :top_n]
+    top = np.take_along_axis(values, order, axis=1)
+    rows, cols = np.nonzero(top > 0)
+    if rows.size == 0:
+        return pd.DataFrame(columns=["Aluno", "Causa-raiz", "Pontuação"])
+    return pd.DataFrame({
+        "Aluno": df["Aluno"].to_numpy()[rows],
+        "Causa-raiz": np.asarray(graph.subjects, dtype=object)[order[rows, cols]],
+        "Pontuação": top[rows, cols],
+    })
+
+
+def parse_thresholds(spec):
+    """Converte ``INÍCIO:FIM:PASSO`` (FIM incluído) ou uma lista ``4,5,6`` em limiares."""
+    try:
+        if ":" in spec:
+            start, stop, step = (float(part) for part in spec.split(":"))
+            if step <= 0 or stop < start:
+                raise ValueError
+            return np.round(np.arange(start, stop + step / 2, step), 10)
+        return np.array([float(part) for part in spec.split(",")])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"limiares inválidos: {spec} (use INÍCIO:FIM:PASSO ou 4,5,6)")
+
+
+def print_tuning(results):
+    print("\nAjuste de hiperparâmetros (R² de validação):")
+    for subject, models in results.items():
+        for name, result in models.items():
+            score = "—" if result["score"] is None else "{:.3f}".format(result["score"])
+            print("  {} / {}: R²={} ({} avaliações, {} rodadas) {}".format(
+                subject, name, score, result["evaluations"], result["rungs"], result["params"],
+            ))
 
 
 def maybe_plot(metrics_df, show_plots):
     if not show_plots:
         return
     try:
+        # Importados só aqui: execuções com --no-plots não carregam matplotlib/seaborn
+        import matplotlib.pyplot as plt
         import seaborn as sns
         pivot = metrics_df.pivot_table(index="Disciplina", columns="Modelo", values="R2")
         if pivot.size == 0:
@@ -53,15 +106,98 @@ def maybe_plot(metrics_df, show_plots):
         pass
 
 
-def save_artifacts(metrics_df, recs_df, save):
+def save_artifacts(metrics_df, recs_df, save, writer, formato="csv", out_dir=None):
+    """Agenda métricas e recomendações no ``writer`` (gravadas em paralelo, só se mudaram).
+
+    Por padrão em ``results/``; ``out_dir`` troca o diretório (ex.: uma turma do ``batch.py``).
+    """
     if not save:
         return
-    out = Path(__file__).parent / "results"
-    out.mkdir(exist_ok=True)
-    metrics_df.to_csv(out / "metrics.csv", index=False)
-    recs_df.to_csv(out / "recommendations.csv", index=False)
-    metrics_df.to_json(out / "metrics.json", orient="records")
-    recs_df.to_json(out / "recommendations.json", orient="records")
+    out = Path(out_dir) if out_dir is not None else Path(__file__).parent / "results"
+    if formato != "csv":
+        # Formato colunar tipado (Parquet particionado ou Feather); pyarrow só é exigido aqui
+        try:
+            from store import artifact_path, write_table
+        except ImportError as exc:
+            raise RuntimeError("pyarrow não está instalado. Instale as dependências.") from exc
+        for name, df in (("metrics", metrics_df), ("recommendations", recs_df)):
+            writer.submit(
+                artifact_path(out, name, formato),
+                lambda tmp, df=df, name=name: write_table(df, tmp, name, formato),
+                df,
+            )
+        return
+    for name, df in (("metrics", metrics_df), ("recommendations", recs_df)):
+        writer.submit(out / f"{name}.csv", lambda tmp, df=df: df.to_csv(tmp, index=False), df)
+        writer.submit(out / f"{name}.json", lambda tmp, df=df: df.to_json(tmp, orient="records"), df)
+
+
+def load_data(args, cache):
+    """Notas (``GradeMatrix``), mapeamento de pré-requisitos e a chave dos dados para os estágios seguintes.
+
+    A chave identifica os dados sem hashear as notas: caminho, tamanho e mtime
+    dos arquivos de entrada ou a semente dos dados fictícios (``None`` sem semente).
+    """
+    if args.input:
+        # Planilha real: ler o arquivo custa o mesmo que ler uma cópia dele do cache
+        prereqs_path = args.prereqs or default_prereqs_path(args.input)
+        grades, pre_reqs = load_grade_matrix(args.input, prereqs_path, chunksize=args.chunksize)
+        return grades, pre_reqs, file_states([args.input, prereqs_path])
+    # Sem semente os dados são aleatórios a cada execução e não há o que reaproveitar
+    if args.seed is None:
+        return (*create_grade_matrix(), None)
+    key = cache.key("data", "create_grade_matrix", args.seed)
+    return (
+        *cache.get_or_compute(key, lambda: create_grade_matrix(seed=args.seed)),
+        {"create_data": args.seed},
+    )
+
+
+def file_states(paths):
+    """Tamanho e mtime de cada arquivo; detecta artefatos alterados ou removidos por fora."""
+    states = {}
+    for path in paths:
+        try:
+            st = Path(path).stat()
+        except FileNotFoundError:
+            states[str(path)] = None
+        else:
+            states[str(path)] = (st.st_size, st.st_mtime_ns)
+    return states
+
+
+def export_outputs(metrics_df, recs_df, save, writer, formato="csv", xlsx=None):
+    save_artifacts(metrics_df, recs_df, save, writer, formato=formato)
+
+    # Criar um CSV unificado e amigável (output.csv)
+    # Colunas padronizadas para unir métricas e recomendações em formato "long"
+    unified_cols = [
+        "Tipo", "Disciplina", "Modelo", "MAE", "MSE", "R2",
+        "MAE_std", "MSE_std", "R2_std",
+        "Aluno", "Pré-requisito", "Importância"
+    ]
+
+    def blocos():
+        # Escrita em fluxo: cada bloco ganha a coluna "Tipo" sem copiar a tabela inteira
+        yield metrics_df.assign(Tipo="Métrica")
+        for bloco in iter_chunks(recs_df):
+            yield bloco.assign(Tipo="Recomendação")
+
+    # Colunas ausentes em cada bloco ficam vazias; separador ; e decimal ,
+    colunas = [c for c in unified_cols if c == "Tipo" or c in metrics_df.columns or c in recs_df.columns]
+    writer.submit(
+        "output.csv",
+        lambda tmp: gerar_csv(blocos(), tmp, colunas=colunas, float_precision=None),
+        metrics_df, recs_df,
+    )
+
+    # Pasta XLSX nativa: uma planilha por tabela, números tipados, escrita em fluxo
+    if xlsx:
+        writer.submit(
+            xlsx,
+            lambda tmp: gerar_xlsx({"Métricas": metrics_df, "Recomendações": recs_df}, tmp),
+            metrics_df, recs_df,
+        )
 
 
 def main():
@@ -70,63 +206,279 @@ def main():
     parser.add_argument("--top", type=int, default=3)
     parser.add_argument("--no-plots", action="store_true")
     parser.add_argument("--save", action="store_true")
-    parser.add_argument("--profile", action="store_true", help="Gera relatório EDA em HTML")
+    parser.add_argument(
+        "--format", choices=["csv", "parquet", "feather"], default="csv",
+        help="Formato dos artefatos gravados com --save (parquet é particionado por disciplina)",
+    )
+    parser.add_argument(
+        "--xlsx", nargs="?", const="output.xlsx", default=None, metavar="ARQUIVO",
+        help="Grava também uma pasta XLSX com as planilhas Métricas e Recomendações (requer xlsxwriter)",
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const="fast", default=None, choices=["fast", "deep"],
+        help="Gera relatório EDA em HTML: fast (resumo NumPy, padrão) ou deep (ydata-profiling)",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=1,
+        help="Processos para treinar as disciplinas em paralelo (<= 0 usa todas as CPUs)",
+    )
+    parser.add_argument(
+        "--cv", type=int, default=None, metavar="K",
+        help="Avalia os modelos com validação cruzada K-fold (média e desvio padrão)",
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=1, metavar="R",
+        help="Número de repetições da validação cruzada (usado com --cv)",
+    )
+    parser.add_argument(
+        "--backend", choices=list(BACKENDS), default="auto",
+        help="Estimadores: exact (RF, LR, SVR), scalable (RF subamostrado, LinearSVR), "
+             "hist (gradient boosting por histogramas, SGD); auto escolhe pelo número de alunos",
+    )
+    parser.add_argument(
+        "--tune", action="store_true",
+        help="Ajusta hiperparâmetros por disciplina (halving sucessivo) antes do treino; "
+             "o resultado fica em results/tuned_params.json e é reaproveitado nas próximas execuções",
+    )
+    parser.add_argument(
+        "--tune-budget", type=float, default=60.0, metavar="SEGUNDOS",
+        help="Orçamento total do ajuste (as disciplinas são ajustadas em paralelo com --jobs)",
+    )
+    parser.add_argument(
+        "--tune-clock", choices=list(CLOCKS), default="wall",
+        help="Relógio do orçamento: tempo de parede ou de CPU",
+    )
+    parser.add_argument(
+        "--input", default=None, metavar="PATH",
+        help="Planilha de notas (CSV, Parquet ou .npy do data.py), uma linha por aluno e uma coluna por disciplina",
+    )
+    parser.add_argument(
+        "--prereqs", default=None, metavar="PATH",
+        help="Mapeamento de pré-requisitos (JSON ou CSV); padrão: <input>.prereqs.json",
+    )
+    parser.add_argument(
+        "--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+        help="Linhas lidas por bloco da planilha de entrada",
+    )
+    parser.add_argument(
+        "--hops", type=int, default=1,
+        help="Inclui pré-requisitos indiretos até N saltos nas recomendações",
+    )
+    parser.add_argument(
+        "--thresholds", type=parse_thresholds, default=None, metavar="INÍCIO:FIM:PASSO",
+        help="Varre vários limiares (ex.: 4:7:0.25) sem retreinar: tabela limiar x disciplina "
+             "com os alunos abaixo de cada limiar (gravada em results/thresholds.csv com --save)",
+    )
+    parser.add_argument(
+        "--threshold-recs", action="store_true",
+        help="Com --thresholds e --save, grava também as recomendações de cada limiar em results/thresholds/",
+    )
+    parser.add_argument(
+        "--tutors", nargs="?", type=int, const=3, default=None, metavar="K",
+        help="Sugere até K colegas tutores (padrão 3) para cada pré-requisito recomendado, "
+             "por vizinhos mais próximos entre os alunos fortes nele; o índice fica em "
+             "results/tutor_index.pkl e é reaproveitado enquanto as notas não mudam",
+    )
+    parser.add_argument(
+        "--tutor-min", type=float, default=STRONG_GRADE,
+        help="Nota mínima no pré-requisito para um colega ser sugerido como tutor",
+    )
+    parser.add_argument(
+        "--root-causes", action="store_true",
+        help="Mostra as causas-raiz de cada aluno pelo fecho transitivo dos pré-requisitos",
+    )
+    parser.add_argument(
+        "--update", default=None, metavar="DELTA",
+        help="Atualiza o estado salvo (--save) só com as notas alteradas em DELTA (CSV ou Parquet)",
+    )
+    parser.add_argument(
+        "--drift-tol", type=float, default=DEFAULT_DRIFT_TOLERANCE,
+        help="Fração de linhas alteradas a partir da qual uma disciplina é retreinada",
+    )
+    parser.add_argument(
+        "--timings", nargs="?", const="json", default=None, choices=list(timings.FORMATS),
+        help="Mede tempo, CPU e pico de memória por estágio e disciplina (chrome: grava também "
+             "o trace no formato do Chrome); também liga com SIDA_TIMINGS=1",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Semente para a geração dos dados")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa o cache de estágios")
+    parser.add_argument("--rebuild", action="store_true", help="Ignora o cache e recalcula todos os estágios")
+    parser.add_argument(
+        "--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help="Tamanho máximo do cache em MB (entradas menos usadas são removidas)",
+    )
     args = parser.parse_args()
+    if args.cv is not None and args.cv < 2:
+        parser.error("--cv precisa ser >= 2")
+    if args.timings:
+        timings.enable(args.timings)
+
+    cache = StageCache(
+        max_bytes=args.cache_size * 1024 * 1024,
+        enabled=not args.no_cache,
+        rebuild=args.rebuild,
+    )
+
+    if args.update:
+        # Modo incremental: parte do estado salvo e aplica só as alterações
+        with timings.stage("load_state"):
+            state = load_state()
+        with timings.stage("update_state"):
+            state, summary = update_state(
+                state, load_delta(args.update), drift_tolerance=args.drift_tol, jobs=args.jobs
+            )
+        params = state["params"]
+        args.threshold, args.top, args.hops = params["threshold"], params["top_n"], params.get("hops", 1)
+        df, pre_reqs, data_key = state["df"], state["pre_reqs"], None
+        grades = GradeMatrix.from_frame(df)
+        graph = PrerequisiteGraph(pre_reqs)
+        fitted = state["fitted"]
+        recommendations, metrics_summary = state["recommendations"], fitted["metrics"]
+        print(
+            "Atualização incremental: {} alunos alterados, {} recomendações recalculadas, "
+            "disciplinas retreinadas: {}".format(
+                summary["students_changed"], summary["students_recomputed"],
+                ", ".join(summary["subjects_refit"]) or "nenhuma",
+            )
+        )
+        with timings.stage("save_state"):
+            save_state(state, changes=summary["changes"])
+    else:
+        # Criando o DataFrame
+        with timings.stage("load_data"):
+            grades, pre_reqs, data_key = load_data(args, cache)
+            # O DataFrame exibido/exportado compartilha o array de notas (sem cópia)
+            df = grades.to_frame()
+        try:
+            graph = PrerequisiteGraph(pre_reqs)
+        except ValueError as exc:
+            parser.error(str(exc))
 
-    # Criando o DataFrame
-    df, pre_reqs = create_data()
+        # Hiperparâmetros: ajustados agora (--tune) ou reaproveitados de uma execução anterior
+        backend = resolve_backend(args.backend, len(grades))
+        if args.tune:
+            with timings.stage("tune_subjects", budget=args.tune_budget):
+                results = tune_subjects(
+                    grades, pre_reqs, args.tune_budget, backend=backend, jobs=args.jobs, clock=args.tune_clock,
+                )
+            save_tuned(results, backend, data_key)
+            print_tuning(results)
+            tuned = tuned_overrides(results)
+        else:
+            tuned = load_tuned(backend, pre_reqs, data_key)
+            if tuned:
+                print(f"Hiperparâmetros ajustados reaproveitados de {TUNED_PATH}")
 
-    # Identificando os pré-requisitos que os alunos precisam melhorar
-    recommendations, metrics_summary = identify_prerequisite_issues(df, pre_reqs, threshold=args.threshold)
+        # Identificando os pré-requisitos que os alunos precisam melhorar
+        with timings.stage("identify_prerequisite_issues"):
+            recommendations, metrics_summary, fitted = identify_prerequisite_issues(
+                grades, pre_reqs, threshold=args.threshold, top_n=args.top, jobs=args.jobs, cache=cache,
+                cv=args.cv, repeats=args.repeats, hops=args.hops, return_fitted=True, backend=backend,
+                tuned=tuned, data_key=data_key,
+            )
+        if args.save:
+            # Base para execuções incrementais (--update)
+            params = {
+                "threshold": args.threshold, "top_n": args.top, "hops": args.hops,
+                "cv": args.cv, "repeats": args.repeats, "backend": backend, "tuned": tuned,
+            }
+            with timings.stage("save_state"):
+                save_state(build_state(df, pre_reqs, fitted, recommendations, params))
 
     # Formatar e exibir métricas
     pd.options.display.float_format = "{:.3f}".format
-    metrics_df = build_metrics_dataframe(metrics_summary)
+    with timings.stage("build_metrics_dataframe"):
+        metrics_df = build_metrics_dataframe(metrics_summary)
     print("\nMétricas por disciplina e modelo:")
     print(metrics_df.to_string(index=False))
 
     # Formatar e exibir recomendações (top N)
-    recs_df = build_recommendations_dataframe(recommendations, args.top)
+    with timings.stage("build_recommendations_dataframe"):
+        recs_df = build_recommendations_dataframe(recommendations, args.top)
     print("\nRecomendações (top {} por aluno):".format(args.top))
     print(recs_df.to_string(index=False))
 
+    root_causes_df = None
+    if args.root_causes:
+        with timings.stage("root_causes"):
+            root_causes_df = build_root_causes_dataframe(df, graph, args.threshold, args.top)
+        print("\nCausas-raiz (top {} por aluno):".format(args.top))
+        print(root_causes_df.to_string(index=False))
+
+    sweep_df, sweep_recs = None, {}
+    if args.thresholds is not None:
+        # Os modelos já treinados servem a todos os limiares
+        with timings.stage("sweep_thresholds", thresholds=len(args.thresholds)):
+            importance_table = recommendation_table(fitted["importances"], pre_reqs, args.hops)
+            sweep_df, sweep_recs = sweep_thresholds(
+                grades, importance_table, args.thresholds, top_n=args.top,
+                keep_recommendations=args.save and args.threshold_recs,
+            )
+        print("\nAlunos abaixo de cada limiar por disciplina:")
+        print(sweep_df.to_string())
+
+    tutors_df = None
+    if args.tutors is not None:
+        try:
+            with timings.stage("tutor_index"):
+                tutor_index, reused = load_tutor_index(grades, pre_reqs, strong=args.tutor_min, rebuild=args.rebuild)
+        except ValueError as exc:
+            parser.error(str(exc))
+        if reused:
+            print(f"\nÍndice de tutores reaproveitado de {TUTOR_INDEX_PATH}")
+        with timings.stage("match_tutors", rows=len(recs_df)):
+            tutors_df = match_tutors(grades, recs_df, tutor_index, k=args.tutors)
+        print("\nTutores sugeridos (até {} por pré-requisito):".format(args.tutors))
+        print(tutors_df.to_string(index=False))
+
     # Plots opcionais
     maybe_plot(metrics_df, show_plots=not args.no_plots)
 
-    # Exportar artefatos
-    save_artifacts(metrics_df, recs_df, save=args.save)
+    # Exportar artefatos: gravações em paralelo, atômicas e puladas quando nada mudou
+    with timings.stage("exports"), ArtifactWriter(force=args.rebuild) as writer:
+        export_outputs(metrics_df, recs_df, args.save, writer, args.format, xlsx=args.xlsx)
+        if args.save and root_causes_df is not None:
+            writer.submit(
+                Path(__file__).parent / "results" / "root_causes.csv",
+                lambda tmp: root_causes_df.to_csv(tmp, index=False),
+                root_causes_df,
+            )
+        if args.save and tutors_df is not None:
+            writer.submit(
+                Path(__file__).parent / "results" / "tutors.csv",
+                lambda tmp: tutors_df.to_csv(tmp, index=False),
+                tutors_df,
+            )
+        if args.save and sweep_df is not None:
+            out = Path(__file__).parent / "results"
+            writer.submit(out / "thresholds.csv", lambda tmp: sweep_df.to_csv(tmp), sweep_df)
+            for threshold, recs in sweep_recs.items():
+                writer.submit(
+                    out / "thresholds" / f"recommendations_{threshold:g}.csv",
+                    lambda tmp, recs=recs: recs.to_csv(tmp, index=False),
+                    recs,
+                )
+        # Gerar EDA: resumo vetorizado (fast) ou ydata-profiling (deep)
+        if args.profile:
+            saida_html = Path(__file__).parent / "results" / "profile.html"
+            writer.submit(
+                saida_html,
+                lambda tmp: gerar_eda(df, str(tmp), modo=args.profile, cache=cache, chave_dados=data_key),
+                df if data_key is None else data_key, args.profile,
+            )
 
-    # Criar um CSV unificado e amigável (output.csv)
-    # Colunas padronizadas para unir métricas e recomendações em formato "long"
-    unified_cols = [
-        "Tipo", "Disciplina", "Modelo", "MAE", "MSE", "R2",
-        "Aluno", "Pré-requisito", "Importância"
-    ]
+    if cache.hits:
+        print("Estágios reaproveitados do cache: {}".format(", ".join(cache.hits)))
+    if writer.written:
+        print("Artefatos gravados: {}".format(", ".join(str(p) for p in writer.written)))
+    if writer.skipped:
+        print("Artefatos inalterados (não regravados): {}".format(", ".join(str(p) for p in writer.skipped)))
 
-    metrics_long = metrics_df.copy()
-    metrics_long.insert(0, "Tipo", "Métrica")
-    for col in ["Aluno", "Pré-requisito", "Importância"]:
-        if col not in metrics_long.columns:
-            metrics_long[col] = ""
-
-    recs_long = recs_df.copy()
-    recs_long.insert(0, "Tipo", "Recomendação")
-    for col in ["Disciplina", "Modelo", "MAE", "MSE", "R2"]:
-        if col not in recs_long.columns:
-            recs_long[col] = ""
-
-    unified_df = pd.concat([metrics_long, recs_long], ignore_index=True, sort=False)
-    # Reordenar colunas e gerar CSV com separador ; e decimal ,
-    unified_df = unified_df[[c for c in unified_cols if c in unified_df.columns]]
-    gerar_csv(unified_df, "output.csv", colunas=unified_cols)
-    print("Arquivo CSV 'output.csv' criado com sucesso.")
-
-    # Gerar EDA com ydata-profiling
-    if args.profile:
-        results_dir = Path(__file__).parent / "results"
-        saida_html = results_dir / "profile.html"
-        caminho = gerar_eda(df, str(saida_html))
-        print(f"Relatório EDA gerado em: {caminho}")
+    if timings.enabled():
+        print("\nTempos por estágio:")
+        print(timings.format_summary())
+        paths = timings.write(Path(__file__).parent / "results")
+        print("Timings gravados em: {}".format(", ".join(str(p) for p in paths)))
 
 
 if __name__ == "__main__":
@@ -1,18 +1,129 @@
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import LinearRegression
-from sklearn.svm import SVR # Support Vector Regression
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-
-models = {
-        'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
+import numpy as np
+
+# Os módulos do sklearn são importados dentro das funções: só quem treina paga o custo
+
+BACKENDS = ('auto', 'exact', 'scalable', 'hist')
+# Limites do backend 'auto' (linhas por disciplina)
+EXACT_MAX_ROWS = 20_000
+SCALABLE_MAX_ROWS = 500_000
+# Linhas sorteadas por árvore no Random Forest do backend 'scalable'
+FOREST_MAX_SAMPLES = 20_000
+# Linhas usadas na importância por permutação (modelos sem ``feature_importances_``)
+PERMUTATION_MAX_ROWS = 10_000
+
+def resolve_backend(backend='auto', n_samples=None):
+    """Escolhe o backend de estimadores; ``auto`` decide pelo número de linhas.
+
+    - ``exact``: Random Forest completo, regressão linear e SVR linear (kernel).
+    - ``scalable``: Random Forest com subamostragem por árvore e ``LinearSVR`` (primal).
+    - ``hist``: gradient boosting por histogramas e ``SGDRegressor``.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)})")
+    if backend != 'auto':
+        return backend
+    if n_samples is None or n_samples <= EXACT_MAX_ROWS:
+        return 'exact'
+    return 'scalable' if n_samples <= SCALABLE_MAX_ROWS else 'hist'
+
+def build_models(backend='exact', n_samples=None, overrides=None):
+    """Cria instâncias novas dos estimadores avaliados em cada disciplina.
+
+    Cada chamada devolve objetos independentes, o que permite treinar
+    disciplinas em processos diferentes sem compartilhar estado. O primeiro
+    estimador do dicionário é o de árvores, que fornece as importâncias.
+    ``overrides`` ({modelo: parâmetros}, ex.: saída de ``tuning``) substitui
+    os parâmetros padrão dos modelos indicados.
+    """
+    models = _default_models(resolve_backend(backend, n_samples), n_samples)
+    for name, params in (overrides or {}).items():
+        if name in models:
+            models[name].set_params(**params)
+    return models
+
+def _default_models(backend, n_samples):
+    from sklearn.linear_model import LinearRegression
+
+    if backend == 'exact':
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.svm import SVR  # Support Vector Regression
+
+        return {
+            'Random Forest': RandomForestRegressor(n_estimators=100, random_state=42),
+            'Linear Regression': LinearRegression(),
+            'Support Vector Regression': SVR(kernel='linear')
+        }
+    if backend == 'scalable':
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.svm import LinearSVR
+
+        # Cada árvore vê no máximo FOREST_MAX_SAMPLES linhas: custo constante por árvore
+        max_samples = None
+        if n_samples is not None and n_samples > FOREST_MAX_SAMPLES:
+            max_samples = FOREST_MAX_SAMPLES / n_samples
+        return {
+            'Random Forest': RandomForestRegressor(
+                n_estimators=100, max_samples=max_samples, min_samples_leaf=5, random_state=42
+            ),
+            'Linear Regression': LinearRegression(),
+            'Support Vector Regression': LinearSVR(
+                loss='squared_epsilon_insensitive', dual=False, random_state=42
+            ),
+        }
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    from sklearn.linear_model import SGDRegressor
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return {
+        'Gradient Boosting': HistGradientBoostingRegressor(random_state=42),
         'Linear Regression': LinearRegression(),
-        'Support Vector Regression': SVR(kernel='linear')
+        'SGD Regression': make_pipeline(StandardScaler(), SGDRegressor(random_state=42)),
     }
 
-def evaluate_models(X_train, X_test, y_train, y_test):
+def feature_importances(models, X, y, feature_names=None):
+    """Importância de cada pré-requisito segundo o estimador de árvores (primeiro do dicionário).
+
+    Usa ``feature_importances_`` quando existe; caso contrário (gradient boosting
+    por histogramas), a importância por permutação em até ``PERMUTATION_MAX_ROWS``
+    linhas de ``X``/``y``, normalizada para somar 1 como a do Random Forest.
+    ``X`` pode ser um array (ex.: ``GradeMatrix.select``); aí os nomes dos
+    pré-requisitos vêm de ``feature_names``.
+    """
+    if feature_names is None:
+        feature_names = list(X.columns)
+    model = next(iter(models.values()))
+    if hasattr(model, 'feature_importances_'):
+        return dict(zip(feature_names, model.feature_importances_))
+
+    from sklearn.inspection import permutation_importance
+
+    X, y = np.asarray(X), np.asarray(y)
+    if len(X) > PERMUTATION_MAX_ROWS:
+        rows = np.random.default_rng(42).choice(len(X), PERMUTATION_MAX_ROWS, replace=False)
+        X, y = X[rows], y[rows]
+    result = permutation_importance(model, X, y, n_repeats=3, random_state=42)
+    values = np.clip(result.importances_mean, 0, None)
+    total = values.sum()
+    values = values / total if total > 0 else np.full(len(values), 1 / len(values))
+    return dict(zip(feature_names, values))
+
+METRIC_NAMES = ('MAE', 'MSE', 'R²')
+
+def model_params(backend='exact', n_samples=None):
+    """Parâmetros dos estimadores, usados para compor as chaves de cache."""
+    return {name: model.get_params() for name, model in build_models(backend, n_samples).items()}
+
+def evaluate_models(X_train, X_test, y_train, y_test, models=None):
+    """Treina e avalia os estimadores.
+
+    Se ``models`` for passado, os objetos do dicionário são treinados no lugar
+    e podem ser reaproveitados pelo chamador (ex.: ``feature_importances``).
+    """
 
     results = {}
+    if models is None:
+        models = build_models()
     
     for name, model in models.items():
         # Treinar o modelo
@@ -22,14 +133,43 @@ def evaluate_models(X_train, X_test, y_train, y_test):
         y_pred = model.predict(X_test)
 
         # Calcular métricas
-        mae = mean_absolute_error(y_test, y_pred)
-        mse = mean_squared_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
-
-        results[name] = {
-            'MAE': mae,
-            'MSE': mse,
-            'R²': r2
-        }
+        results[name] = score_predictions(y_test, y_pred)
+
+    return results
+
+def score_predictions(y_true, y_pred):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    mae = mean_absolute_error(y_true, y_pred)
+    mse = mean_squared_error(y_true, y_pred)
+    r2 = r2_score(y_true, y_pred)
+
+    return {
+        'MAE': mae,
+        'MSE': mse,
+        'R²': r2
+    }
+
+def cross_validate_model(name, X, y, splits, backend='exact', overrides=None):
+    """Avalia um estimador em folds já calculados (validação cruzada repetida).
+
+    Retorna a média e o desvio padrão de cada métrica (chaves ``MAE`` e
+    ``MAE_std``, etc.) e o modelo final treinado com todos os dados.
+    """
+    X, y = np.asarray(X), np.asarray(y)
+    scores = {metric: [] for metric in METRIC_NAMES}
+    for train_idx, test_idx in splits:
+        model = build_models(backend, len(train_idx), overrides)[name]
+        model.fit(X[train_idx], y[train_idx])
+        fold = score_predictions(y[test_idx], model.predict(X[test_idx]))
+        for metric in METRIC_NAMES:
+            scores[metric].append(fold[metric])
+
+    summary = {}
+    for metric, values in scores.items():
+        summary[metric] = float(np.mean(values))
+        summary[f'{metric}_std'] = float(np.std(values, ddof=1)) if len(values) > 1 else 0.0
 
-    return results
\ No newline at end of file
+    final_model = build_models(backend, len(X), overrides)[name]
+    final_model.fit(X, y)
+    return summary, final_model
\ No newline at end of file
@@ -1,14 +1,66 @@
 import csv
-from typing import Iterable, List, Mapping, Optional, Sequence, Union
+import gzip
+import io
+import itertools
+import numbers
+from typing import IO, Iterable, Iterator, List, Mapping, Optional, Sequence, Union
 
 try:
     import pandas as pd
 except Exception:  # pandas é opcional para tipos não-DataFrame
     pd = None
 
+try:
+    from grades import GradeMatrix
+except Exception:  # depende de pandas
+    GradeMatrix = None
+
+
+def iter_chunks(df: "pd.DataFrame", tamanho: int = 100_000) -> Iterator["pd.DataFrame"]:
+    """Fatia um DataFrame em blocos de linhas (visões, sem copiar os dados)."""
+    for inicio in range(0, len(df), tamanho):
+        yield df.iloc[inicio:inicio + tamanho]
+
+
+def _detectar_compressao(nome_arquivo: str, compressao: Optional[str]) -> Optional[str]:
+    if compressao is not None:
+        return compressao
+    nome = str(nome_arquivo).lower()
+    if nome.endswith(".gz"):
+        return "gzip"
+    if nome.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def _abrir_saida(nome_arquivo: str, encoding: str, compressao: Optional[str]) -> IO[str]:
+    """Abre o arquivo de saída em modo texto, com compressão gzip ou zstd opcional."""
+    if compressao is None:
+        return open(nome_arquivo, "w", newline="", encoding=encoding)
+    if compressao == "gzip":
+        return gzip.open(nome_arquivo, "wt", newline="", encoding=encoding)
+    if compressao == "zstd":
+        try:
+            import zstandard
+        except Exception as exc:
+            raise RuntimeError("zstandard não está instalado. Instale as dependências.") from exc
+        binario = zstandard.ZstdCompressor().stream_writer(open(nome_arquivo, "wb"))
+        return io.TextIOWrapper(binario, encoding=encoding, newline="")
+    raise ValueError(f"Compressão não suportada: {compressao} (use 'gzip' ou 'zstd')")
+
+
+def _formatar(valor, decimal: str, float_precision: Optional[str]):
+    if isinstance(valor, numbers.Real) and not isinstance(valor, numbers.Integral):
+        valor = float(valor)
+        if valor != valor:  # NaN
+            return ""
+        texto = float_precision % valor if float_precision else repr(valor)
+        return texto.replace(".", decimal) if decimal != "." else texto
+    return "" if valor is None else valor
+
 
 def gerar_csv(
-    dados: Union["pd.DataFrame", Iterable[Mapping], Iterable[Sequence]],
+    dados: Union["pd.DataFrame", "GradeMatrix", Iterable["pd.DataFrame"], Iterable[Mapping], Iterable[Sequence]],
     nome_arquivo: str,
     *,
     colunas: Optional[List[str]] = None,
@@ -16,46 +68,69 @@ def gerar_csv(
     decimal: str = ",",
     incluir_indice: bool = False,
     encoding: str = "utf-8-sig",
-    float_precision: str = "%.2f",
+    float_precision: Optional[str] = "%.2f",
+    compressao: Optional[str] = None,
+    chunksize: int = 100_000,
 ) -> None:
-    """Gera um CSV com formatação consistente.
+    """Gera um CSV com formatação consistente, escrevendo em fluxo.
 
     - Usa separador ";" e decimal "," (compatível com Excel/pt-BR).
     - Força ordem de colunas se fornecida.
     - Em DataFrame, utiliza float_format e encoding UTF-8 BOM.
     - Em listas, escreve cabeçalho automaticamente.
+    - Aceita geradores de linhas ou de DataFrames (blocos) e nunca materializa
+      tudo em memória; DataFrames não são copiados.
+    - ``compressao`` "gzip" ou "zstd" (ou inferida pela extensão .gz/.zst).
+    - ``grades.GradeMatrix`` vira um DataFrame que compartilha o array de notas.
     """
 
-    # Caso DataFrame
+    compressao = _detectar_compressao(nome_arquivo, compressao)
+
+    if GradeMatrix is not None and isinstance(dados, GradeMatrix):
+        dados = dados.to_frame()
+
+    # Caso DataFrame: um único bloco
     if pd is not None and isinstance(dados, pd.DataFrame):
-        df = dados.copy()
+        dados = [dados]
         if colunas is not None:
-            existentes = [c for c in colunas if c in df.columns]
-            df = df[existentes]
-        df.to_csv(
-            nome_arquivo,
-            sep=separador,
-            decimal=decimal,
-            index=incluir_indice,
-            encoding=encoding,
-            float_format=float_precision,
-        )
-        return
-
-    # Caso lista de dicts ou lista de listas
-    with open(nome_arquivo, "w", newline="", encoding=encoding) as arquivo_csv:
-        if isinstance(dados, Iterable):
-            dados = list(dados)
-        if not dados:
+            colunas = [c for c in colunas if c in dados[0].columns]
+
+    itens = iter(dados)
+    primeiro = next(itens, None)
+
+    with _abrir_saida(nome_arquivo, encoding, compressao) as arquivo_csv:
+        if primeiro is None:
             # arquivo vazio apenas com cabeçalho (se colunas fornecidas)
             if colunas:
                 escritor = csv.writer(arquivo_csv, delimiter=separador)
                 escritor.writerow(colunas)
             return
 
-        # Deduzir cabeçalhos
-        if isinstance(dados[0], Mapping):
-            headers = colunas or list(dados[0].keys())
+        # Caso blocos de DataFrame
+        if pd is not None and isinstance(primeiro, pd.DataFrame):
+            for i, bloco in enumerate(itertools.chain([primeiro], itens)):
+                if colunas is not None:
+                    faltantes = [c for c in colunas if c not in bloco.columns]
+                    if faltantes:
+                        # Só o bloco atual é estendido; colunas ausentes viram vazio
+                        bloco = bloco.reindex(columns=colunas)
+                bloco.to_csv(
+                    arquivo_csv,
+                    sep=separador,
+                    decimal=decimal,
+                    index=incluir_indice,
+                    header=i == 0,
+                    columns=colunas,
+                    float_format=float_precision,
+                    chunksize=chunksize,
+                )
+            return
+
+        linhas = itertools.chain([primeiro], itens)
+
+        # Caso dicts: deduzir cabeçalhos pela primeira linha
+        if isinstance(primeiro, Mapping):
+            headers = colunas or list(primeiro.keys())
             escritor = csv.DictWriter(
                 arquivo_csv,
                 fieldnames=headers,
@@ -63,11 +138,141 @@ def gerar_csv(
                 quoting=csv.QUOTE_MINIMAL,
             )
             escritor.writeheader()
-            for row in dados:
-                escritor.writerow({k: row.get(k, "") for k in headers})
+            for row in linhas:
+                escritor.writerow({k: _formatar(row.get(k, ""), decimal, float_precision) for k in headers})
         else:
             escritor = csv.writer(arquivo_csv, delimiter=separador)
             if colunas:
                 escritor.writerow(colunas)
-            escritor.writerows(dados)
+            for row in linhas:
+                escritor.writerow([_formatar(v, decimal, float_precision) for v in row])
+
+
+# Limite de linhas de uma planilha do Excel (cabeçalho incluído)
+XLSX_MAX_LINHAS = 1_048_576
+# Formatos numéricos por tipo de coluna (códigos do Excel, exibidos conforme o idioma local)
+XLSX_FORMATOS = {"float": "0.0000", "int": "0", "datetime": "dd/mm/yyyy hh:mm"}
+_XLSX_METODOS = {
+    "bool": "write_boolean", "int": "write_number", "float": "write_number",
+    "datetime": "write_datetime", "str": "write_string",
+}
+
+
+def _tipo_xlsx(tipo) -> str:
+    if pd.api.types.is_bool_dtype(tipo):
+        return "bool"
+    if pd.api.types.is_integer_dtype(tipo):
+        return "int"
+    if pd.api.types.is_float_dtype(tipo):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(tipo):
+        return "datetime"
+    return "str"
+
+
+def _celulas_xlsx(serie: "pd.Series", tipo: str) -> List:
+    """Valores Python de uma coluna, com ``None`` nas faltantes (ficam em branco)."""
+    if tipo == "datetime":
+        # Excel não guarda fuso: horários com fuso são gravados na hora local deles
+        if serie.dt.tz is not None:
+            serie = serie.dt.tz_localize(None)
+        valores = serie.astype(object).tolist()
+    elif tipo == "str":
+        valores = [str(v) for v in serie.tolist()]
+    else:
+        valores = serie.tolist()
+    if serie.hasnans:
+        faltantes = serie.isna().to_numpy()
+        valores = [None if f else v for v, f in zip(valores, faltantes)]
+    return valores
+
+
+def _planilha_xlsx(livro, nome: str, colunas: List, larguras: List[int], cabecalho):
+    """Nova planilha com cabeçalho em negrito, congelado e com filtro."""
+    planilha = livro.add_worksheet(nome)
+    for j, coluna in enumerate(colunas):
+        planilha.set_column(j, j, larguras[j])
+        planilha.write_string(0, j, str(coluna), cabecalho)
+    planilha.freeze_panes(1, 0)
+    if colunas:
+        planilha.autofilter(0, 0, 0, len(colunas) - 1)
+    return planilha
+
+
+def gerar_xlsx(
+    planilhas: Mapping[str, Union["pd.DataFrame", "GradeMatrix", Iterable["pd.DataFrame"]]],
+    nome_arquivo: str,
+    *,
+    formatos: Optional[Mapping[str, str]] = None,
+    chunksize: int = 100_000,
+) -> None:
+    """Gera uma pasta de trabalho XLSX nativa, uma planilha por entrada de ``planilhas``.
+
+    - Cada planilha recebe um DataFrame, uma ``grades.GradeMatrix`` ou blocos de DataFrame.
+    - Números são gravados como números, com formato pelo tipo da coluna
+      (``XLSX_FORMATOS``); ``formatos`` sobrepõe o formato por nome de coluna.
+    - Escrita em fluxo (``constant_memory`` do xlsxwriter): cada linha vai
+      para o disco assim que é completada, então a memória não cresce com o
+      número de linhas. Acima do limite do Excel, a planilha continua em
+      "Nome (2)", "Nome (3)"...
+    - Data de criação fixa: o mesmo conteúdo gera o mesmo arquivo.
+    """
+    try:
+        import xlsxwriter
+    except Exception as exc:
+        raise RuntimeError("xlsxwriter não está instalado. Instale as dependências.") from exc
+    import datetime
+
+    formatos = dict(formatos or {})
+    livro = xlsxwriter.Workbook(str(nome_arquivo), {"constant_memory": True, "nan_inf_to_errors": True})
+    livro.set_properties({"created": datetime.datetime(2000, 1, 1)})
+    cabecalho = livro.add_format({"bold": True})
+    estilos = {}
+
+    def estilo(codigo):
+        if codigo not in estilos:
+            estilos[codigo] = livro.add_format({"num_format": codigo})
+        return estilos[codigo]
+
+    try:
+        for nome, dados in planilhas.items():
+            if GradeMatrix is not None and isinstance(dados, GradeMatrix):
+                dados = dados.to_frame()
+            if isinstance(dados, pd.DataFrame):
+                dados = iter_chunks(dados, chunksize) if len(dados) else [dados]
+            itens = iter(dados)
+            primeiro = next(itens, None)
+            colunas = list(primeiro.columns) if primeiro is not None else []
+            # Tipos e formatos decididos pelo primeiro bloco
+            tipos = [_tipo_xlsx(primeiro[c].dtype) for c in colunas]
+            metodos = [_XLSX_METODOS[t] for t in tipos]
+            estilos_col = [
+                estilo(formatos.get(c, XLSX_FORMATOS[t])) if t in XLSX_FORMATOS else None
+                for c, t in zip(colunas, tipos)
+            ]
 
+            # Largura pelo cabeçalho e pelos textos da amostra inicial (as colunas vêm antes das linhas)
+            amostra = primeiro.head(1000) if primeiro is not None else None
+            larguras = [
+                min(60, max(10, len(str(c)) + 2, *(
+                    (len(str(v)) + 2 for v in amostra[c].tolist()) if t == "str" else ()
+                )))
+                for c, t in zip(colunas, tipos)
+            ]
+            planilha, parte, linha = _planilha_xlsx(livro, nome, colunas, larguras, cabecalho), 1, 1
+            escritores = [getattr(planilha, m) for m in metodos]
+            blocos = itertools.chain([primeiro], itens) if primeiro is not None else ()
+            for bloco in blocos:
+                valores = [_celulas_xlsx(bloco[c], t) for c, t in zip(colunas, tipos)]
+                for registro in zip(*valores):
+                    if linha == XLSX_MAX_LINHAS:
+                        parte += 1
+                        planilha = _planilha_xlsx(livro, f"{nome} ({parte})", colunas, larguras, cabecalho)
+                        escritores = [getattr(planilha, m) for m in metodos]
+                        linha = 1
+                    for j, valor in enumerate(registro):
+                        if valor is not None:
+                            escritores[j](linha, j, valor, estilos_col[j])
+                    linha += 1
+    finally:
+        livro.close()
@@ -1,44 +1,361 @@
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from models import evaluate_models
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import timings
+from grades import as_grade_matrix
+from graph import PrerequisiteGraph
+from models import (
+    build_models, cross_validate_model, evaluate_models, feature_importances, model_params, resolve_backend,
+)
+
+RECOMMENDATION_COLUMNS = ["Aluno", "Pré-requisito", "Importância"]
+# Alunos por bloco em ``recommend_prerequisites``
+RECOMMEND_BLOCK = 50_000
+
+
+def build_importance_table(importances, pre_reqs):
+    """Monta a tabela (disciplina x pré-requisito) com as importâncias.
+
+    Pares sem relação de pré-requisito ficam como NaN.
+    """
+    prereqs = list(dict.fromkeys(req for reqs in pre_reqs.values() for req in reqs))
+    table = pd.DataFrame(np.nan, index=list(pre_reqs), columns=prereqs)
+    for subject, subject_importances in importances.items():
+        for req, imp in subject_importances.items():
+            table.at[subject, req] = imp
+    return table
+
+
+def _top_prerequisites(below, weights, top_n):
+    """Recomendações de um bloco de linhas: (linha, índice do pré-requisito, importância).
+
+    ``below`` é a máscara (alunos x disciplinas) das notas abaixo do limiar.
+    """
+    # Para cada pré-requisito, maior importância entre as disciplinas em que o aluno está abaixo do limiar
+    scores = np.full((len(below), weights.shape[1]), -np.inf)
+    for col in range(weights.shape[1]):
+        related = np.flatnonzero(~np.isnan(weights[:, col]))
+        if related.size:
+            scores[:, col] = np.where(below[:, related], weights[related, col], -np.inf).max(axis=1)
+
+    # Top-N por aluno sem ordenar a linha inteira
+    if top_n is not None and top_n < weights.shape[1]:
+        top = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+    else:
+        top = np.broadcast_to(np.arange(weights.shape[1]), scores.shape)
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    rows, cols = np.nonzero(np.isfinite(top_scores))
+    return rows, top[rows, cols], top_scores[rows, cols]
+
+
+def recommend_prerequisites(df, importance_table, threshold=5.0, top_n=None, block=RECOMMEND_BLOCK):
+    """Gera as recomendações em formato longo (Aluno, Pré-requisito, Importância).
+
+    A máscara de notas abaixo do limiar é calculada para todas as disciplinas
+    de uma vez e cruzada com a tabela de importâncias. Cada par (aluno,
+    pré-requisito) aparece uma única vez, com a maior importância encontrada,
+    e as linhas de cada aluno vêm ordenadas por importância decrescente.
+    ``df`` pode ser um DataFrame ou uma ``grades.GradeMatrix``; as linhas são
+    processadas em blocos de ``block`` alunos, o que limita as matrizes
+    temporárias de pontuação.
+    """
+    subjects = list(importance_table.index)
+    prereqs = np.asarray(importance_table.columns, dtype=object)
+    weights = importance_table.to_numpy(dtype=float)
+
+    if (top_n is not None and top_n <= 0) or len(df) == 0 or len(prereqs) == 0:
+        return pd.DataFrame(columns=RECOMMENDATION_COLUMNS)
+
+    grades = as_grade_matrix(df, subjects)
+    values = grades.select(subjects)
+    # Limiar no dtype das notas (mesma comparação de ``sweep_thresholds``, seja ele float ou np.float64)
+    threshold = values.dtype.type(threshold)
+    parts = []
+    for start in range(0, len(values), block):
+        rows, cols, scores = _top_prerequisites(values[start:start + block] < threshold, weights, top_n)
+        parts.append((rows + start, cols, scores))
+    rows, cols, scores = (np.concatenate(arrays) for arrays in zip(*parts))
+    return pd.DataFrame({
+        "Aluno": np.asarray(grades.students[rows]),
+        "Pré-requisito": prereqs[cols],
+        "Importância": scores,
+    })
+
+
+def sweep_thresholds(df, importance_table, thresholds, top_n=None, keep_recommendations=False,
+                     block=RECOMMEND_BLOCK):
+    """Recomendações para vários limiares de uma vez, sem retreinar.
+
+    Cada disciplina é ordenada uma única vez e ``searchsorted`` conta, para
+    todos os limiares, quantos alunos ficam abaixo de cada um. Para as
+    recomendações, ``searchsorted`` dá o primeiro limiar acima de cada nota;
+    a máscara "abaixo do limiar k" vira uma comparação de inteiros, sem
+    recalcular nada sobre as notas.
+
+    Retorna ``(tabela, recomendações)``: a tabela (limiar x disciplina) traz os
+    alunos abaixo do limiar em cada disciplina, os alunos com alguma
+    recomendação e o total de recomendações; ``recomendações`` é
+    ``{limiar: DataFrame}`` com ``keep_recommendations`` (senão, vazio).
+    """
+    subjects = list(importance_table.index)
+    prereqs = np.asarray(importance_table.columns, dtype=object)
+    weights = importance_table.to_numpy(dtype=float)
+    thresholds = np.unique(np.asarray(thresholds, dtype=float))
+
+    grades = as_grade_matrix(df, subjects)
+    values = grades.select(subjects)
+    # Limiares no dtype das notas, como na comparação ``notas < limiar`` de
+    # ``recommend_prerequisites``: em float64, uma nota 7,1 (float32) ficaria
+    # "abaixo de 7,1". A conversão preserva a ordem; a saída usa os limiares originais.
+    cast = thresholds.astype(values.dtype)
+    below_counts = np.empty((len(thresholds), len(subjects)), dtype=np.int64)
+    for j in range(len(subjects)):
+        # NaN ficam no fim da ordenação e nunca contam como abaixo do limiar
+        below_counts[:, j] = np.searchsorted(np.sort(values[:, j]), cast, side="left")
+
+    students = np.zeros(len(thresholds), dtype=np.int64)
+    totals = np.zeros(len(thresholds), dtype=np.int64)
+    parts = {k: [] for k in range(len(thresholds))}
+    if (top_n is None or top_n > 0) and len(prereqs):
+        for start in range(0, len(values), block):
+            # first[i, j]: índice do primeiro limiar acima da nota (nota < limiar k <=> first <= k)
+            first = np.searchsorted(cast, values[start:start + block], side="right")
+            for k in range(len(thresholds)):
+                rows, cols, scores = _top_prerequisites(first <= k, weights, top_n)
+                students[k] += np.unique(rows).size
+                totals[k] += rows.size
+                if keep_recommendations:
+                    parts[k].append((rows + start, cols, scores))
+
+    table = pd.DataFrame(below_counts, index=pd.Index(thresholds, name="Limiar"), columns=subjects)
+    table["Alunos com recomendação"] = students
+    table["Recomendações"] = totals
 
-def identify_prerequisite_issues(df, pre_reqs, threshold=5.0):
     recommendations = {}
-    metrics_summary = {}
+    if keep_recommendations:
+        for k, threshold in enumerate(thresholds):
+            if not parts[k]:
+                recommendations[threshold] = pd.DataFrame(columns=RECOMMENDATION_COLUMNS)
+                continue
+            rows, cols, scores = (np.concatenate(arrays) for arrays in zip(*parts[k]))
+            recommendations[threshold] = pd.DataFrame({
+                "Aluno": np.asarray(grades.students[rows]),
+                "Pré-requisito": prereqs[cols],
+                "Importância": scores,
+            })
+    return table, recommendations
+
+
+def fit_subject(X, y, backend="exact", overrides=None, feature_names=None):
+    """Treina e avalia os modelos de uma única disciplina.
+
+    Retorna as métricas por modelo, a importância de cada pré-requisito e os
+    modelos treinados. Não depende de estado global, então pode rodar em um
+    processo filho. ``backend`` segue ``models.resolve_backend``; ``overrides``
+    são parâmetros ajustados por modelo (ver ``tuning``). Com ``X`` em array,
+    ``feature_names`` dá o nome de cada coluna (pré-requisito).
+    """
+    from sklearn.model_selection import train_test_split
+
+    # Dividir os dados em treino e teste
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-    # Iteração sobre Disciplinas
+    # Avaliar modelos e coletar métricas
+    models = build_models(backend, len(X_train), overrides)
+    with timings.stage("evaluate_models", cat="model", rows=len(X_train)):
+        metrics = evaluate_models(X_train, X_test, y_train, y_test, models=models)
+
+    # O modelo de árvores já treinado na avaliação fornece a importância dos pré-requisitos
+    with timings.stage("feature_importances", cat="model", rows=len(X_test)):
+        importances = feature_importances(models, X_test, y_test, feature_names)
+    return metrics, importances, models
+
+
+def resolve_jobs(jobs):
+    """Converte o valor de --jobs em número de processos (<= 0 usa todas as CPUs)."""
+    if jobs is None:
+        return 1
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+def run_tasks(fn, *iterables, jobs=1):
+    """Aplica ``fn`` às tarefas, em um pool de processos quando ``jobs > 1``.
+
+    A ordem dos resultados é a ordem das tarefas, igual à execução serial.
+    """
+    tasks = list(zip(*iterables))
+    jobs = min(resolve_jobs(jobs), len(tasks))
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(fn, *zip(*tasks)))
+    return [fn(*task) for task in tasks]
+
+
+def run_traced_tasks(fn, names, *iterables, jobs=1):
+    """Como ``run_tasks``, medindo cada tarefa (``timings``) quando a instrumentação está ligada.
+
+    Os estágios abertos dentro das tarefas, inclusive em processos filhos, voltam junto com o resultado.
+    """
+    if not timings.enabled():
+        return run_tasks(fn, *iterables, jobs=jobs)
+    outputs = run_tasks(partial(timings.traced_call, fn), names, *iterables, jobs=jobs)
+    return [timings.collect(output) for output in outputs]
+
+
+def fit_subjects(df, pre_reqs, jobs=1, cv=None, repeats=1, backend="auto", tuned=None):
+    """Treina todas as disciplinas, opcionalmente em paralelo.
+
+    Retorna um dicionário com ``metrics`` e ``importances`` por disciplina e
+    os modelos treinados em ``models``. Com ``cv``, as métricas vêm de
+    validação cruzada K-fold repetida (ver ``cross_validate_subjects``).
+    O backend ``auto`` é resolvido uma vez pelo número de alunos, para todas
+    as disciplinas usarem os mesmos estimadores. ``tuned`` traz parâmetros
+    ajustados por disciplina e modelo (``tuning.tune_subjects``).
+
+    ``df`` pode ser um DataFrame ou uma ``grades.GradeMatrix``; as fatias de
+    cada disciplina são visões do array de notas (sem cópia no modo serial).
+    """
+    grades = as_grade_matrix(df, training_columns(pre_reqs))
+    backend = resolve_backend(backend, len(grades))
+    tuned = tuned or {}
+    if cv:
+        return cross_validate_subjects(
+            grades, pre_reqs, cv, repeats=repeats, jobs=jobs, backend=backend, tuned=tuned
+        )
+
+    # Disciplinas são independentes entre si; cada uma vira uma tarefa
+    subjects = list(pre_reqs)
+    X_parts = [grades.select(pre_reqs[subject]) for subject in subjects]
+    y_parts = [grades.column(subject) for subject in subjects]
+    names = [f"fit:{subject}" for subject in subjects]
+    overrides = [tuned.get(subject) for subject in subjects]
+    results = run_traced_tasks(
+        fit_subject, names, X_parts, y_parts, [backend] * len(subjects), overrides,
+        [pre_reqs[subject] for subject in subjects], jobs=jobs,
+    )
+
+    fitted = {"metrics": {}, "importances": {}, "models": {}}
+    for subject, (metrics, importances, models) in zip(subjects, results):
+        fitted["metrics"][subject] = metrics
+        fitted["importances"][subject] = importances
+        fitted["models"][subject] = models
+    return fitted
+
+
+def cross_validate_subjects(df, pre_reqs, cv, repeats=1, jobs=1, backend="exact", tuned=None):
+    """Validação cruzada K-fold repetida para cada par (disciplina, modelo).
+
+    Os folds de cada disciplina são calculados uma única vez e compartilhados
+    pelos três estimadores. Cada par vira uma tarefa no pool de processos.
+    As métricas trazem média e desvio padrão; os modelos finais são treinados
+    com todos os dados e o modelo de árvores final fornece as importâncias.
+    """
+    if cv < 2:
+        raise ValueError("cv precisa ser >= 2 para validação cruzada")
+    from sklearn.model_selection import RepeatedKFold
+
+    grades = as_grade_matrix(df, training_columns(pre_reqs))
+    model_names = list(build_models(backend, len(grades)))
+    tasks = []
     for subject, reqs in pre_reqs.items():
-        X = df[reqs]
-        y = df[subject]
+        X = grades.select(reqs)
+        y = grades.column(subject)
+        splitter = RepeatedKFold(n_splits=cv, n_repeats=repeats, random_state=42)
+        splits = list(splitter.split(X))
+        for name in model_names:
+            tasks.append((subject, name, X, y, splits, (tuned or {}).get(subject)))
+
+    subjects, names, X_parts, y_parts, split_parts, overrides = zip(*tasks)
+    labels = [f"cv:{subject}/{name}" for subject, name in zip(subjects, names)]
+    results = run_traced_tasks(
+        cross_validate_model, labels, names, X_parts, y_parts, split_parts, [backend] * len(names), overrides,
+        jobs=jobs,
+    )
+
+    fitted = {"metrics": {}, "importances": {}, "models": {}}
+    for subject, name, (summary, model) in zip(subjects, names, results):
+        fitted["metrics"].setdefault(subject, {})[name] = summary
+        fitted["models"].setdefault(subject, {})[name] = model
+    for subject, reqs in pre_reqs.items():
+        fitted["importances"][subject] = feature_importances(
+            fitted["models"][subject], grades.select(reqs), grades.column(subject), reqs
+        )
+    return fitted
+
+
+def training_columns(pre_reqs):
+    """Colunas usadas no treino, na ordem em que aparecem no mapeamento."""
+    return list(dict.fromkeys(
+        col for subject, reqs in pre_reqs.items() for col in [subject, *reqs]
+    ))
+
+
+def recommendation_table(importances, pre_reqs, hops=1):
+    """Tabela de importâncias usada nas recomendações (com saltos indiretos se ``hops > 1``)."""
+    importance_table = build_importance_table(importances, pre_reqs)
+    if hops > 1:
+        importance_table = PrerequisiteGraph(pre_reqs).multi_hop_importances(importance_table, hops)
+    return importance_table
 
-        # Dividir os dados em treino e teste
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-        # Avaliar modelos e coletar métricas
-        metrics = evaluate_models(X_train, X_test, y_train, y_test)
-        metrics_summary[subject] = metrics
+def identify_prerequisite_issues(
+    df, pre_reqs, threshold=5.0, top_n=None, jobs=1, cache=None, cv=None, repeats=1, hops=1,
+    return_fitted=False, backend="auto", tuned=None, data_key=None,
+):
+    """Treina os modelos por disciplina e gera as recomendações.
 
-        # Treinar o modelo Random Forest
-        model = RandomForestRegressor(random_state=42)
-        model.fit(X_train, y_train)
+    Com ``cache`` (um ``cache.StageCache``), modelos e recomendações são
+    reaproveitados quando dados, mapeamento, parâmetros e limiar não mudaram.
+    Com ``cv``, as métricas vêm de validação cruzada K-fold repetida ``repeats`` vezes.
+    Com ``hops > 1``, pré-requisitos indiretos (até ``hops`` saltos no
+    ``graph.PrerequisiteGraph``) também entram nas recomendações.
+    Com ``return_fitted``, devolve também o resultado de ``fit_subjects``.
+    ``backend`` escolhe os estimadores (ver ``models.resolve_backend``) e
+    ``tuned`` traz parâmetros ajustados por disciplina (ver ``tuning``).
+    ``df`` pode ser um DataFrame ou uma ``grades.GradeMatrix`` (convertido uma vez).
+    ``data_key`` identifica os dados sem lê-los (ex.: tamanho e mtime do arquivo
+    de entrada) e, se dado, substitui o hash das notas nas chaves de cache.
+    """
+    columns = training_columns(pre_reqs)
+    grades = as_grade_matrix(df, columns)
+    backend = resolve_backend(backend, len(grades))
 
-        # Verificar a importância dos pré-requisitos
-        importance = model.feature_importances_
-        importance_dict = {req: imp for req, imp in zip(reqs, importance)}
+    def fit():
+        with timings.stage("fit_subjects", subjects=len(pre_reqs), rows=len(grades)):
+            return fit_subjects(
+                grades, pre_reqs, jobs=jobs, cv=cv, repeats=repeats, backend=backend, tuned=tuned
+            )
 
-        # Recomendações
-        for _, row in df.iterrows():
-            if row[subject] < threshold:
-                aluno = row["Aluno"]
-                if aluno not in recommendations:
-                    recommendations[aluno] = []
+    models_key = None
+    if cache is not None:
+        data = grades.select(columns) if data_key is None else data_key
+        models_key = cache.key(
+            "models", data, pre_reqs, model_params(backend, len(grades)), cv, repeats, tuned or {},
+        )
+        fitted = cache.get_or_compute(models_key, fit)
+    else:
+        fitted = fit()
 
-                for req in reqs:
-                    if req not in recommendations[aluno]:
-                        recommendations[aluno].append((req, importance_dict[req]))
+    # Recomendações
+    def recommend():
+        with timings.stage("recommend_prerequisites", rows=len(grades)):
+            importance_table = recommendation_table(fitted["importances"], pre_reqs, hops)
+            return recommend_prerequisites(grades, importance_table, threshold=threshold, top_n=top_n)
 
-    # Ordenação das recomendações
-    for aluno in recommendations:
-        recommendations[aluno] = sorted(recommendations[aluno], key=lambda x: x[1], reverse=True)
+    if cache is not None:
+        data = grades.subset(list(pre_reqs)) if data_key is None else data_key
+        recs_key = cache.key("recommendations", models_key, data, threshold, top_n, hops)
+        recommendations = cache.get_or_compute(recs_key, recommend)
+    else:
+        recommendations = recommend()
 
-    return recommendations, metrics_summary
+    if return_fitted:
+        return recommendations, fitted["metrics"], fitted
+    return recommendations, fitted["metrics"]
@@ -0,0 +1,224 @@
+import argparse
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from flask import Flask, abort, jsonify, request
+
+from compiled import compile_models
+from graph import PrerequisiteGraph
+from incremental import STATE_PATH, load_state
+from loader import GRADE_MAX, GRADE_MIN
+from prerequisite_issues import recommend_prerequisites, recommendation_table
+
+
+class MicroBatcher:
+    """Agrupa chamadas concorrentes em um único lote.
+
+    Cada requisição entrega suas linhas e espera; uma thread de fundo junta
+    o que chegou em até ``max_wait`` segundos (ou ``max_batch`` linhas),
+    chama ``fn`` uma vez com o lote inteiro e devolve a cada requisição a
+    sua fatia do resultado.
+    """
+
+    def __init__(self, fn, max_batch=512, max_wait=0.005):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        done = threading.Event()
+        slot = {"rows": rows, "done": done}
+        self._queue.put(slot)
+        done.wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["result"]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0]["rows"])
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    slot = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(slot)
+                size += len(slot["rows"])
+
+            try:
+                results = self.fn([row for slot in batch for row in slot["rows"]])
+                start = 0
+                for slot in batch:
+                    slot["result"] = results[start:start + len(slot["rows"])]
+                    start += len(slot["rows"])
+            except Exception as exc:
+                for slot in batch:
+                    slot["error"] = exc
+            for slot in batch:
+                slot["done"].set()
+
+
+class Scorer:
+    """Modelos e tabelas carregados uma única vez a partir do estado salvo (``--save``).
+
+    Para cada disciplina usa o modelo de maior R² (compilado por
+    ``compiled.compile_model`` quando possível) para prever a nota a partir
+    dos pré-requisitos; notas ausentes são preenchidas pela previsão, em ordem
+    topológica, antes de gerar as recomendações.
+    """
+
+    def __init__(self, state):
+        self.pre_reqs = state["pre_reqs"]
+        self.params = state["params"]
+        metrics = state["fitted"]["metrics"]
+        # Modelos compilados em arrays NumPy (mesma previsão, sem o custo por chamada do sklearn)
+        self.models = compile_models({
+            subject: state["fitted"]["models"][subject][max(metrics[subject], key=lambda m: metrics[subject][m]["R²"])]
+            for subject in self.pre_reqs
+        })
+        self.importance_table = recommendation_table(
+            state["fitted"]["importances"], self.pre_reqs, self.params.get("hops", 1)
+        )
+        self.subjects = [col for col in state["df"].columns if col != "Aluno"]
+        self.order = [s for s in PrerequisiteGraph(self.pre_reqs).order if s in self.pre_reqs]
+
+        recs = state["recommendations"]
+        self.recommendations = {
+            str(aluno): group[["Pré-requisito", "Importância"]].to_dict(orient="records")
+            for aluno, group in recs.groupby(recs["Aluno"].astype(str), sort=False)
+        }
+
+    def score(self, rows):
+        """Pontua vários alunos de uma vez: uma chamada de ``predict`` por disciplina."""
+        batch = pd.DataFrame(rows)
+        if "Aluno" not in batch.columns:
+            batch["Aluno"] = [f"#{i}" for i in range(len(batch))]
+        for subject in self.subjects:
+            if subject not in batch.columns:
+                batch[subject] = np.nan
+        batch[self.subjects] = batch[self.subjects].astype(float)
+
+        # Em ordem topológica, previsões de uma disciplina alimentam as que dependem dela;
+        # a nota informada tem prioridade e a prevista cobre as ausentes
+        filled = batch.copy()
+        predictions = pd.DataFrame(np.nan, index=batch.index, columns=list(self.pre_reqs))
+        for subject in self.order:
+            reqs = self.pre_reqs[subject]
+            ready = filled[reqs].notna().all(axis=1).to_numpy()
+            if ready.any():
+                predictions.loc[ready, subject] = self.models[subject].predict(
+                    filled.loc[ready, reqs].to_numpy(dtype=np.float32)
+                )
+            filled[subject] = filled[subject].fillna(predictions[subject])
+        filled = filled.reset_index(drop=True)
+        filled["Aluno"] = np.arange(len(filled))
+        recs = recommend_prerequisites(
+            filled, self.importance_table, threshold=self.params["threshold"], top_n=self.params.get("top_n"),
+        )
+        grouped = {
+            row: group[["Pré-requisito", "Importância"]].to_dict(orient="records")
+            for row, group in recs.groupby("Aluno", sort=False)
+        }
+
+        results = []
+        for i, aluno in enumerate(batch["Aluno"]):
+            preds = predictions.iloc[i]
+            results.append({
+                "Aluno": aluno,
+                "previsoes": {s: round(float(v), 4) for s, v in preds.items() if not np.isnan(v)},
+                "recomendacoes": [
+                    {"Pré-requisito": r["Pré-requisito"], "Importância": round(float(r["Importância"]), 6)}
+                    for r in grouped.get(i, [])
+                ],
+            })
+        return results
+
+
+def cached_json(payload):
+    """Resposta JSON com ETag; devolve 304 se o cliente já tem a mesma versão (só em GET)."""
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+    return response.make_conditional(request)
+
+
+def create_app(state_path=STATE_PATH, max_batch=512, max_wait=0.005):
+    scorer = Scorer(load_state(state_path))
+    batcher = MicroBatcher(scorer.score, max_batch=max_batch, max_wait=max_wait)
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+    app.json.sort_keys = False
+
+    @app.route("/health")
+    def health():
+        return jsonify({"status": "ok", "disciplinas": len(scorer.pre_reqs)})
+
+    @app.route("/score", methods=["POST"])
+    def score():
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict) and "alunos" in payload:
+            rows, single = payload["alunos"], False
+            if not isinstance(rows, list):
+                abort(400, description="'alunos' deve ser uma lista de alunos")
+        elif isinstance(payload, dict):
+            rows, single = [payload], True
+        elif isinstance(payload, list):
+            rows, single = payload, False
+        else:
+            abort(400, description="Envie um aluno (objeto JSON) ou uma lista em 'alunos'")
+        if not rows:
+            return jsonify([])
+        # Valida antes de entrar no lote, para um aluno inválido não derrubar requisições vizinhas
+        known = set(scorer.subjects)
+        for row in rows:
+            if not isinstance(row, dict):
+                abort(400, description="Cada aluno deve ser um objeto com notas numéricas")
+            unknown = [key for key in row if key != "Aluno" and key not in known]
+            if unknown:
+                abort(400, description=f"Disciplinas desconhecidas: {', '.join(map(str, unknown))}")
+            for key, value in row.items():
+                if key == "Aluno" or value is None:
+                    continue
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    abort(400, description=f"Nota não numérica em '{key}': {value!r}")
+                if not GRADE_MIN <= value <= GRADE_MAX:
+                    abort(400, description=f"Nota fora de [{GRADE_MIN:g}, {GRADE_MAX:g}] em '{key}': {value}")
+        # POST não é revalidado por ETag (If-None-Match só vale para GET), então a resposta vai sem ele
+        results = batcher.submit(rows)
+        return jsonify(results[0] if single else results)
+
+    @app.route("/recommendations/<aluno>")
+    def recommendations(aluno):
+        if aluno not in scorer.recommendations:
+            abort(404, description=f"Aluno sem recomendações: {aluno}")
+        return cached_json({"Aluno": aluno, "recomendacoes": scorer.recommendations[aluno]})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP de recomendações do SIDA")
+    parser.add_argument("--state", default=str(STATE_PATH), help="Estado gravado por main.py --save")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-batch", type=int, default=512, help="Máximo de alunos por lote de predição")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="Espera máxima para formar um lote")
+    args = parser.parse_args()
+
+    app = create_app(args.state, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
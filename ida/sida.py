@@ -1,7 +1,101 @@
+"""Painel do SIDA: ``streamlit run sida.py``.
+
+Leitura, filtros, ordenação e agregação rodam no servidor (``dashboard.py``)
+e ficam memoizados; o navegador recebe só a página atual ou a tabela
+agregada. Os caches são chaveados pelo mtime do arquivo, então uma nova
+execução de ``main.py`` é vista na próxima interação.
+"""
 import streamlit as st
-import pandas as pd
 
-df = pd.read_csv('oulad_atributos_selecionados.csv')
+import dashboard
+
+
+@st.cache_resource(max_entries=4)
+def load_table(path, mtime):
+    # cache_resource: a tabela é compartilhada entre sessões e reruns sem ser copiada/serializada
+    return dashboard.read_table(path)
+
+
+@st.cache_data(max_entries=64)
+def query_rows(path, mtime, equals, ranges, contains, sort_by, ascending):
+    return dashboard.filter_rows(
+        load_table(path, mtime), equals, ranges, contains, sort_by=sort_by, ascending=ascending
+    )
+
+
+@st.cache_data(max_entries=64)
+def query_aggregate(path, mtime, equals, ranges, contains, by, column, func):
+    rows = query_rows(path, mtime, equals, ranges, contains, None, True)
+    return dashboard.aggregate(load_table(path, mtime), rows, by, column, func)
+
+
+@st.cache_data(max_entries=16)
+def query_range(path, mtime, col):
+    return dashboard.column_range(load_table(path, mtime), col)
+
+
+st.set_page_config(page_title="SIDA", layout="wide")
+st.title("SIDA — painel")
+
+fontes = dashboard.sources()
+fonte = st.sidebar.selectbox("Tabela", list(fontes))
+path = str(fontes[fonte])
+mtime = dashboard.file_mtime(path)
+if mtime is None:
+    st.error(f"Arquivo não encontrado: {path}")
+    st.stop()
+
+df = load_table(path, mtime)
+numericas, opcoes, texto = dashboard.column_kinds(df)
+
+st.sidebar.header("Filtros")
+equals, ranges, contains = [], [], []
+for col in opcoes:
+    escolhidos = st.sidebar.multiselect(col, list(df[col].cat.categories), key=f"eq-{fonte}-{col}")
+    if escolhidos:
+        equals.append((col, tuple(escolhidos)))
+for col in texto:
+    busca = st.sidebar.text_input(f"{col} contém", key=f"txt-{fonte}-{col}")
+    if busca:
+        contains.append((col, busca))
+for col in numericas:
+    low, high = query_range(path, mtime, col)
+    if low < high:
+        escolhido = st.sidebar.slider(col, low, high, (low, high), key=f"rng-{fonte}-{col}")
+        if escolhido != (low, high):
+            ranges.append((col, escolhido))
+equals, ranges, contains = tuple(equals), tuple(ranges), tuple(contains)
+
+aba_tabela, aba_grupos = st.tabs(["Tabela", "Agrupar"])
+
+with aba_tabela:
+    c1, c2, c3 = st.columns(3)
+    ordenar = c1.selectbox("Ordenar por", ["(ordem original)", *df.columns], key=f"sort-{fonte}")
+    crescente = c2.radio("Ordem", ["Crescente", "Decrescente"], horizontal=True) == "Crescente"
+    tamanho = c3.selectbox("Linhas por página", dashboard.PAGE_SIZES, index=1)
+    sort_by = None if ordenar == "(ordem original)" else ordenar
+
+    rows = query_rows(path, mtime, equals, ranges, contains, sort_by, crescente)
+    # A página pedida vem do estado do widget; dashboard.page a limita e dá o total de páginas
+    chave = f"pagina-{fonte}"
+    pagina, paginas = dashboard.page(df, rows, int(st.session_state.get(chave, 1)), tamanho)
+    if st.session_state.get(chave, 1) > paginas:
+        st.session_state[chave] = paginas
+    numero = st.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave)
+    st.caption(f"{len(rows):,} de {len(df):,} linhas — página {int(numero)} de {paginas}".replace(",", "."))
+    st.dataframe(pagina, use_container_width=True)
 
-df.head()
-st.dataframe(df)
\ No newline at end of file
+with aba_grupos:
+    agrupaveis = opcoes + texto + [c for c in numericas if c not in opcoes]
+    c1, c2, c3 = st.columns(3)
+    by = c1.selectbox("Agrupar por", agrupaveis, key=f"by-{fonte}")
+    func = c2.selectbox("Agregação", dashboard.AGGREGATIONS)
+    column = None
+    if func != "count":
+        column = c3.selectbox("Coluna", [c for c in numericas if c != by], key=f"agg-{fonte}")
+    if by is not None and (func == "count" or column is not None):
+        resumo = query_aggregate(path, mtime, equals, ranges, contains, by, column, func)
+        st.caption(f"{len(resumo):,} grupos".replace(",", "."))
+        st.dataframe(resumo.head(dashboard.MAX_GROUPS), use_container_width=True)
+        if len(resumo) > dashboard.MAX_GROUPS:
+            st.caption(f"Mostrando os {dashboard.MAX_GROUPS} primeiros grupos.")
@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+FORMATS = ("parquet", "feather")
+
+METRICS_SCHEMA = pa.schema([
+    ("Disciplina", pa.string()),
+    ("Modelo", pa.dictionary(pa.int8(), pa.string())),
+    ("MAE", pa.float64()),
+    ("MSE", pa.float64()),
+    ("R2", pa.float64()),
+    ("MAE_std", pa.float64()),
+    ("MSE_std", pa.float64()),
+    ("R2_std", pa.float64()),
+])
+RECOMMENDATIONS_SCHEMA = pa.schema([
+    ("Aluno", pa.string()),
+    ("Pré-requisito", pa.string()),
+    ("Importância", pa.float64()),
+])
+
+SCHEMAS = {"metrics": METRICS_SCHEMA, "recommendations": RECOMMENDATIONS_SCHEMA}
+# Coluna usada para particionar cada tabela no formato Parquet
+PARTITIONS = {"metrics": "Disciplina", "recommendations": "Pré-requisito"}
+
+
+def _to_table(df, schema):
+    """Converte para Arrow com tipos fixos; colunas ausentes viram nulos reais."""
+    columns = {}
+    for field in schema:
+        if field.name in df.columns:
+            values = df[field.name]
+            if str(values.dtype) == "category":
+                values = values.astype(str)
+            columns[field.name] = pa.array(values.to_numpy(), type=field.type, from_pandas=True)
+        else:
+            columns[field.name] = pa.nulls(len(df), type=field.type)
+    return pa.table(columns, schema=schema)
+
+
+def artifact_path(out_dir, name, formato):
+    """Diretório Parquet ``<name>/`` ou arquivo ``<name>.feather`` dentro de ``out_dir``."""
+    out_dir = Path(out_dir)
+    return out_dir / name if formato == "parquet" else out_dir / f"{name}.feather"
+
+
+def write_table(df, path, name, formato="parquet"):
+    """Grava a tabela ``name`` (metrics ou recommendations) exatamente em ``path``.
+
+    - ``parquet``: diretório particionado (hive) pela coluna de ``PARTITIONS``,
+      com as linhas ordenadas por ``Aluno`` quando existe, para que as
+      estatísticas dos row groups permitam filtrar um aluno sem ler tudo.
+    - ``feather``: arquivo único sem compressão, para recarga local via memmap.
+    """
+    if formato not in FORMATS:
+        raise ValueError(f"Formato não suportado: {formato} (use {', '.join(FORMATS)})")
+    schema = SCHEMAS[name]
+    table = _to_table(df, schema)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if formato == "feather":
+        feather.write_feather(table, path, compression="uncompressed")
+        return path
+
+    if "Aluno" in table.column_names:
+        table = table.sort_by([("Aluno", "ascending")])
+    partition = PARTITIONS[name]
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([schema.field(partition)]), flavor="hive"),
+        existing_data_behavior="delete_matching",
+        max_rows_per_group=64 * 1024,
+    )
+    return path
+
+
+def _load(out_dir, name, formato, filters):
+    path = artifact_path(out_dir, name, formato)
+    schema = SCHEMAS[name]
+    expression = None
+    for column, value in filters.items():
+        if value is None:
+            continue
+        condition = pc.field(column) == value
+        expression = condition if expression is None else expression & condition
+
+    if formato == "feather":
+        dataset = ds.dataset(path, format="feather")
+    else:
+        partition = PARTITIONS[name]
+        dataset = ds.dataset(
+            path,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([schema.field(partition)]), flavor="hive"),
+        )
+    # Filtro aplicado na leitura: partições e row groups descartados não são lidos
+    table = dataset.to_table(filter=expression, columns=schema.names)
+    return table.to_pandas()
+
+
+def load_metrics(out_dir, disciplina=None, formato="parquet"):
+    return _load(out_dir, "metrics", formato, {"Disciplina": disciplina})
+
+
+def load_recommendations(out_dir, disciplina=None, aluno=None, formato="parquet"):
+    """Recarrega recomendações, opcionalmente só de um pré-requisito (``disciplina``) e/ou aluno."""
+    return _load(
+        out_dir, "recommendations", formato,
+        {"Pré-requisito": disciplina, "Aluno": aluno},
+    )
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os módulos do SIDA se importam como irmãos (``from models import ...``)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
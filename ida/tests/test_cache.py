@@ -0,0 +1,35 @@
+import numpy as np
+
+from cache import StageCache
+
+
+def test_entrada_maior_que_o_limite_nao_e_gravada(tmp_path):
+    cache = StageCache(tmp_path, max_bytes=4096)
+    small = cache.put(cache.key("small", 1), np.zeros(16))
+    big = np.zeros(10_000)
+    assert cache.put(cache.key("big", 1), big) is big
+    assert not list(tmp_path.glob("big-*.pkl"))
+    # A entrada anterior continua no cache
+    np.testing.assert_array_equal(cache.get(cache.key("small", 1)), small)
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_chave_de_dados_substitui_o_hash_das_notas(tmp_path):
+    from prerequisite_issues import identify_prerequisite_issues
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(0, 10, (200, 3)), columns=["A", "B", "C"]).astype(np.float32)
+    df.insert(0, "Aluno", [f"Aluno_{i}" for i in range(len(df))])
+    pre_reqs = {"C": ["A", "B"]}
+    cache = StageCache(tmp_path)
+    data_key = {"notas.csv": (1234, 5678)}
+    identify_prerequisite_issues(df, pre_reqs, cache=cache, backend="exact", data_key=data_key)
+
+    # Mesma chave: os estágios são reaproveitados sem olhar as notas
+    changed = df.assign(C=df["C"] + 1)
+    identify_prerequisite_issues(changed, pre_reqs, cache=cache, backend="exact", data_key=data_key)
+    assert cache.hits == ["models", "recommendations"]
+
+    identify_prerequisite_issues(changed, pre_reqs, cache=cache, backend="exact", data_key={"notas.csv": (1234, 9999)})
+    assert cache.hits == ["models", "recommendations"]
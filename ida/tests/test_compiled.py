@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from compiled import PER_TREE_MIN_ROWS, compile_model
+
+
+def _data(n=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 10, (n, 4)).astype(np.float32)
+    y = X @ np.array([0.5, 0.2, 0.2, 0.1]) + rng.normal(0, 0.5, n)
+    return X, y
+
+
+@pytest.mark.parametrize("rows", [1, 100, PER_TREE_MIN_ROWS, 2_500])
+def test_floresta_igual_ao_sklearn(rows):
+    from sklearn.ensemble import RandomForestRegressor
+
+    X, y = _data()
+    model = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+    np.testing.assert_array_equal(compile_model(model).predict(X[:rows]), model.predict(X[:rows]))
+
+
+@pytest.mark.parametrize("rows", [1, 100, PER_TREE_MIN_ROWS, 2_500])
+def test_boosting_com_faltantes_igual_ao_sklearn(rows):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+
+    X, y = _data()
+    X = X.astype(np.float64)
+    X[::7, 1] = np.nan
+    model = HistGradientBoostingRegressor(max_iter=30, random_state=0).fit(X, y)
+    np.testing.assert_array_equal(compile_model(model).predict(X[:rows]), model.predict(X[:rows]))
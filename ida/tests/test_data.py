@@ -0,0 +1,41 @@
+import numpy as np
+
+from data import _prereq_weights, create_data, create_grade_matrix, generate_chunk, random_curriculum, write_cohort
+from loader import load_grade_matrix, load_gradebook
+
+
+def test_bloco_com_disciplinas_fora_da_ordem_topologica():
+    subjects, pre_reqs = random_curriculum(12, n_layers=4, seed=0)
+    shuffled = subjects[::-1]
+    weights = _prereq_weights(shuffled, pre_reqs, np.random.SeedSequence(1))
+    grades = generate_chunk(shuffled, pre_reqs, weights, 500, np.random.SeedSequence(2))
+    assert not np.isnan(grades).any()
+    assert grades.min() >= 0 and grades.max() <= 10
+
+
+def test_npy_lido_pelo_loader(tmp_path):
+    subjects, pre_reqs = random_curriculum(6, n_layers=3, seed=0)
+    path = write_cohort(tmp_path / "turma.npy", subjects, pre_reqs, 1_000, seed=3, chunk_size=300)
+    df, loaded = load_gradebook(path, chunksize=256)
+    assert loaded == pre_reqs
+    assert len(df) == 1_000
+    assert df["Aluno"].iloc[0] == "Aluno_1" and df["Aluno"].iloc[-1] == "Aluno_1000"
+    columns = list(dict.fromkeys(col for subject, reqs in pre_reqs.items() for col in [subject, *reqs]))
+    matrix = np.load(path)
+    expected = matrix[:, [subjects.index(col) for col in columns]]
+    np.testing.assert_array_equal(df[columns].to_numpy(), expected)
+
+
+def test_matriz_de_notas_sem_copia(tmp_path):
+    subjects, pre_reqs = random_curriculum(6, n_layers=3, seed=0)
+    path = write_cohort(tmp_path / "turma.npy", subjects, pre_reqs, 1_000, seed=3, chunk_size=300)
+    grades, _ = load_grade_matrix(path, chunksize=256)
+    assert grades.values.flags.f_contiguous
+    df = grades.to_frame()
+    assert np.shares_memory(df[grades.subjects[0]].to_numpy(), grades.values)
+
+    matrix, pre_reqs = create_grade_matrix(seed=1)
+    df, same = create_data(seed=1)
+    assert pre_reqs == same
+    np.testing.assert_array_equal(matrix.values, df[matrix.subjects].to_numpy())
+    assert list(matrix.students) == df["Aluno"].tolist()
@@ -0,0 +1,8 @@
+from bench import IMPORT_BUDGET_MS, import_time
+
+
+def test_importar_main_dentro_do_orcamento():
+    total_ms, _, loaded = import_time()
+    assert total_ms <= IMPORT_BUDGET_MS
+    # Bibliotecas pesadas só são carregadas quando usadas
+    assert not {"sklearn", "matplotlib", "ydata_profiling", "scipy"} & set(loaded)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from incremental import apply_delta, build_state, load_state, save_state, update_state
+from prerequisite_issues import fit_subjects, recommend_prerequisites, recommendation_table
+
+PRE_REQS = {"C": ["A", "B"], "D": ["C", "B"], "E": ["D"]}
+PARAMS = {"threshold": 5.0, "top_n": None, "hops": 3, "cv": None, "repeats": 1, "backend": "exact", "tuned": None}
+
+
+def _cohort(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    a, b = rng.uniform(0, 10, n), rng.uniform(0, 10, n)
+    c = np.clip(0.7 * a + 0.3 * b + rng.normal(0, 1, n), 0, 10)
+    d = np.clip(0.6 * c + 0.4 * b + rng.normal(0, 1, n), 0, 10)
+    e = np.clip(d + rng.normal(0, 1, n), 0, 10)
+    df = pd.DataFrame({"A": a, "B": b, "C": c, "D": d, "E": e}).astype(np.float32)
+    df.insert(0, "Aluno", [f"Aluno_{i}" for i in range(n)])
+    return df
+
+
+def _state(df):
+    fitted = fit_subjects(df, PRE_REQS, backend="exact")
+    table = recommendation_table(fitted["importances"], PRE_REQS, PARAMS["hops"])
+    recommendations = recommend_prerequisites(df, table, threshold=PARAMS["threshold"])
+    return build_state(df, PRE_REQS, fitted, recommendations, PARAMS)
+
+
+def _delta(df, n=60, seed=1):
+    # Só a coluna A muda: C é retreinada; D e E só mudam pelos caminhos de vários saltos
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(df), n, replace=False)
+    return pd.DataFrame({"Aluno": df["Aluno"].iloc[rows].to_numpy(), "A": rng.uniform(0, 10, n).astype(np.float32)})
+
+
+def test_aluno_novo_sem_todas_as_disciplinas():
+    df = _cohort(10)
+    delta = pd.DataFrame({"Aluno": ["Novo"], "A": np.float32([5.0])})
+    with pytest.raises(ValueError, match="Alunos novos"):
+        apply_delta(df, delta)
+
+
+def test_atualizacao_com_varios_saltos_igual_ao_recalculo_completo():
+    state = _state(_cohort())
+    new_state, summary = update_state(state, _delta(state["df"]), drift_tolerance=0.0)
+    assert summary["subjects_refit"] == ["C"]
+
+    table = recommendation_table(new_state["fitted"]["importances"], PRE_REQS, PARAMS["hops"])
+    full = recommend_prerequisites(new_state["df"], table, threshold=PARAMS["threshold"])
+    pd.testing.assert_frame_equal(
+        new_state["recommendations"].reset_index(drop=True), full.reset_index(drop=True),
+    )
+
+
+def test_gravacao_parcial_do_estado(tmp_path):
+    state = _state(_cohort())
+    save_state(state, tmp_path)
+    untouched = {p.name: p.stat().st_mtime_ns for p in (tmp_path / "subjects").iterdir()}
+
+    new_state, summary = update_state(state, _delta(state["df"]), drift_tolerance=0.0)
+    save_state(new_state, tmp_path, changes=summary["changes"])
+    rewritten = [name for name, mtime in untouched.items()
+                 if (tmp_path / "subjects" / name).stat().st_mtime_ns != mtime]
+    assert rewritten == ["0000.pkl"]
+
+    loaded = load_state(tmp_path)
+    pd.testing.assert_frame_equal(loaded["df"], new_state["df"])
+    pd.testing.assert_frame_equal(loaded["recommendations"], new_state["recommendations"])
+    assert loaded["drift"] == new_state["drift"]
+    assert loaded["fitted"]["importances"] == new_state["fitted"]["importances"]
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("flask")
+
+from incremental import build_state, save_state
+from prerequisite_issues import fit_subjects, recommend_prerequisites, recommendation_table
+from service import create_app
+
+PRE_REQS = {"C": ["A", "B"]}
+PARAMS = {"threshold": 5.0, "top_n": None, "hops": 1, "cv": None, "repeats": 1, "backend": "exact", "tuned": None}
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(0, 10, (200, 3)), columns=["A", "B", "C"]).astype(np.float32)
+    df.insert(0, "Aluno", [f"Aluno_{i}" for i in range(len(df))])
+    fitted = fit_subjects(df, PRE_REQS, backend="exact")
+    recs = recommend_prerequisites(df, recommendation_table(fitted["importances"], PRE_REQS), threshold=5.0)
+    path = tmp_path_factory.mktemp("state")
+    save_state(build_state(df, PRE_REQS, fitted, recs, PARAMS), path)
+    return create_app(path).test_client()
+
+
+def test_score_sem_etag(client):
+    response = client.post("/score", json={"A": 3.0, "B": 4.5})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert set(response.get_json()["previsoes"]) == {"C"}
+
+
+@pytest.mark.parametrize("payload", [
+    {"A": 3.0, "Física": 5.0},
+    {"A": 11.0},
+    {"B": -0.5},
+    {"A": True},
+    {"alunos": [{"A": 3.0}, {"C": "7"}]},
+    {"alunos": 5},
+    {"alunos": "x"},
+])
+def test_score_rejeita_entrada_invalida(client, payload):
+    assert client.post("/score", json=payload).status_code == 400
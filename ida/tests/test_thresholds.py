@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from prerequisite_issues import recommend_prerequisites, sweep_thresholds
+
+
+def _cohort(n=2_000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Notas com uma casa decimal: 7,1 não é representável em float32
+    notas = np.round(rng.uniform(4, 10, (n, 3)), 1)
+    df = pd.DataFrame(notas, columns=["Frações", "Equações", "Funções"]).astype(np.float32)
+    df.insert(0, "Aluno", [f"Aluno_{i}" for i in range(n)])
+    importance = pd.DataFrame(
+        {"Frações": [1.0, 0.4], "Equações": [0.0, 0.6]}, index=["Equações", "Funções"],
+    )
+    return df, importance
+
+
+def test_varredura_igual_ao_limiar_unico_em_valor_nao_representavel():
+    df, importance = _cohort()
+    assert (df["Equações"] == np.float32(7.1)).any()
+    table, recs = sweep_thresholds(df, importance, [6.9, 7.1], keep_recommendations=True)
+    assert list(table.index) == [6.9, 7.1]
+    for threshold in (6.9, 7.1):
+        single = recommend_prerequisites(df, importance, threshold=threshold)
+        below = (df[list(importance.index)] < np.float32(threshold)).sum()
+        assert table.loc[threshold, list(importance.index)].tolist() == below.tolist()
+        assert table.loc[threshold, "Recomendações"] == len(single)
+        assert table.loc[threshold, "Alunos com recomendação"] == single["Aluno"].nunique()
+        pd.testing.assert_frame_equal(recs[threshold].reset_index(drop=True), single.reset_index(drop=True))
@@ -0,0 +1,20 @@
+import pytest
+
+import timings
+from prerequisite_issues import run_traced_tasks
+
+
+def _task(x):
+    with timings.stage("inner", cat="model"):
+        return x * 2
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_estagios_dentro_das_tarefas_voltam_ao_processo_principal(monkeypatch, jobs):
+    monkeypatch.setattr(timings, "_state", {"enabled": False, "format": "json", "epoch": 0.0, "events": []})
+    timings.enable()
+    assert run_traced_tasks(_task, ["task:a", "task:b"], [1, 2], jobs=jobs) == [2, 4]
+    summary = timings.summary()
+    assert summary["inner"]["calls"] == 2
+    assert summary["task:a"]["calls"] == summary["task:b"]["calls"] == 1
+    assert not summary["inner"]["process_cpu"]
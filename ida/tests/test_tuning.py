@@ -0,0 +1,53 @@
+import itertools
+import time
+
+import numpy as np
+
+import tuning
+from tuning import SEARCH_SPACES, sample_candidates, successive_halving, tune_subject
+
+
+def _data(n=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 10, (n, 3)).astype(np.float32)
+    y = X @ np.array([0.5, 0.3, 0.2]) + rng.normal(0, 1, n)
+    return X, y
+
+
+def test_prazo_esgotado_antes_da_segunda_rodada_mantem_o_melhor(monkeypatch):
+    X, y = _data(2_000)
+    space = SEARCH_SPACES["exact"]["Support Vector Regression"]
+    # Relógio falso: prazo (0), calibração (0 -> 1), 8 verificações da 1ª rodada dentro do
+    # prazo e, a partir da 2ª rodada, prazo esgotado antes de qualquer avaliação
+    ticks = itertools.chain([0.0, 0.0, 1.0], [0.0] * 8, itertools.repeat(1e9))
+    monkeypatch.setattr(tuning, "_clock", lambda kind: lambda: next(ticks))
+    result = successive_halving(
+        "Support Vector Regression", space, X[:1500], y[:1500], X[1500:], y[1500:],
+        budget=100.0, backend="exact", n_candidates=9,
+    )
+    assert result["rungs"] == 1
+    assert result["evaluations"] == 9
+    assert result["params"] in sample_candidates(space, 9)
+
+
+def test_tune_subject_com_orcamento_pequeno():
+    X, y = _data()
+    for budget in (0.2, 1.5):
+        results = tune_subject(X, y, "exact", budget)
+        assert set(results) == set(SEARCH_SPACES["exact"])
+        assert all(np.isfinite(r["score"]) for r in results.values())
+
+
+def test_prazo_absoluto_vencido_nao_ajusta():
+    X, y = _data()
+    assert tune_subject(X, y, "exact", 10.0, deadline=time.time() - 1) == {}
+
+
+def test_parametros_ajustados_so_valem_para_os_mesmos_dados(tmp_path):
+    path = tmp_path / "tuned.json"
+    results = {"C": {"Random Forest": {"params": {"max_depth": 6}, "score": 0.5, "rungs": 1, "evaluations": 1}}}
+    data_key = {"notas.csv": (1234, 5678)}
+    tuning.save_tuned(results, "exact", data_key, path=path)
+    assert tuning.load_tuned("exact", {"C": ["A"]}, data_key, path=path) == {"C": {"Random Forest": {"max_depth": 6}}}
+    assert tuning.load_tuned("exact", {"C": ["A"]}, {"notas.csv": (1234, 9999)}, path=path) == {}
+    assert tuning.load_tuned("exact", {"C": ["A"]}, None, path=path) == {}
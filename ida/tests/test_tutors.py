@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tutors import load_tutor_index
+
+
+def test_ids_de_aluno_repetidos_sao_rejeitados(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.uniform(0, 10, (50, 3)), columns=["A", "B", "C"]).astype(np.float32)
+    df.insert(0, "Aluno", [f"Aluno_{i % 40}" for i in range(len(df))])
+    with pytest.raises(ValueError, match="Aluno_0"):
+        load_tutor_index(df, {"C": ["A", "B"]}, path=tmp_path / "tutor_index.pkl")
+    assert not (tmp_path / "tutor_index.pkl").exists()
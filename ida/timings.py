@@ -0,0 +1,227 @@
+"""Instrumentação por estágio do pipeline: tempo de parede, tempo de CPU e pico do tracemalloc.
+
+Desligada por padrão. Liga com ``main.py --timings`` (ou ``--timings chrome``) ou com
+a variável de ambiente ``SIDA_TIMINGS`` (``1``/``json`` ou ``chrome``). Desligada,
+``stage()`` devolve um contexto vazio compartilhado e o custo é uma chamada de função.
+
+    with timings.stage("recommendations"):
+        ...
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+ENV_VAR = "SIDA_TIMINGS"
+FORMATS = ("json", "chrome")
+MB = 1024 * 1024
+
+_state = {"enabled": False, "format": "json", "epoch": 0.0, "events": []}
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+def enable(formato="json"):
+    """Liga a coleta (e o tracemalloc) para o restante do processo."""
+    if formato not in FORMATS:
+        raise ValueError(f"Formato de timings desconhecido: {formato} (use {', '.join(FORMATS)})")
+    _state.update(enabled=True, format=formato, epoch=time.time(), events=[])
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def enabled():
+    return _state["enabled"]
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _Stage:
+    """Mede um estágio; estágios aninhados repassam o pico de memória ao estágio pai.
+
+    O pico do tracemalloc e o tempo de CPU (``time.process_time``) são do processo
+    inteiro: em estágios fora da thread principal (threads do ``writer.ArtifactWriter``)
+    eles incluem o que as outras threads alocaram e executaram ao mesmo tempo. Esses
+    eventos saem marcados com ``process_cpu``.
+    """
+
+    __slots__ = ("name", "cat", "args", "sink", "start", "wall0", "cpu0", "base", "peak")
+
+    def __init__(self, name, cat, args, sink=None):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.sink = sink
+
+    def __enter__(self):
+        stack = _stack()
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        self.base = self.peak = current
+        stack.append(self)
+        self.start = time.time()
+        self.cpu0 = time.process_time()
+        self.wall0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall0
+        cpu = time.process_time() - self.cpu0
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+        stack = _stack()
+        stack.pop()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, self.peak)
+        event = {
+            "name": self.name,
+            "cat": self.cat,
+            "start": self.start,
+            "wall_s": wall,
+            "cpu_s": cpu,
+            "peak_mb": (self.peak - self.base) / MB,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "process_cpu": threading.current_thread() is not threading.main_thread(),
+            "args": self.args,
+        }
+        if self.sink is not None:
+            self.sink.append(event)
+        else:
+            record(event)
+        return False
+
+
+def stage(name, cat="stage", **args):
+    """Contexto que mede um estágio (ou nada faz, se a instrumentação está desligada)."""
+    if not _state["enabled"]:
+        return _NOOP
+    # Dentro de ``traced_call`` o evento volta com o resultado da tarefa
+    return _Stage(name, cat, args, sink=getattr(_local, "sink", None))
+
+
+def record(event):
+    with _lock:
+        _state["events"].append(event)
+
+
+def traced_call(fn, name, *args):
+    """Executa ``fn(*args)`` medindo-o; pode rodar em um processo filho.
+
+    Os estágios abertos dentro de ``fn`` são coletados junto com o da tarefa.
+    Retorna ``(resultado, eventos)``; o processo principal registra os eventos com ``collect``.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    # Processos filhos iniciados por spawn não herdam a instrumentação ligada
+    _state["enabled"] = True
+    sink = []
+    outer = getattr(_local, "sink", None)
+    _local.sink = sink
+    try:
+        with _Stage(name, "subject", {}, sink=sink):
+            result = fn(*args)
+    finally:
+        _local.sink = outer
+    return result, sink
+
+
+def collect(output):
+    result, events = output
+    for event in events:
+        record(event)
+    return result
+
+
+def summary():
+    """Totais por nome de estágio, do mais lento para o mais rápido."""
+    totals = {}
+    for event in _state["events"]:
+        row = totals.setdefault(
+            event["name"],
+            {"cat": event["cat"], "calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mb": 0.0, "process_cpu": False},
+        )
+        row["calls"] += 1
+        row["process_cpu"] = row["process_cpu"] or event.get("process_cpu", False)
+        row["wall_s"] += event["wall_s"]
+        row["cpu_s"] += event["cpu_s"]
+        row["peak_mb"] = max(row["peak_mb"], event["peak_mb"])
+    return dict(sorted(totals.items(), key=lambda item: -item[1]["wall_s"]))
+
+
+def _chrome_trace(events, epoch):
+    return {
+        "displayTimeUnit": "ms",
+        "traceEvents": [
+            {
+                "name": event["name"],
+                "cat": event["cat"],
+                "ph": "X",
+                "ts": (event["start"] - epoch) * 1e6,
+                "dur": event["wall_s"] * 1e6,
+                "pid": event["pid"],
+                "tid": event["tid"],
+                "args": {"cpu_ms": event["cpu_s"] * 1000, "peak_mb": event["peak_mb"], **event["args"]},
+            }
+            for event in events
+        ],
+    }
+
+
+def write(out_dir):
+    """Grava ``timings.json`` (e ``timings.trace.json`` no formato Chrome) em ``out_dir``."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    events = sorted(_state["events"], key=lambda event: event["start"])
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_state["epoch"])),
+        "summary": summary(),
+        "events": [{**event, "start": event["start"] - _state["epoch"]} for event in events],
+    }
+    paths = [out_dir / "timings.json"]
+    paths[0].write_text(json.dumps(report, indent=1, ensure_ascii=False), encoding="utf-8")
+    if _state["format"] == "chrome":
+        paths.append(out_dir / "timings.trace.json")
+        paths[1].write_text(json.dumps(_chrome_trace(events, _state["epoch"]), ensure_ascii=False), encoding="utf-8")
+    return paths
+
+
+def format_summary():
+    linhas = [f"{'Estágio':<40} {'chamadas':>8} {'parede (s)':>11} {'CPU (s)':>10} {'pico (MB)':>10}"]
+    shared = False
+    for name, row in summary().items():
+        # Estágios em threads: a CPU é a do processo inteiro enquanto rodavam
+        mark = "*" if row["process_cpu"] else " "
+        shared = shared or row["process_cpu"]
+        linhas.append(
+            f"{name[:40]:<40} {row['calls']:>8} {row['wall_s']:>11.3f} {row['cpu_s']:>9.3f}{mark}"
+            f" {row['peak_mb']:>10.1f}"
+        )
+    if shared:
+        linhas.append("* CPU e pico do processo inteiro (inclui as outras threads em execução no período)")
+    return "\n".join(linhas)
+
+
+if os.environ.get(ENV_VAR, "").lower() not in ("", "0", "false", "no"):
+    enable("chrome" if os.environ[ENV_VAR].lower() == "chrome" else "json")
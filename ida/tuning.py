@@ -0,0 +1,230 @@
+import json
+import math
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cache import fingerprint
+from grades import as_grade_matrix
+from models import build_models, resolve_backend
+from prerequisite_issues import resolve_jobs, run_traced_tasks
+
+TUNED_PATH = Path(__file__).parent / "results" / "tuned_params.json"
+CLOCKS = ("wall", "cpu")
+
+# Espaço de busca por modelo; a primeira opção de cada parâmetro é a configuração padrão
+SEARCH_SPACES = {
+    "exact": {
+        "Random Forest": {
+            "n_estimators": [100, 50, 200],
+            "max_depth": [None, 6, 12],
+            "min_samples_leaf": [1, 5, 20],
+            "max_features": [1.0, 0.5],
+        },
+        "Support Vector Regression": {"C": [1.0, 0.1, 10.0], "epsilon": [0.1, 0.05, 0.5]},
+    },
+    "scalable": {
+        "Random Forest": {
+            "n_estimators": [100, 50, 200],
+            "max_depth": [None, 8, 16],
+            "min_samples_leaf": [5, 1, 20],
+            "max_features": [1.0, 0.5],
+        },
+        "Support Vector Regression": {"C": [1.0, 0.1, 10.0], "epsilon": [0.0, 0.1, 0.5]},
+    },
+    "hist": {
+        "Gradient Boosting": {
+            "learning_rate": [0.1, 0.05, 0.2],
+            "max_leaf_nodes": [31, 15, 63],
+            "min_samples_leaf": [20, 50, 200],
+            "l2_regularization": [0.0, 1.0],
+        },
+        "SGD Regression": {"sgdregressor__alpha": [1e-4, 1e-5, 1e-3, 1e-2]},
+    },
+}
+
+
+def _clock(kind):
+    return time.perf_counter if kind == "wall" else time.process_time
+
+
+def _expired(deadline):
+    """Se o prazo absoluto (``time.time()``, comum a todos os processos) já passou."""
+    return deadline is not None and time.time() > deadline
+
+
+def sample_candidates(space, n_candidates, seed=0):
+    """Sorteia combinações distintas do espaço; a primeira é sempre a configuração padrão."""
+    names = list(space)
+    default = {name: space[name][0] for name in names}
+    total = math.prod(len(space[name]) for name in names)
+    rng = np.random.default_rng(seed)
+    seen = {tuple(default.values())}
+    candidates = [default]
+    while len(candidates) < min(n_candidates, total):
+        values = tuple(space[name][rng.integers(len(space[name]))] for name in names)
+        if values not in seen:
+            seen.add(values)
+            candidates.append(dict(zip(names, values)))
+    return candidates
+
+
+def successive_halving(name, space, X_train, y_train, X_val, y_val, budget, backend, clock="wall",
+                       n_candidates=27, eta=3, min_resources=500, seed=0, deadline=None):
+    """Busca por halving sucessivo com orçamento de tempo (segundos de ``clock``).
+
+    Na primeira rodada todos os candidatos treinam com poucas linhas; a cada
+    rodada só o melhor terço (``eta``) continua, com ``eta`` vezes mais linhas.
+    O custo do candidato padrão na primeira rodada calibra quantos candidatos
+    cabem no orçamento (cada rodada custa mais ou menos o mesmo). Quando o
+    orçamento acaba, vale o melhor candidato da rodada mais alta avaliada.
+    ``deadline`` é um prazo absoluto (``time.time()``) que também encerra a
+    busca, vindo de ``tune_subjects``. Retorna parâmetros, R² de validação, rodadas e avaliações.
+    """
+    from sklearn.metrics import r2_score
+
+    now = _clock(clock)
+    stop = now() + budget
+    order = np.random.default_rng(seed).permutation(len(X_train))
+    candidates = sample_candidates(space, n_candidates, seed=seed)
+    rungs = max(1, math.ceil(math.log(len(candidates), eta)) + 1)
+    resources = min(max(min_resources, len(order) // eta ** (rungs - 1)), len(order))
+
+    def evaluate(params, rows):
+        model = build_models(backend, len(rows), {name: params})[name]
+        model.fit(X_train[rows], y_train[rows])
+        return r2_score(y_val, model.predict(X_val))
+
+    start = now()
+    first = evaluate(candidates[0], order[:resources])
+    remaining = budget if deadline is None else min(budget, deadline - time.time())
+    affordable = int(remaining / max((now() - start) * rungs, 1e-9))
+    candidates = candidates[:max(affordable, min(eta, len(candidates)))]
+
+    best = {"params": candidates[0], "score": float(first), "rungs": 1, "evaluations": 1}
+    rung = 0
+    while candidates:
+        rows = order[:min(resources, len(order))]
+        scores = [first] if rung == 0 else []
+        for params in candidates[len(scores):]:
+            if now() > stop or _expired(deadline):
+                break
+            scores.append(evaluate(params, rows))
+            best["evaluations"] += 1
+        if not scores:
+            # O prazo acabou antes de qualquer avaliação nesta rodada: vale o melhor da anterior
+            break
+        rung += 1
+        ranked = np.argsort(scores)[::-1]
+        best.update(params=candidates[ranked[0]], score=float(scores[ranked[0]]), rungs=rung)
+        if len(scores) < len(candidates) or len(candidates) == 1 or len(rows) == len(order):
+            break
+        candidates = [candidates[i] for i in ranked[:max(1, len(candidates) // eta)]]
+        resources *= eta
+    return best
+
+
+def tune_subject(X, y, backend, budget, clock="wall", seed=0, deadline=None):
+    """Ajusta os modelos de uma disciplina, dividindo o orçamento entre eles.
+
+    A busca usa só a parte de treino da divisão de ``fit_subject`` (com uma
+    validação interna), para não vazar o conjunto de teste das métricas.
+    Modelos que começariam depois de ``deadline`` (prazo absoluto) ficam de
+    fora do resultado e seguem com a configuração padrão.
+    """
+    from sklearn.model_selection import train_test_split
+
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.25, random_state=seed)
+    space = SEARCH_SPACES[backend]
+    results = {}
+    for i, (name, model_space) in enumerate(space.items()):
+        if _expired(deadline):
+            break
+        share = budget / len(space)
+        results[name] = successive_halving(
+            name, model_space, X_fit, y_fit, X_val, y_val, share, backend, clock=clock, seed=seed + i,
+            deadline=deadline,
+        )
+    return results
+
+
+def tune_subjects(df, pre_reqs, budget, backend="auto", jobs=1, clock="wall", seed=0):
+    """Ajusta todas as disciplinas em paralelo dentro de um orçamento total de ``budget`` segundos.
+
+    Cada disciplina recebe ``budget * jobs / disciplinas`` segundos, de modo que
+    o conjunto termine perto do orçamento. Com o relógio ``wall``, o prazo
+    absoluto é fixado aqui, antes de distribuir as tarefas: disciplinas que
+    começariam depois dele não são ajustadas e ficam fora do resultado
+    (seguem com a configuração padrão). Retorna ``{disciplina: {modelo: resultado}}``.
+    ``df`` pode ser um DataFrame ou uma ``grades.GradeMatrix``.
+    """
+    if clock not in CLOCKS:
+        raise ValueError(f"Relógio desconhecido: {clock} (use {', '.join(CLOCKS)})")
+    deadline = time.time() + budget if clock == "wall" else None
+    grades = as_grade_matrix(df)
+    backend = resolve_backend(backend, len(grades))
+    subjects = list(pre_reqs)
+    workers = min(resolve_jobs(jobs), len(subjects)) or 1
+    per_subject = budget * workers / max(len(subjects), 1)
+    results = run_traced_tasks(
+        tune_subject,
+        [f"tune:{subject}" for subject in subjects],
+        [grades.select(pre_reqs[subject]) for subject in subjects],
+        [grades.column(subject) for subject in subjects],
+        [backend] * len(subjects),
+        [per_subject] * len(subjects),
+        [clock] * len(subjects),
+        [seed] * len(subjects),
+        [deadline] * len(subjects),
+        jobs=jobs,
+    )
+    return {subject: result for subject, result in zip(subjects, results) if result}
+
+
+def tuned_overrides(results):
+    """Só os parâmetros ({disciplina: {modelo: parâmetros}}), no formato de ``fit_subjects(tuned=...)``."""
+    return {
+        subject: {name: result["params"] for name, result in models.items()}
+        for subject, models in results.items()
+    }
+
+
+def save_tuned(results, backend, data_key=None, path=TUNED_PATH):
+    """Grava os parâmetros ajustados (por backend) em JSON, de forma atômica.
+
+    Junto vai a impressão digital de ``data_key`` (a mesma chave dos dados usada
+    pelo ``StageCache``), para ``load_tuned`` só reaproveitá-los com as mesmas notas.
+    """
+    path = Path(path)
+    stored = load_tuned_file(path)
+    stored[backend] = {"data_key": fingerprint("tuned", data_key), "subjects": results}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(stored, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+def load_tuned_file(path=TUNED_PATH):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def load_tuned(backend, pre_reqs, data_key=None, path=TUNED_PATH):
+    """Parâmetros ajustados salvos para ``backend``, restritos às disciplinas de ``pre_reqs``.
+
+    Só valem se foram ajustados com os mesmos dados (``data_key``); sem chave
+    (dados fictícios sem semente) ou com notas alteradas, nada é reaproveitado.
+    """
+    entry = load_tuned_file(path).get(backend, {})
+    if data_key is None or entry.get("data_key") != fingerprint("tuned", data_key):
+        return {}
+    results = entry["subjects"]
+    return tuned_overrides({subject: results[subject] for subject in pre_reqs if subject in results})
@@ -0,0 +1,193 @@
+import os
+import pickle
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cache import fingerprint
+from grades import as_grade_matrix
+
+# Os módulos do sklearn são importados dentro das funções: só quem busca tutores paga o custo
+
+TUTOR_INDEX_PATH = Path(__file__).parent / "results" / "tutor_index.pkl"
+TUTOR_COLUMNS = ["Aluno", "Pré-requisito", "Tutor", "Nota do tutor", "Distância"]
+# Nota mínima no pré-requisito para um colega ser tutor
+STRONG_GRADE = 7.0
+# Acima desta dimensão, a KD-tree perde para a BallTree
+KDTREE_MAX_DIMS = 16
+# Alunos por consulta em lote
+QUERY_BLOCK = 100_000
+
+
+def prerequisite_columns(pre_reqs):
+    """Pré-requisitos do mapeamento, na ordem em que aparecem."""
+    return list(dict.fromkeys(req for reqs in pre_reqs.values() for req in reqs))
+
+
+def prerequisite_context(pre_reqs, prereq):
+    """Pré-requisitos das disciplinas que dependem de ``prereq`` (ele incluído).
+
+    São as notas que contam quando ``prereq`` é recomendado: o vetor de
+    pré-requisitos das disciplinas em que o aluno está abaixo do limiar.
+    """
+    return list(dict.fromkeys(
+        req for reqs in pre_reqs.values() if prereq in reqs for req in [prereq, *reqs]
+    ))
+
+
+def student_index(grades):
+    """Índice dos IDs de aluno; IDs repetidos tornam a busca do aluno ambígua e são rejeitados."""
+    students = pd.Index(np.asarray(grades.students))
+    if not students.is_unique:
+        repeated = students[students.duplicated()].unique()[:5]
+        raise ValueError(f"IDs de aluno repetidos nas notas: {', '.join(map(str, repeated))}")
+    return students
+
+
+class TutorIndex:
+    """Índices de vizinhos mais próximos para sugerir tutores entre os colegas.
+
+    Para cada pré-requisito há uma árvore (KD-tree, ou BallTree em dimensão
+    alta) só com os alunos que tiraram pelo menos ``strong`` nele. Os vetores
+    são as notas de ``prerequisite_context``: os pré-requisitos das disciplinas
+    que dependem dele (faltantes viram a média da coluna). Com poucas
+    dimensões por árvore a busca continua exata e rápida; um vetor com todos
+    os pré-requisitos deixaria a KD-tree quase tão lenta quanto comparar todos
+    os pares. ``query`` busca, em lote, os colegas mais parecidos com cada
+    aluno entre os fortes naquele pré-requisito.
+
+    As linhas se referem à ``grades.GradeMatrix`` usada na construção; ``key``
+    identifica essas notas e parâmetros (ver ``load_tutor_index``).
+    """
+
+    def __init__(self, grades, pre_reqs, strong=STRONG_GRADE, leaf_size=40):
+        from sklearn.neighbors import BallTree, KDTree
+
+        self.columns = prerequisite_columns(pre_reqs)
+        self.strong = strong
+        self.key = tutor_index_key(grades, pre_reqs, strong, leaf_size)
+        self.context = {prereq: prerequisite_context(pre_reqs, prereq) for prereq in self.columns}
+        columns = list(dict.fromkeys(col for context in self.context.values() for col in context))
+        with np.errstate(invalid="ignore"):
+            means = np.nanmean(grades.select(columns), axis=0, dtype=np.float64)
+        self.fill = dict(zip(columns, np.nan_to_num(means)))
+        self.trees = {}
+        for prereq in self.columns:
+            members = np.flatnonzero(grades.column(prereq) >= strong)
+            if members.size:
+                tree_cls = KDTree if len(self.context[prereq]) <= KDTREE_MAX_DIMS else BallTree
+                points = self.vectors(grades, prereq, members)
+                self.trees[prereq] = (tree_cls(points, leaf_size=leaf_size), members)
+
+    def vectors(self, grades, prereq, rows):
+        """Vetores (float64) dos alunos ``rows`` na árvore de ``prereq``, com faltantes preenchidos."""
+        context = self.context[prereq]
+        notas = np.column_stack([grades.column(col)[rows] for col in context])
+        fill = np.array([self.fill[col] for col in context])
+        return np.where(np.isnan(notas), fill, notas)
+
+    def query(self, grades, rows, prereq, k=3):
+        """Até ``k`` tutores para cada aluno de ``rows`` no pré-requisito ``prereq``.
+
+        Retorna ``(tutores, distâncias)`` com formato ``(len(rows), k)``; o
+        próprio aluno nunca é seu tutor e posições sem tutor ficam com -1 / NaN.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        tutors = np.full((len(rows), k), -1, dtype=np.int64)
+        distances = np.full((len(rows), k), np.nan)
+        if prereq not in self.trees or len(rows) == 0:
+            return tutors, distances
+        tree, members = self.trees[prereq]
+        # Um vizinho a mais: o próprio aluno pode estar entre os fortes
+        n_neighbors = min(k + 1, len(members))
+        for start in range(0, len(rows), QUERY_BLOCK):
+            block = rows[start:start + QUERY_BLOCK]
+            dist, idx = tree.query(self.vectors(grades, prereq, block), k=n_neighbors)
+            found = members[idx]
+            keep = found != block[:, None]
+            # Mantém os k primeiros que não são o próprio aluno (a ordem por distância se preserva)
+            rank = np.cumsum(keep, axis=1) - 1
+            keep &= rank < k
+            r, c = np.nonzero(keep)
+            tutors[start + r, rank[r, c]] = found[r, c]
+            distances[start + r, rank[r, c]] = dist[r, c]
+        return tutors, distances
+
+    def save(self, path=TUTOR_INDEX_PATH):
+        """Grava o índice de forma atômica (as árvores são reaproveitadas sem reconstrução)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(self, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return path
+
+
+def tutor_index_key(grades, pre_reqs, strong, leaf_size):
+    columns = prerequisite_columns(pre_reqs)
+    return fingerprint(grades.select(columns), pd.Series(grades.students, copy=False), pre_reqs, strong, leaf_size)
+
+
+def load_tutor_index(df, pre_reqs, strong=STRONG_GRADE, path=TUTOR_INDEX_PATH, rebuild=False, leaf_size=40):
+    """Índice salvo em ``path`` se ele foi construído com as mesmas notas e parâmetros; senão, constrói e grava.
+
+    Retorna ``(índice, reaproveitado)``.
+    """
+    grades = as_grade_matrix(df, prerequisite_columns(pre_reqs))
+    student_index(grades)
+    path = Path(path)
+    if not rebuild and path.exists():
+        try:
+            with open(path, "rb") as fh:
+                index = pickle.load(fh)
+        except Exception:
+            # Índice corrompido ou de outra versão: reconstrói
+            index = None
+        if (
+            isinstance(index, TutorIndex)
+            and index.key == tutor_index_key(grades, pre_reqs, strong, leaf_size)
+        ):
+            return index, True
+    index = TutorIndex(grades, pre_reqs, strong=strong, leaf_size=leaf_size)
+    index.save(path)
+    return index, False
+
+
+def match_tutors(df, recommendations, index, k=3):
+    """Sugere até ``k`` tutores por (aluno, pré-requisito) recomendado.
+
+    As consultas são agrupadas por pré-requisito: todos os alunos que precisam
+    de um mesmo pré-requisito são buscados de uma vez na árvore dele. Retorna
+    um DataFrame longo (Aluno, Pré-requisito, Tutor, Nota do tutor, Distância),
+    do tutor mais próximo para o mais distante.
+    """
+    if recommendations is None or recommendations.empty or k <= 0:
+        return pd.DataFrame(columns=TUTOR_COLUMNS)
+    grades = as_grade_matrix(df, index.columns)
+    rows = student_index(grades).get_indexer(recommendations["Aluno"])
+    prereqs = recommendations["Pré-requisito"].to_numpy()
+
+    parts = []
+    for prereq in pd.unique(prereqs):
+        selected = np.flatnonzero((prereqs == prereq) & (rows >= 0))
+        tutors, distances = index.query(grades, rows[selected], prereq, k=k)
+        r, c = np.nonzero(tutors >= 0)
+        found = tutors[r, c]
+        parts.append(pd.DataFrame({
+            "order": selected[r] * k + c,
+            "Aluno": np.asarray(grades.students[rows[selected][r]]),
+            "Pré-requisito": prereq,
+            "Tutor": np.asarray(grades.students[found]),
+            "Nota do tutor": grades.column(prereq)[found],
+            "Distância": distances[r, c],
+        }))
+    # Mesma ordem das recomendações; dentro de cada uma, do tutor mais próximo ao mais distante
+    matches = pd.concat(parts, ignore_index=True).sort_values("order", kind="stable")
+    return matches.drop(columns="order").reset_index(drop=True)
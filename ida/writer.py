@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import timings
+from cache import fingerprint
+
+DEFAULT_MANIFEST = Path(__file__).parent / "results" / "manifest.json"
+
+
+def content_hash(path):
+    """SHA-256 do conteúdo de um arquivo ou de um diretório (arquivos em ordem de nome)."""
+    path = Path(path)
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    h = hashlib.sha256()
+    for file in files:
+        if path.is_dir():
+            h.update(str(file.relative_to(path)).encode("utf-8") + b"\x00")
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def _stat(path):
+    try:
+        st = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _replace(tmp, path):
+    """Troca atômica; diretórios (Parquet particionado) saem do caminho antes da troca."""
+    if tmp.is_dir() and path.exists():
+        old = path.with_name(f".old-{uuid.uuid4().hex}.{path.name}")
+        os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, path)
+
+
+def _discard(tmp):
+    if tmp.is_dir():
+        shutil.rmtree(tmp, ignore_errors=True)
+    elif tmp.exists():
+        tmp.unlink()
+
+
+class ArtifactWriter:
+    """Grava artefatos em paralelo (threads), de forma atômica e só quando mudam.
+
+    Cada ``submit`` recebe o caminho final, uma função ``write(tmp_path)`` e as
+    entradas que determinam o conteúdo. O manifesto guarda, por arquivo, o hash
+    das entradas, o hash do conteúdo e tamanho/mtime:
+
+    - entradas iguais e arquivo intacto: a serialização nem é executada;
+    - conteúdo novo idêntico ao atual: o arquivo não é regravado;
+    - caso contrário, grava em um temporário no mesmo diretório e renomeia.
+
+    ``force=True`` (``--rebuild``) ignora o manifesto e regrava tudo.
+    """
+
+    def __init__(self, manifest_path=DEFAULT_MANIFEST, max_workers=4, force=False):
+        self.manifest_path = Path(manifest_path)
+        self.force = force
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact")
+        self._futures = []
+        self.written = []
+        self.skipped = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, path, write, *inputs):
+        path = Path(path)
+        key = str(path.resolve())
+        inputs_hash = fingerprint(key, *inputs)
+        entry = self.manifest.get(key)
+        if (
+            not self.force
+            and entry is not None
+            and entry["inputs"] == inputs_hash
+            and entry["stat"] == _stat(path)
+        ):
+            self.skipped.append(path)
+            return None
+        future = self._pool.submit(self._write, path, key, write, inputs_hash)
+        self._futures.append(future)
+        return future
+
+    def _write(self, path, key, write, inputs_hash):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # O nome do temporário mantém a extensão (compressão e formato são inferidos por ela)
+        tmp = path.with_name(f".tmp-{uuid.uuid4().hex}.{path.name}")
+        try:
+            with timings.stage(f"write:{path.name}", cat="export"):
+                write(tmp)
+            digest = content_hash(tmp)
+            entry = self.manifest.get(key)
+            if entry is not None and entry["sha256"] == digest and entry["stat"] == _stat(path):
+                _discard(tmp)
+                self.skipped.append(path)
+            else:
+                _replace(tmp, path)
+                self.written.append(path)
+        except BaseException:
+            _discard(tmp)
+            raise
+        return key, {"inputs": inputs_hash, "sha256": digest, "stat": _stat(path)}
+
+    def close(self):
+        """Espera todas as gravações e atualiza o manifesto; propaga o primeiro erro."""
+        error = None
+        for future in self._futures:
+            try:
+                key, entry = future.result()
+            except Exception as exc:
+                error = error or exc
+            else:
+                self.manifest[key] = entry
+        self._futures = []
+        self._pool.shutdown()
+
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.manifest_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+        if error is not None:
+            raise error
+        return self.written